@@ -0,0 +1,74 @@
+"""
+Compare RAG embedding backends on CPU: passage throughput (embeddings/sec,
+batched like ingestion) and single-query latency p50/p99 (like search),
+plus cosine parity of each backend against the fp32 sentence-transformers
+model.
+
+The first run of an ONNX backend exports (and quantizes) the model into
+--model-dir, which is not included in the timings.
+
+Usage (from project_starter/):
+    python benchmarks/bench_embedding_backends.py --passages 512 --queries 200
+    python benchmarks/bench_embedding_backends.py --backends sentence-transformers onnx-int8
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.rag.embeddings import BACKENDS, PARITY_SAMPLES, create_embedding_backend, parity_check
+from src.rag.engine import RAGEngine
+
+WORDS = ["المادة", "نظام", "العمل", "العامل", "صاحب", "الأجر", "الإجازة", "retrieval", "embedding", "vector", "latency"]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument("--model", default=RAGEngine.EMBEDDING_MODEL)
+    parser.add_argument("--model-dir", default=os.path.join("chroma_db", "onnx_models"))
+    parser.add_argument("--passages", type=int, default=512)
+    parser.add_argument("--words", type=int, default=150, help="Words per passage (~1000 chars)")
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    passages = [f"passage: {' '.join(rng.choices(WORDS, k=args.words))}" for _ in range(args.passages)]
+    queries = [f"query: {' '.join(rng.choices(WORDS, k=rng.randint(3, 12)))}" for _ in range(args.queries)]
+
+    reference = None
+    rows = []
+    for name in args.backends:
+        backend = create_embedding_backend(name, args.model, model_dir=args.model_dir)
+        if name == "sentence-transformers":
+            reference = backend
+        backend(queries[:4])  # warm up kernels / allocator
+
+        start = time.perf_counter()
+        backend(passages)
+        throughput = len(passages) / (time.perf_counter() - start)
+
+        latencies = []
+        for query in queries:
+            start = time.perf_counter()
+            backend([query])
+            latencies.append((time.perf_counter() - start) * 1000)
+        latencies.sort()
+
+        if reference is None:
+            reference = create_embedding_backend("sentence-transformers", args.model)
+        parity = parity_check(backend, reference, PARITY_SAMPLES)
+        rows.append((name, throughput, statistics.median(latencies), latencies[int(len(latencies) * 0.99) - 1], parity))
+
+    print(f"Model: {args.model}  passages: {args.passages} x ~{args.words} words  queries: {args.queries}")
+    print(f"{'backend':>22} {'emb/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'min cos':>8} {'parity':>7}")
+    for name, throughput, p50, p99, parity in rows:
+        print(f"{name:>22} {throughput:>8.1f} {p50:>8.2f} {p99:>8.2f} {parity.min_cosine:>8.4f} "
+              f"{'ok' if parity.passed else 'FAIL':>7}")
+
+if __name__ == "__main__":
+    main()
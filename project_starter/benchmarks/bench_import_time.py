@@ -0,0 +1,68 @@
+"""
+Benchmark cold import time of the modules the CLI and the Streamlit app load,
+and check that none of them pulls in the heavy RAG dependencies eagerly.
+
+Each import runs in a fresh interpreter, so results are cold-start numbers.
+
+Usage (from project_starter/):
+    python benchmarks/bench_import_time.py --repeat 5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+MODULES = [
+    "src.rag.engine",
+    "src.tools.rag_tool",
+    "src.agent.specialists",
+]
+
+HEAVY_MODULES = ["chromadb", "sentence_transformers", "torch", "pdfplumber", "bs4", "langchain_text_splitters"]
+
+PROBE = """
+import sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+loaded = [m for m in {heavy!r} if m in sys.modules]
+print(elapsed, ",".join(loaded))
+"""
+
+def time_import(module: str) -> tuple[float, list[str]]:
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY_MODULES)],
+        cwd=PROJECT_ROOT, capture_output=True, text=True, check=True,
+    ).stdout.strip().splitlines()[-1]
+    elapsed, loaded = out.split(" ", 1) if " " in out else (out, "")
+    return float(elapsed), [m for m in loaded.split(",") if m]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("modules", nargs="*", default=MODULES)
+    args = parser.parse_args()
+
+    print(f"{'Module':<28} {'p50(ms)':>9} {'max(ms)':>9}  Heavy modules loaded")
+    print("-" * 75)
+    regressions = 0
+    for module in args.modules:
+        try:
+            runs = [time_import(module) for _ in range(args.repeat)]
+        except subprocess.CalledProcessError as e:
+            print(f"{module:<28} failed: {e.stderr.strip().splitlines()[-1]}")
+            continue
+        times = [t * 1000 for t, _ in runs]
+        loaded = runs[-1][1]
+        regressions += bool(loaded)
+        print(f"{module:<28} {statistics.median(times):>9.1f} {max(times):>9.1f}  {', '.join(loaded) or '-'}")
+
+    if regressions:
+        print(f"\n{regressions} module(s) import heavy dependencies at import time.")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Benchmark the BM25 side of hybrid search: per-query latency on a synthetic
+corpus (default 100k chunks), i.e. the overhead mode="hybrid" adds on top of
+the dense query.
+
+Usage (from project_starter/):
+    python benchmarks/bench_lexical_latency.py --chunks 100000 --queries 200
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.rag.lexical import BM25Index
+
+COMMON = ["المادة", "نظام", "العمل", "العامل", "صاحب", "الأجر", "الإجازة", "مكافأة", "نهاية", "الخدمة"]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=100_000)
+    parser.add_argument("--words", type=int, default=150, help="Tokens per chunk")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    vocab = [f"term{i}" for i in range(30_000)] + COMMON * 500 + [str(n) for n in range(1, 300)]
+
+    index = BM25Index()
+    start = time.perf_counter()
+    for i in range(args.chunks):
+        index.add(f"chunk-{i}", " ".join(rng.choices(vocab, k=args.words)))
+    build_s = time.perf_counter() - start
+
+    queries = [f"{rng.choice(COMMON)} {rng.randint(1, 299)} {rng.choice(COMMON)} {rng.choice(vocab)}" for _ in range(args.queries)]
+    index.search(queries[0], k=args.k)  # compile hot posting lists once
+
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        index.search(query, k=args.k)
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+
+    print(f"Chunks: {args.chunks}  build: {build_s:.1f}s")
+    print(f"BM25 query latency  p50: {statistics.median(latencies):.2f}ms  "
+          f"p99: {latencies[int(len(latencies) * 0.99) - 1]:.2f}ms  max: {latencies[-1]:.2f}ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Benchmark PDF extraction + chunking throughput (pages/sec) by worker count.
+
+Embedding and upserts are excluded: this measures the stage that
+RAGEngine.ingest_directory(workers=N) moves into the process pool.
+
+Usage (from project_starter/):
+    python benchmarks/bench_parallel_extraction.py src/documents --workers 1 2 4 8
+"""
+import argparse
+import glob
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.rag.extraction import extract_pdf_chunks
+
+def run(pdf_files: list[str], workers: int) -> tuple[int, int, float]:
+    start = time.perf_counter()
+    if workers <= 1:
+        docs = [extract_pdf_chunks(f) for f in pdf_files]
+    else:
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as executor:
+            docs = list(executor.map(extract_pdf_chunks, pdf_files))
+    elapsed = time.perf_counter() - start
+    return sum(d.pages for d in docs), sum(len(d.chunks) for d in docs), elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory", nargs="?", default=os.path.join("src", "documents"))
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--repeat", type=int, default=1, help="Replicate the file list N times to get a bigger corpus")
+    args = parser.parse_args()
+
+    pdf_files = sorted(glob.glob(os.path.join(args.directory, "*.pdf"))) * args.repeat
+    if not pdf_files:
+        print(f"No PDFs found in {args.directory}")
+        return
+
+    print(f"{len(pdf_files)} PDFs, {os.cpu_count()} CPUs\n")
+    print(f"{'Workers':>8} {'Pages':>7} {'Chunks':>7} {'Time(s)':>9} {'Pages/s':>9} {'Speedup':>8}")
+    print("-" * 53)
+    baseline = None
+    for workers in args.workers:
+        pages, chunks, elapsed = run(pdf_files, workers)
+        rate = pages / elapsed if elapsed else 0.0
+        baseline = baseline or rate
+        print(f"{workers:>8} {pages:>7} {chunks:>7} {elapsed:>9.2f} {rate:>9.1f} {rate / baseline:>7.2f}x")
+
+if __name__ == "__main__":
+    main()
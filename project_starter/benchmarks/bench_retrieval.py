@@ -0,0 +1,106 @@
+"""
+Retrieval quality + latency benchmark for RAGEngine.search over a golden
+set (see src/rag/evaluation.py for the JSONL format).
+
+Every --engine is a RAGEngine built with the given keyword arguments;
+every --search is a set of search() arguments run against each engine.
+Both take NAME:key=value,key=value (values are parsed as JSON when they
+can be). Reports hit@k / MRR / precision@k / recall@k at chunk and source
+level, sequential p50/p95/p99 latency, QPS under each --clients level,
+process memory, index size and characters of context per hit. --output
+writes the report as JSON; --compare prints the change against an
+earlier report.
+
+Usage (from project_starter/):
+    python benchmarks/bench_retrieval.py --golden benchmarks/golden_set.jsonl --output bench.json
+    python benchmarks/bench_retrieval.py --golden benchmarks/golden_set.jsonl \\
+        --engine chars:persist_directory=./chroma_db \\
+        --engine tokens:persist_directory=./chroma_tokens,chunk_unit=tokens \\
+        --engine parents:persist_directory=./chroma_parents,parent_child=true \\
+        --search dense:mode=dense --search hybrid:mode=hybrid --search rerank:mode=hybrid,rerank=true \\
+        --clients 1 4 8 --compare bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.rag.evaluation import TABLE_HEADER, compare_reports, load_golden_set, report_dict, run_benchmark
+
+def parse_spec(spec: str) -> tuple[str, dict]:
+    """"name:key=value,key=value" -> (name, {key: value})."""
+    name, _, options = spec.partition(":")
+    kwargs = {}
+    for option in filter(None, options.split(",")):
+        key, _, value = option.partition("=")
+        try:
+            kwargs[key.strip()] = json.loads(value)
+        except ValueError:
+            kwargs[key.strip()] = value
+    return name, kwargs
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--golden", default=os.path.join(os.path.dirname(__file__), "golden_set.jsonl"))
+    parser.add_argument("--engine", action="append", default=None, help="NAME:key=value,... (RAGEngine arguments)")
+    parser.add_argument("--search", action="append", default=None, help="NAME:key=value,... (search arguments)")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--rounds", type=int, default=1, help="Passes over the golden set per measurement")
+    parser.add_argument("--use-cache", action="store_true", help="Keep the query cache on (measures warm repeats)")
+    parser.add_argument("--output", help="Write the JSON report here")
+    parser.add_argument("--compare", help="Earlier JSON report to diff against")
+    args = parser.parse_args()
+
+    from src.rag.engine import RAGEngine
+
+    golden = load_golden_set(args.golden)
+    engines = [parse_spec(spec) for spec in (args.engine or ["default:persist_directory=./chroma_db"])]
+    variants = [parse_spec(spec) for spec in (args.search or ["dense:mode=dense"])]
+    print(f"Golden set: {len(golden)} queries from {args.golden}  k: {args.k}  clients: {args.clients}")
+
+    runs = []
+    print(TABLE_HEADER)
+    for engine_name, engine_kwargs in engines:
+        engine = RAGEngine(**engine_kwargs)
+        engine.warmup()
+        for variant, search_kwargs in variants:
+            run = run_benchmark(
+                engine, golden, args.k, search_kwargs, tuple(args.clients), args.rounds,
+                use_cache=args.use_cache, engine_name=engine_name, variant=variant, settings=engine_kwargs,
+            )
+            runs.append(run)
+            print(run.row())
+
+    report = report_dict(
+        runs, args.golden, k=args.k, git_commit=git_commit(),
+        python=platform.python_version(), machine=platform.machine(), cpus=os.cpu_count(),
+    )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"Wrote {args.output}")
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        rows = compare_reports(baseline, report)
+        print(f"\nChange vs {args.compare}:")
+        for row in rows:
+            if row["delta"]:
+                print(f"{row['run']:<28} {row['metric']:<22} {row['baseline']:>10} -> {row['current']:>10} ({row['delta']:+})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Before/after numbers for the compact Chroma storage layout: builds a
+synthetic collection in the legacy layout ("passage: " document + full text
+copied into metadata["original_text"]), measures it, migrates it in place
+with src.rag.storage.migrate_to_compact and measures again.
+
+Reported: persist-directory size, query latency with
+include=["metadatas", "documents"] and cold start (new process: open the
+client, get the collection, run one query). Random vectors stand in for the
+embedding model, which the storage numbers do not depend on.
+
+Usage (from project_starter/):
+    python benchmarks/bench_storage_layout.py --chunks 5000 --queries 200
+"""
+import argparse
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.rag.storage import directory_size, migrate_to_compact, vacuum_sqlite
+
+COLLECTION = "research_papers"
+WORDS = ["المادة", "نظام", "العمل", "العامل", "صاحب", "الأجر", "الإجازة", "retrieval", "embedding", "vector"]
+
+COLD_START = """
+import sys, time
+start = time.perf_counter()
+import chromadb
+from chromadb.config import Settings
+client = chromadb.PersistentClient(path=sys.argv[1], settings=Settings(anonymized_telemetry=False))
+collection = client.get_collection(sys.argv[2], embedding_function=None)
+collection.query(query_embeddings=[[0.1] * int(sys.argv[3])], n_results=20, include=["metadatas", "documents"])
+print(time.perf_counter() - start)
+"""
+
+def measure(path: str, client, dim: int, queries: np.ndarray, k: int) -> dict:
+    collection = client.get_collection(COLLECTION, embedding_function=None)
+    latencies = []
+    for vector in queries:
+        start = time.perf_counter()
+        collection.query(query_embeddings=[vector.tolist()], n_results=k, include=["metadatas", "documents"])
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    cold = subprocess.run(
+        [sys.executable, "-c", COLD_START, path, COLLECTION, str(dim)],
+        capture_output=True, text=True, check=True,
+    )
+    return {
+        "mb": directory_size(path) / 1e6,
+        "p50_ms": statistics.median(latencies),
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1],
+        "cold_s": float(cold.stdout.strip().splitlines()[-1]),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=5000)
+    parser.add_argument("--chars", type=int, default=900, help="Approximate characters per chunk")
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=20)
+    args = parser.parse_args()
+
+    import chromadb
+    from chromadb.config import Settings
+
+    rng = random.Random(0)
+    np_rng = np.random.default_rng(0)
+    path = tempfile.mkdtemp(prefix="bench_storage_")
+    try:
+        client = chromadb.PersistentClient(path=path, settings=Settings(anonymized_telemetry=False))
+        collection = client.create_collection(COLLECTION, embedding_function=None, metadata={"hnsw:space": "cosine"})
+        for start in range(0, args.chunks, 500):
+            ids, documents, metadatas = [], [], []
+            for i in range(start, min(start + 500, args.chunks)):
+                text = ""
+                while len(text) < args.chars:
+                    text += rng.choice(WORDS) + " "
+                ids.append(f"chunk-{i}")
+                documents.append(f"passage: {text}")
+                metadatas.append({"source": f"doc{i // 50}.pdf", "original_text": text, "page": i % 50 + 1})
+            collection.add(
+                ids=ids, documents=documents, metadatas=metadatas,
+                embeddings=np_rng.random((len(ids), args.dim), dtype=np.float32),
+            )
+
+        queries = np_rng.random((args.queries, args.dim), dtype=np.float32)
+        before = measure(path, client, args.dim, queries, args.k)
+
+        start = time.perf_counter()
+        report = migrate_to_compact(collection)
+        vacuum_sqlite(path)
+        migrate_s = time.perf_counter() - start
+        after = measure(path, client, args.dim, queries, args.k)
+
+        print(f"Chunks: {args.chunks}  migrated: {report.migrated} in {migrate_s:.1f}s")
+        print(f"{'':>10} {'disk MB':>9} {'p50 ms':>8} {'p99 ms':>8} {'cold s':>8}")
+        for label, row in (("legacy", before), ("compact", after)):
+            print(f"{label:>10} {row['mb']:>9.1f} {row['p50_ms']:>8.2f} {row['p99_ms']:>8.2f} {row['cold_s']:>8.2f}")
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
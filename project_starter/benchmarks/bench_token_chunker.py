@@ -0,0 +1,89 @@
+"""
+Character vs token-length chunking against e5's 512-token window.
+
+For every mode the PDFs' page text (extracted once, up front) is run
+through the streaming chunker, then each chunk is measured with the
+embedding model's tokenizer exactly as it is embedded ("passage: " prefix
+plus special tokens). Reported per mode: chunking time, chunk count,
+token-length mean / p50 / p95 / max, the share of chunks over the window
+and the tokens that truncation throws away.
+
+Modes:
+  - chars:         RecursiveChunker(1000, 200), the current default
+  - tokens-lenfn:  langchain splitter with length_function = tokenizer
+                   call (re-tokenizes every candidate piece)
+  - tokens:        RecursiveChunker(unit="tokens"), one tokenizer pass
+                   per page buffer with offset bisection
+
+Usage (from project_starter/):
+    python benchmarks/bench_token_chunker.py src/documents
+    python benchmarks/bench_token_chunker.py src/documents --token-size 480 --token-overlap 64
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.rag.chunking import SEPARATORS, RecursiveChunker, get_tokenizer
+from src.rag.engine import RAGEngine
+from src.rag.extraction import iter_page_chunks, iter_pdf_pages
+from src.rag.storage import PASSAGE_PREFIX
+
+class LengthFunctionChunker(RecursiveChunker):
+    """Token sizes through the splitter's length_function (the naive approach)."""
+    def __init__(self, chunk_size: int, chunk_overlap: int, tokenizer):
+        super().__init__(chunk_size, chunk_overlap)
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+        self.splitter = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            length_function=lambda text: len(tokenizer.encode(text, add_special_tokens=False)),
+            separators=SEPARATORS,
+        )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory", nargs="?", default=os.path.join("src", "documents"))
+    parser.add_argument("--model", default=RAGEngine.EMBEDDING_MODEL)
+    parser.add_argument("--char-size", type=int, default=RAGEngine.CHUNK_DEFAULTS["chars"][0])
+    parser.add_argument("--char-overlap", type=int, default=RAGEngine.CHUNK_DEFAULTS["chars"][1])
+    parser.add_argument("--token-size", type=int, default=RAGEngine.CHUNK_DEFAULTS["tokens"][0])
+    parser.add_argument("--token-overlap", type=int, default=RAGEngine.CHUNK_DEFAULTS["tokens"][1])
+    parser.add_argument("--window", type=int, default=RAGEngine.EMBEDDING_MAX_TOKENS)
+    args = parser.parse_args()
+
+    pdf_files = sorted(glob.glob(os.path.join(args.directory, "*.pdf")))
+    if not pdf_files:
+        raise SystemExit(f"No PDFs in {args.directory}")
+    documents = [list(iter_pdf_pages(f)) for f in pdf_files]
+    tokenizer = get_tokenizer(args.model)
+
+    modes = {
+        "chars": RecursiveChunker(args.char_size, args.char_overlap),
+        "tokens-lenfn": LengthFunctionChunker(args.token_size, args.token_overlap, tokenizer),
+        "tokens": RecursiveChunker(args.token_size, args.token_overlap, unit="tokens", tokenizer=tokenizer),
+    }
+
+    print(f"Model: {args.model}  PDFs: {len(pdf_files)}  pages: {sum(len(d) for d in documents)}  "
+          f"window: {args.window} tokens")
+    print(f"{'mode':>13} {'seconds':>8} {'chunks':>7} {'mean':>6} {'p50':>5} {'p95':>5} {'max':>5} "
+          f"{'over %':>7} {'lost tokens':>12}")
+    for name, chunker in modes.items():
+        start = time.perf_counter()
+        chunks = [c["text"] for pages in documents for c in iter_page_chunks(iter(pages), chunker)]
+        elapsed = time.perf_counter() - start
+
+        encoded = tokenizer([f"{PASSAGE_PREFIX}{c}" for c in chunks], add_special_tokens=True)["input_ids"]
+        lengths = sorted(len(ids) for ids in encoded)
+        over = [n for n in lengths if n > args.window]
+        print(f"{name:>13} {elapsed:>8.2f} {len(lengths):>7} {sum(lengths) / len(lengths):>6.0f} "
+              f"{lengths[len(lengths) // 2]:>5} {lengths[int(len(lengths) * 0.95) - 1]:>5} {lengths[-1]:>5} "
+              f"{100 * len(over) / len(lengths):>6.1f}% {sum(n - args.window for n in over):>12}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Recall vs memory for compact vector storage: the HNSW index keeps only the
+first D dims of each embedding (Matryoshka-style truncation), optionally
+followed by a full-precision rescoring pass over the top k * factor
+candidates (float16 vectors from the embedding cache, as RAGEngine does
+with vector_dims set).
+
+Corpus: the chunks of an existing persist directory, with their vectors
+from the embedding cache. Queries are the opening words of sampled chunks
+("query: ..."), embedded with the engine's backend. Two views, both with
+the lab_05 metrics:
+  - self-retrieval: the source chunk is the relevant doc (hit rate, MRR)
+  - fidelity: the exact float32 top-k is the relevant set (recall@k)
+Search is brute force, so the numbers isolate the vector compression
+from HNSW's own approximation.
+
+--synthetic runs the same report on generated vectors (no model needed).
+
+Usage (from project_starter/):
+    python benchmarks/bench_vector_compression.py --persist-directory ./chroma_db --queries 300
+    python benchmarks/bench_vector_compression.py --synthetic --chunks 20000
+"""
+import argparse
+import os
+import random
+import sys
+
+import numpy as np
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.rag.metrics import hit_rate_at_k, mean_reciprocal_rank, recall_at_k
+from src.rag.storage import PASSAGE_PREFIX, chunk_text
+from src.rag.vectors import index_bytes, truncate
+
+def load_corpus(persist_directory: str, queries: int, seed: int):
+    from src.rag.engine import RAGEngine
+
+    engine = RAGEngine(persist_directory=persist_directory)
+    texts, offset = [], 0
+    while True:
+        page = engine.collection.get(limit=1000, offset=offset, include=["metadatas", "documents"])
+        if not page["ids"]:
+            break
+        texts += [chunk_text(m, d) for m, d in zip(page["metadatas"], page["documents"])]
+        offset += len(page["ids"])
+    if not texts:
+        raise SystemExit(f"No chunks in {persist_directory}; ingest documents first.")
+
+    corpus = np.asarray(engine._embed_passages([f"{PASSAGE_PREFIX}{t}" for t in texts]), dtype=np.float32)
+    sample = random.Random(seed).sample(range(len(texts)), min(queries, len(texts)))
+    query_texts = [f"query: {' '.join(texts[i].split()[:12])}" for i in sample]
+    return corpus, np.asarray(engine.embedding_fn(query_texts), dtype=np.float32), sample
+
+def synthetic_corpus(chunks: int, queries: int, dims: int, seed: int):
+    # Decaying per-dimension variance mimics the energy profile truncation relies on
+    rng = np.random.default_rng(seed)
+    scale = 1.0 / np.sqrt(np.arange(1, dims + 1))
+    corpus = rng.standard_normal((chunks, dims)).astype(np.float32) * scale
+    sample = rng.choice(chunks, size=min(queries, chunks), replace=False).tolist()
+    noise = rng.standard_normal((len(sample), dims)).astype(np.float32) * scale
+    return corpus, corpus[sample] + 0.8 * noise, sample
+
+def top_k(queries: np.ndarray, corpus: np.ndarray, k: int) -> np.ndarray:
+    scores = queries @ corpus.T
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.take_along_axis(scores, top, axis=1).argsort(axis=1)[:, ::-1]
+    return np.take_along_axis(top, order, axis=1)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--persist-directory", default="./chroma_db")
+    parser.add_argument("--synthetic", action="store_true")
+    parser.add_argument("--chunks", type=int, default=20000, help="Synthetic corpus size")
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--dims", type=int, nargs="+", default=[768, 512, 384, 256, 128, 64])
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--rescore-factor", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.synthetic:
+        corpus, queries, sample = synthetic_corpus(args.chunks, args.queries, max(args.dims), args.seed)
+    else:
+        corpus, queries, sample = load_corpus(args.persist_directory, args.queries, args.seed)
+    full_dims = corpus.shape[1]
+    corpus, queries = truncate(corpus, None), truncate(queries, None)
+    rescore_corpus = corpus.astype(np.float16).astype(np.float32)  # what the embedding cache holds
+
+    k = args.k
+    exact = top_k(queries, corpus, k)
+    self_relevant = [{str(i)} for i in sample]
+    exact_relevant = [{str(i) for i in row} for row in exact]
+
+    print(f"Chunks: {len(corpus)}  queries: {len(queries)}  full dims: {full_dims}  k: {k}  "
+          f"rescore: top {k * args.rescore_factor}")
+    print(f"{'dims':>5} {'rescore':>8} {'index MB':>9} {'mem %':>6} {'hit@k':>7} {'MRR':>7} {'recall@k vs exact':>18}")
+    full_bytes = index_bytes(len(corpus), full_dims)
+    for dims in sorted({d for d in args.dims if d <= full_dims}, reverse=True):
+        first_stage = truncate(corpus, dims)
+        query_stage = truncate(queries, dims)
+        for rescore in ((False,) if dims == full_dims else (False, True)):
+            if rescore:
+                candidates = top_k(query_stage, first_stage, k * args.rescore_factor)
+                scores = np.einsum("qd,qcd->qc", queries, rescore_corpus[candidates])
+                ranked = np.take_along_axis(candidates, scores.argsort(axis=1)[:, ::-1], axis=1)[:, :k]
+            else:
+                ranked = top_k(query_stage, first_stage, k)
+            retrieved = [[str(i) for i in row] for row in ranked]
+            size = index_bytes(len(corpus), dims)
+            print(f"{dims:>5} {'yes' if rescore else 'no':>8} {size / 1e6:>9.1f} {100 * size / full_bytes:>5.0f}% "
+                  f"{hit_rate_at_k(retrieved, self_relevant, k):>7.3f} "
+                  f"{mean_reciprocal_rank(retrieved, self_relevant):>7.3f} "
+                  f"{recall_at_k(retrieved, exact_relevant, k):>18.3f}")
+
+if __name__ == "__main__":
+    main()
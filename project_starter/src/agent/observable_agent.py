@@ -169,7 +169,8 @@ class ObservableAgent:
                         tool_start = time.time()
                          
                         try:
-                            result = registry.execute_tool(tool_name, **tool_args)
+                            # Off the event loop, so other agents keep running during retrieval
+                            result = await registry.aexecute_tool(tool_name, **tool_args)
                         except Exception as e:
                             result = f"Error: {str(e)}"
                             
@@ -31,6 +31,8 @@ def create_researcher(model: str = DEFAULT_MODEL, max_steps: int = 15):
         1. **Step 1: Internal Search**
            - Call `search_knowledge_base`.
            - Expand the user query into professional keywords (e.g., if user says 'days in month', search for 'عدد أيام الشهر في نظام العمل').
+           - Pass your keyword expansions in `related_queries` so they are all searched in ONE call.
+           - If the question is about one specific regulation or bylaw, call `list_knowledge_sources` and pass its name as `source` (or `source_type='web'` for HRSD pages) to keep unrelated documents out of the results.
         
         2. **Step 2: Verification & MANDATORY Fallback (DO NOT SKIP)**
            - Evaluate the output from Step 1. Ask yourself: "Does this text contain the specific, factual answer to the user's query?"
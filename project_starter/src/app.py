@@ -17,7 +17,7 @@ st.set_page_config(
 
 sys.path.append(str(Path(__file__).parent.parent))
 from src.agent.specialists import create_researcher, create_analyst, create_writer
-from src.rag.engine import rag_engine
+from src.rag.compression import compress_handoff
 load_dotenv()
 
 st.markdown("""
@@ -61,11 +61,13 @@ async def run_agents_pipeline(query):
         status.update(label="✅ تم العثور على المراجع", state="complete")
 
     with st.status("⚖️ جاري التحليل النظامي...", expanded=False) as status:
-        analyst_input = f"User Query: {query}\n\nResearch Data:\n{research_result['answer']}"
+        research_data = await compress_handoff(query, research_result['answer'])
+        analyst_input = f"User Query: {query}\n\nResearch Data:\n{research_data}"
         analysis_result = await analyst.run(analyst_input)
         status.update(label="✅ تم الانتهاء من التحليل القانوني", state="complete")
 
-    writer_input = f"Original Query: {query}\n\nLegal Analysis:\n{analysis_result['answer']}"
+    legal_analysis = await compress_handoff(query, analysis_result['answer'])
+    writer_input = f"Original Query: {query}\n\nLegal Analysis:\n{legal_analysis}"
     final_output = await writer.run(writer_input)
     
     return final_output['answer'], research_result['answer']
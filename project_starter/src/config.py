@@ -6,4 +6,50 @@ load_dotenv()
 class Config:
     OPENAI_API_KEY = os.getenv("GEMINI_API_TOKEN")
     MODEL_NAME = os.getenv("MODEL_NAME", "gemini/gemini-1.5-pro")
+    # RAG: "dense" (vectors only) or "hybrid" (BM25 + vectors fused with RRF)
+    RAG_SEARCH_MODE = os.getenv("RAG_SEARCH_MODE", "hybrid")
+    # RAG reranking: over-fetch candidates, keep the top-k above a cross-encoder score threshold
+    RAG_RERANK = os.getenv("RAG_RERANK", "true").lower() == "true"
+    RAG_RERANK_CANDIDATES = int(os.getenv("RAG_RERANK_CANDIDATES", "20"))
+    RAG_RERANK_TOP_K = int(os.getenv("RAG_RERANK_TOP_K", "4"))
+    RAG_RERANK_MIN_SCORE = float(os.getenv("RAG_RERANK_MIN_SCORE", "0.05"))
+    # RAG query cache: result TTL in seconds, and whether it persists across restarts
+    RAG_QUERY_CACHE_TTL = float(os.getenv("RAG_QUERY_CACHE_TTL", "3600"))
+    RAG_QUERY_CACHE_ON_DISK = os.getenv("RAG_QUERY_CACHE_ON_DISK", "true").lower() == "true"
+    # RAG embeddings: "sentence-transformers" (fp32 PyTorch), "onnx" or "onnx-int8" (ONNX Runtime, CPU)
+    RAG_EMBEDDING_BACKEND = os.getenv("RAG_EMBEDDING_BACKEND", "sentence-transformers")
+    # RAG vector index: keep only the first N embedding dims in HNSW (0 = full 768);
+    # candidates are rescored with the full vectors from the embedding cache
+    RAG_VECTOR_DIMS = int(os.getenv("RAG_VECTOR_DIMS", "0")) or None
+    # RAG near-duplicate suppression: MinHash Jaccard threshold (0 = off)
+    RAG_DEDUP_THRESHOLD = float(os.getenv("RAG_DEDUP_THRESHOLD", "0.9")) or None
+    # RAG chunking: "chars" or "tokens" (e5 tokenizer lengths); size/overlap 0 = per-unit default
+    # (1000/200 chars, 480/64 tokens)
+    RAG_CHUNK_UNIT = os.getenv("RAG_CHUNK_UNIT", "chars")
+    RAG_CHUNK_SIZE = int(os.getenv("RAG_CHUNK_SIZE", "0")) or None
+    RAG_CHUNK_OVERLAP = int(os.getenv("RAG_CHUNK_OVERLAP", "0")) or None
+    # RAG small-to-big retrieval: embed small non-overlapping child chunks (400 chars / 128 tokens
+    # by default) and return their parent section (legal article, up to 2000 chars / 512 tokens)
+    RAG_PARENT_CHILD = os.getenv("RAG_PARENT_CHILD", "false").lower() == "true"
+    RAG_PARENT_CHUNK_SIZE = int(os.getenv("RAG_PARENT_CHUNK_SIZE", "0")) or None
+    # RAG ingestion pipeline: items buffered between stages (bounds memory, sets backpressure)
+    RAG_PIPELINE_QUEUE_SIZE = int(os.getenv("RAG_PIPELINE_QUEUE_SIZE", "8"))
+    # RAG site crawler (RAGEngine.crawl_site): link depth from the seeds, fetches per run
+    # (an unfinished crawl resumes on the next run) and concurrent requests per host
+    RAG_CRAWL_MAX_DEPTH = int(os.getenv("RAG_CRAWL_MAX_DEPTH", "2"))
+    RAG_CRAWL_MAX_PAGES = int(os.getenv("RAG_CRAWL_MAX_PAGES", "200"))
+    RAG_CRAWL_CONCURRENCY = int(os.getenv("RAG_CRAWL_CONCURRENCY", "4"))
+    # RAG HNSW index: M / ef_construction apply when the collection is built, ef_search on load.
+    # `python -m src.rag.tuning` measures them on the live collection and writes them to .env
+    RAG_HNSW_M = int(os.getenv("RAG_HNSW_M", "16"))
+    RAG_HNSW_CONSTRUCTION_EF = int(os.getenv("RAG_HNSW_CONSTRUCTION_EF", "200"))
+    RAG_HNSW_SEARCH_EF = int(os.getenv("RAG_HNSW_SEARCH_EF", "100"))
+    # RAG reindexing (RAGEngine.reindex): seconds a retired collection generation is kept
+    # after the switch, so other processes still reading it have time to reload
+    RAG_REINDEX_GRACE_S = float(os.getenv("RAG_REINDEX_GRACE_S", "3600"))
+    # RAG context compression: keep only the sentences closest to the query, within a token
+    # budget, in search_knowledge_base results and in each agent answer handed to the next agent
+    RAG_COMPRESSION = os.getenv("RAG_COMPRESSION", "true").lower() == "true"
+    RAG_COMPRESSION_TOKEN_BUDGET = int(os.getenv("RAG_COMPRESSION_TOKEN_BUDGET", "600"))
+    RAG_HANDOFF_TOKEN_BUDGET = int(os.getenv("RAG_HANDOFF_TOKEN_BUDGET", "800"))
     # Add other configuration as needed
@@ -9,10 +9,12 @@ from pathlib import Path
 load_dotenv(dotenv_path=Path(__file__).parent.parent.parent / ".env")
 
 from src.agent.specialists import create_researcher, create_analyst, create_writer
+from src.rag.compression import compress_handoff
+from src.config import Config
 from src.observability.tracer import tracer # TODO: Unleash the tracer
 from src.observability.cost_tracker import CostTracker
 import src.tools.search_tool
-from src.rag.engine import rag_engine
+from src.rag.engine import get_rag_engine
 import src.tools.rag_tool
 from src.tools.registry import registry
 
@@ -56,9 +58,16 @@ def setup_knowledge_base():
     تجهيز قاعدة المعرفة (RAG): قراءة الرابط والمجلد الكامل للـ PDFs.
     """
     print_separator("0. KNOWLEDGE BASE INGESTION")
+    rag_engine = get_rag_engine()
     
+    # Crawl the regulations portal (pages + linked PDFs); an unfinished crawl resumes next run
     target_url = "https://www.hrsd.gov.sa/knowledge-centre/decisions-and-regulations"
-    rag_engine.ingest_url(target_url)
+    rag_engine.crawl_site(
+        target_url,
+        max_depth=Config.RAG_CRAWL_MAX_DEPTH,
+        max_pages=Config.RAG_CRAWL_MAX_PAGES,
+        per_host_concurrency=Config.RAG_CRAWL_CONCURRENCY,
+    )
     
 
     pdf_directory = os.path.join("src", "documents")
@@ -96,22 +105,27 @@ async def main():
     print(f"Research Output: {research_result['answer'][:300]}...\n")
     #2
     print_separator("2. ANALYST (LOGIC)")
+    # Each handoff carries only the sentences relevant to the query, not the whole previous answer
+    research_data = await compress_handoff(query, research_result['answer'])
     analyst_input = (
         f"User Query: {query}\n\n"
-        f"Research Data (Regulations found):\n{research_result['answer']}"
+        f"Research Data (Regulations found):\n{research_data}"
     )
     analysis_result = await analyst.run(analyst_input)
     print(f"Analysis Output: {analysis_result['answer'][:300]}...\n")
     #3
     print_separator("3. WRITER (FINAL REPORT)")
+    legal_analysis = await compress_handoff(query, analysis_result['answer'])
     writer_input = (
         f"Original Query: {query}\n\n"
-        f"Legal Analysis:\n{analysis_result['answer']}"
+        f"Legal Analysis:\n{legal_analysis}"
     )
     final_output = await writer.run(writer_input)
     
     print_separator("FINAL RESPONSE")
     print(final_output['answer'])
+    if Config.RAG_COMPRESSION:
+        print(f"\nContext compression: {get_rag_engine().compressor.stats()}")
     print_separator("SESSION END")
 
 if __name__ == "__main__":
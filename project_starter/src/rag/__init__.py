@@ -0,0 +1 @@
+# RAG module
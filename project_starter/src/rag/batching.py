@@ -0,0 +1,85 @@
+import asyncio
+import json
+import logging
+from concurrent.futures import Executor
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+class QueryBatcher:
+    """
+    Coalesces concurrent async searches into micro-batches.
+
+    Queries that arrive within max_wait_ms of each other (and share
+    n_results / mode / where) are sent to the executor as one
+    search_many() call, i.e. one embedding forward pass and one
+    collection.query for the whole batch.
+    """
+    def __init__(
+        self,
+        search_many: Callable[..., list[list[dict]]],
+        executor: Executor,
+        max_batch: int = 32,
+        max_wait_ms: float = 5.0,
+    ):
+        self.search_many = search_many
+        self.executor = executor
+        self.max_batch = max_batch
+        self.max_wait_ms = max_wait_ms
+        # (loop, group key) -> pending (query, future) pairs; only touched from that loop's thread
+        self._pending: dict[tuple, list[tuple[str, asyncio.Future]]] = {}
+        # Wait timers of the open groups, cancelled when a full batch flushes early
+        self._timers: dict[tuple, asyncio.TimerHandle] = {}
+        # The loop only keeps weak references to tasks; hold them until they finish
+        self._tasks: set[asyncio.Task] = set()
+        self.batches = 0
+        self.queries = 0
+
+    async def search(self, query: str, n_results: int = 5, mode: str = "dense", where: dict | None = None) -> list[dict]:
+        loop = asyncio.get_running_loop()
+        key = (loop, n_results, mode, json.dumps(where, sort_keys=True) if where else None)
+        future = loop.create_future()
+
+        pending = self._pending.setdefault(key, [])
+        pending.append((query, future))
+        if len(pending) == 1:
+            self._timers[key] = loop.call_later(self.max_wait_ms / 1000, self._flush, key, where)
+        elif len(pending) >= self.max_batch:
+            self._flush(key, where)
+        return await future
+
+    def _flush(self, key: tuple, where: dict | None):
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(key, None)
+        if not batch:
+            return
+        loop, n_results, mode, _ = key
+        task = loop.create_task(self._run(loop, batch, n_results, mode, where))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, loop, batch, n_results: int, mode: str, where: dict | None):
+        self.batches += 1
+        self.queries += len(batch)
+        queries = [query for query, _ in batch]
+        try:
+            results = await loop.run_in_executor(
+                self.executor, lambda: self.search_many(queries, n_results=n_results, where=where, mode=mode)
+            )
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "queries": self.queries,
+            "avg_batch_size": round(self.queries / self.batches, 2) if self.batches else 0.0,
+        }
@@ -0,0 +1,140 @@
+import json
+import logging
+import os
+import re
+import time
+from dataclasses import asdict, dataclass, field
+
+logger = logging.getLogger(__name__)
+
+CATALOG_FILENAME = "source_catalog.json"
+SOURCE_TYPES = ("pdf", "web")
+
+_ARABIC = re.compile(r"[\u0600-\u06FF\u0750-\u077F\uFB50-\uFDFF\uFE70-\uFEFF]")
+_LATIN = re.compile(r"[A-Za-z]")
+
+def detect_language(text: str) -> str:
+    """Cheap script-based guess: "ar", "en", "mixed" or "unknown"."""
+    arabic = len(_ARABIC.findall(text))
+    latin = len(_LATIN.findall(text))
+    letters = arabic + latin
+    if not letters:
+        return "unknown"
+    if arabic / letters >= 0.7:
+        return "ar"
+    if latin / letters >= 0.7:
+        return "en"
+    return "mixed"
+
+def build_where(
+    source: str | list[str] | None = None,
+    source_type: str | None = None,
+    language: str | None = None,
+    ingested_after: float | None = None,
+) -> dict | None:
+    """Chroma `where` filter from simple fields; None when there is nothing to filter on."""
+    clauses = []
+    if source:
+        clauses.append({"source": {"$in": source}} if isinstance(source, list) else {"source": source})
+    if source_type:
+        clauses.append({"source_type": source_type})
+    if language:
+        clauses.append({"language": language})
+    if ingested_after is not None:
+        clauses.append({"ingested_at": {"$gte": ingested_after}})
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+@dataclass
+class SourceRecord:
+    source: str
+    source_type: str
+    title: str
+    language: str
+    chunks: int = 0
+    pages: int = 0
+    ingested_at: float = field(default_factory=time.time)
+
+@dataclass
+class SourceSwap:
+    """
+    Chunk ids of one or more sources being re-ingested: the stored version
+    (old_ids) and the chunks written by this ingest (new_ids), and the same
+    for their parent sections in the parent/child layout and for their
+    near-duplicates held back by the dedup index. Chunks the new version
+    rewrites in place keep their previous metadata in old_metadatas, so a
+    rollback can put it back.
+    """
+    sources: list[str]
+    old_ids: set[str]
+    new_ids: set[str] = field(default_factory=set)
+    failed: bool = False
+    old_metadatas: dict[str, dict] = field(default_factory=dict)
+    old_held_ids: set[str] = field(default_factory=set)
+    held_ids: set[str] = field(default_factory=set)
+    old_parent_ids: set[str] = field(default_factory=set)
+    new_parent_ids: set[str] = field(default_factory=set)
+
+    @property
+    def stale_ids(self) -> set[str]:
+        return self.old_ids - self.new_ids
+
+    @property
+    def added_ids(self) -> set[str]:
+        return self.new_ids - self.old_ids
+
+class SourceCatalog:
+    """
+    One record per ingested source (PDF file name or URL): type, title,
+    language, size and ingestion time. Small enough to list to the agent,
+    and the place to look up valid values for `where` filters.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._records: dict[str, SourceRecord] = {}
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self._records = {key: SourceRecord(**rec) for key, rec in data.get("sources", {}).items()}
+        except (OSError, ValueError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable source catalog {self.path}: {e}")
+            self._records = {}
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"sources": {key: asdict(rec) for key, rec in self._records.items()}}, f, indent=2, ensure_ascii=False
+            )
+        os.replace(tmp_path, self.path)
+
+    def record(self, source: str, source_type: str, title: str, language: str, chunks: int, pages: int = 0):
+        self._records[source] = SourceRecord(
+            source=source, source_type=source_type, title=title, language=language, chunks=chunks, pages=pages
+        )
+
+    def get(self, source: str) -> SourceRecord | None:
+        return self._records.get(source)
+
+    def remove(self, source: str):
+        self._records.pop(source, None)
+
+    def list(self, source_type: str | None = None, language: str | None = None) -> list[SourceRecord]:
+        return [
+            rec for rec in sorted(self._records.values(), key=lambda r: r.source)
+            if (source_type is None or rec.source_type == source_type)
+            and (language is None or rec.language == language)
+        ]
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __contains__(self, source: str) -> bool:
+        return source in self._records
@@ -0,0 +1,239 @@
+import bisect
+import functools
+import re
+from dataclasses import dataclass, field
+
+SEPARATORS = ["\n\n", "\n", ". ", " ", ""]
+# Start of a legal article / section: "المادة الأولى", "مادة (12)", "Article 5", "Section 3"
+ARTICLE_HEADING = re.compile(r"(?m)^[ \t]*(?:المادة|مادة|Article|ARTICLE|Section|SECTION)\b")
+
+@functools.lru_cache(maxsize=4)
+def get_tokenizer(name: str):
+    """Fast tokenizer for a model, loaded once per process."""
+    from transformers import AutoTokenizer
+
+    return AutoTokenizer.from_pretrained(name, use_fast=True)
+
+@dataclass
+class ChunkStats:
+    """Chunk-length distribution for one ingest, in the chunker's unit."""
+    unit: str = "chars"
+    limit: int | None = None  # embedding window in tokens (token mode only)
+    lengths: list[int] = field(default_factory=list)
+    over_limit: int = 0
+
+    def add(self, length: int):
+        self.lengths.append(length)
+        if self.limit and length > self.limit:
+            self.over_limit += 1
+
+    def merge(self, other: "ChunkStats"):
+        self.lengths.extend(other.lengths)
+        self.over_limit += other.over_limit
+
+    def summary(self) -> str:
+        if not self.lengths:
+            return "no chunks"
+        lengths = sorted(self.lengths)
+        text = (
+            f"{len(lengths)} chunks, {self.unit} mean {sum(lengths) / len(lengths):.0f} / "
+            f"p50 {lengths[len(lengths) // 2]} / p95 {lengths[min(len(lengths) - 1, int(len(lengths) * 0.95))]} / "
+            f"max {lengths[-1]}"
+        )
+        if self.limit:
+            text += f", {self.over_limit} over the {self.limit}-token window"
+        return text
+
+class RecursiveChunker:
+    """
+    Recursive separator splitter with size measured in characters
+    (unit="chars", the langchain splitter) or in embedding-model tokens
+    (unit="tokens").
+
+    In token mode each text is tokenized once with the model's fast
+    tokenizer; the splitter then works on character spans and measures any
+    span by bisecting the token start offsets, instead of re-tokenizing
+    candidate pieces through a length function.
+    """
+    def __init__(
+        self,
+        chunk_size=1000,
+        chunk_overlap=200,
+        unit: str = "chars",
+        tokenizer_name: str | None = None,
+        tokenizer=None,
+        token_limit: int | None = None,
+    ):
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.unit = unit
+        self.tokenizer_name = tokenizer_name
+        self.token_limit = token_limit
+        self.stats = ChunkStats(unit, token_limit if unit == "tokens" else None)
+        if unit == "tokens":
+            if tokenizer is None:
+                if not tokenizer_name:
+                    raise ValueError("Token-length chunking needs a tokenizer or tokenizer_name")
+                tokenizer = get_tokenizer(tokenizer_name)
+            # The Rust tokenizer: offsets without special tokens or max-length warnings
+            self._tokenizer = getattr(tokenizer, "backend_tokenizer", tokenizer)
+            self.splitter = None
+        elif unit == "chars":
+            # Deferred: langchain_text_splitters pulls in langchain_core (~0.5s)
+            from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+            self.splitter = RecursiveCharacterTextSplitter(
+                chunk_size=chunk_size,
+                chunk_overlap=chunk_overlap,
+                length_function=len,
+                separators=SEPARATORS
+            )
+        else:
+            raise ValueError(f"Unknown chunk unit: {unit}")
+
+    def reset_stats(self) -> ChunkStats:
+        self.stats = ChunkStats(self.unit, self.stats.limit)
+        return self.stats
+
+    def split_text(self, text: str) -> list[str]:
+        spans = self.split_spans(text)
+        for _, _, _, length in spans:
+            self.stats.add(length)
+        return [chunk for chunk, _, _, _ in spans]
+
+    def split_spans(self, text: str) -> list[tuple[str, int, int, int]]:
+        """(chunk, start, end, length) with [start, end) character offsets in text; not counted in stats."""
+        if self.unit == "tokens":
+            return self._token_spans(text)
+        return [(chunk, start, end, end - start) for chunk, start, end in self._locate(text)]
+
+    # ---- character mode ---------------------------------------------------
+
+    def _locate(self, text: str):
+        # The langchain splitter returns strings only; find them back in order
+        cursor = 0
+        for chunk in self.splitter.split_text(text):
+            start = text.find(chunk, cursor)
+            if start == -1:
+                start = cursor
+            end = start + len(chunk)
+            yield chunk, start, end
+            # With overlap the next chunk starts before this one ends
+            cursor = max(start + 1, end - self.chunk_overlap)
+
+    # ---- token mode -------------------------------------------------------
+
+    def _token_spans(self, text: str) -> list[tuple[str, int, int, int]]:
+        starts = [start for start, _ in self._tokenizer.encode(text, add_special_tokens=False).offsets]
+
+        def length(a: int, b: int) -> int:
+            return bisect.bisect_left(starts, b) - bisect.bisect_left(starts, a)
+
+        spans = []
+        for a, b in self._split(text, 0, len(text), SEPARATORS, length):
+            while a < b and text[a].isspace():
+                a += 1
+            while b > a and text[b - 1].isspace():
+                b -= 1
+            if a < b:
+                spans.append((text[a:b], a, b, length(a, b)))
+        return spans
+
+    def _split(self, text: str, a: int, b: int, separators: list[str], length) -> list[tuple[int, int]]:
+        if length(a, b) <= self.chunk_size:
+            return [(a, b)]
+        for index, separator in enumerate(separators):
+            if separator == "":
+                return self._hard_split(a, b, length)
+            if text.find(separator, a, b) != -1:
+                break
+        pieces = []
+        start = a
+        while start < b:
+            cut = text.find(separator, start, b)
+            end = b if cut == -1 else cut + len(separator)
+            pieces.append((start, end))
+            start = end
+        return self._merge(text, pieces, separators[index + 1:], length)
+
+    def _hard_split(self, a: int, b: int, length) -> list[tuple[int, int]]:
+        # No separator left: cut every chunk_size tokens, stepping back by the overlap
+        spans, start = [], a
+        step = max(self.chunk_size - self.chunk_overlap, 1)
+        while start < b:
+            end = start
+            while end < b and length(start, end + 1) <= self.chunk_size:
+                end += 1
+            end = max(end, start + 1)
+            spans.append((start, end))
+            if end >= b:
+                break
+            next_start = start
+            while next_start < end and length(start, next_start) < step:
+                next_start += 1
+            start = max(next_start, start + 1)
+        return spans
+
+    def _merge(self, text: str, pieces, separators: list[str], length) -> list[tuple[int, int]]:
+        chunks: list[tuple[int, int]] = []
+        current: list[tuple[int, int, int]] = []
+        total = 0
+        for a, b in pieces:
+            size = length(a, b)
+            if size > self.chunk_size:
+                if current:
+                    chunks.append((current[0][0], current[-1][1]))
+                    current, total = [], 0
+                chunks.extend(self._split(text, a, b, separators, length))
+                continue
+            if current and total + size > self.chunk_size:
+                chunks.append((current[0][0], current[-1][1]))
+                # Keep trailing pieces (up to chunk_overlap) as the start of the next chunk
+                while current and (total > self.chunk_overlap or total + size > self.chunk_size):
+                    total -= current.pop(0)[2]
+            current.append((a, b, size))
+            total += size
+        if current:
+            chunks.append((current[0][0], current[-1][1]))
+        return chunks
+
+
+class SectionChunker(RecursiveChunker):
+    """
+    Parent sections for the parent/child layout: text is cut at article
+    headings (ARTICLE_HEADING) into sections of at most chunk_size, without
+    overlap. An article longer than chunk_size is split with the recursive
+    splitter; a fragment shorter than min_size (a chapter title, a short
+    preamble) is packed with the section after it. Text without headings
+    gets plain size-bounded sections.
+    """
+    def __init__(
+        self,
+        chunk_size=2000,
+        unit: str = "chars",
+        tokenizer_name: str | None = None,
+        tokenizer=None,
+        heading: re.Pattern = ARTICLE_HEADING,
+        min_size: int | None = None,
+    ):
+        super().__init__(chunk_size, 0, unit=unit, tokenizer_name=tokenizer_name, tokenizer=tokenizer)
+        self.heading = heading
+        self.min_size = chunk_size // 8 if min_size is None else min_size
+
+    def split_spans(self, text: str) -> list[tuple[str, int, int, int]]:
+        cuts = [0, *(m.start() for m in self.heading.finditer(text) if m.start() > 0), len(text)]
+        pieces = []
+        for a, b in zip(cuts, cuts[1:]):
+            if text[a:b].strip():
+                pieces.extend((a + start, a + end, length) for _, start, end, length in super().split_spans(text[a:b]))
+
+        sections: list[list[int]] = []
+        for start, end, length in pieces:
+            if sections and sections[-1][2] < self.min_size:
+                previous = sections[-1]
+                merged = end - previous[0] if self.unit == "chars" else previous[2] + length
+                if merged <= self.chunk_size:
+                    previous[1], previous[2] = end, merged
+                    continue
+            sections.append([start, end, length])
+        return [(text[start:end], start, end, length) for start, end, length in sections]
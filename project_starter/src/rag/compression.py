@@ -0,0 +1,241 @@
+import logging
+import math
+import re
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable
+
+import numpy as np
+
+from src.config import Config
+
+logger = logging.getLogger(__name__)
+
+# Sentence ends (Latin and Arabic punctuation) and line breaks; markdown bullets are their own units
+_SENTENCE_END = re.compile(r"(?<=[.!?؟۔])\s+|\s*\n+\s*")
+# A line that only cites: "Source: r1.pdf", "المصدر: ...", a bare URL
+_CITATION_LINE = re.compile(
+    r"^\W*(?:sources?|references?|citations?|المصدر|المصادر|المرجع|المراجع)\b.*$|^\W*https?://\S+\W*$",
+    re.IGNORECASE,
+)
+GAP = " … "
+
+def split_sentences(text: str) -> list[str]:
+    return [sentence.strip() for sentence in _SENTENCE_END.split(text or "") if sentence and sentence.strip()]
+
+def approx_tokens(text: str) -> int:
+    """Rough token count (about 4 characters per token) when no tokenizer is available."""
+    return math.ceil(len(text) / 4)
+
+class TokenCounter:
+    """Token counts with the embedding model's fast tokenizer, loaded on first use; falls back to approx_tokens."""
+    def __init__(self, tokenizer_name: str | None = None):
+        self.tokenizer_name = tokenizer_name
+        self._tokenizer = None
+        self._failed = tokenizer_name is None
+        self._lock = threading.Lock()
+
+    def __call__(self, text: str) -> int:
+        if not self._failed and self._tokenizer is None:
+            with self._lock:
+                if not self._failed and self._tokenizer is None:
+                    try:
+                        from src.rag.chunking import get_tokenizer
+
+                        tokenizer = get_tokenizer(self.tokenizer_name)
+                        self._tokenizer = getattr(tokenizer, "backend_tokenizer", tokenizer)
+                    except Exception as e:
+                        logger.warning(f"Tokenizer {self.tokenizer_name} unavailable, estimating tokens: {e}")
+                        self._failed = True
+        if self._tokenizer is None:
+            return approx_tokens(text)
+        return len(self._tokenizer.encode(text, add_special_tokens=False).ids)
+
+@dataclass
+class CompressionReport:
+    tokens_in: int = 0
+    tokens_out: int = 0
+    sentences_in: int = 0
+    sentences_kept: int = 0
+    elapsed_ms: float = 0.0
+    skipped: bool = False  # already within budget
+
+    @property
+    def ratio(self) -> float:
+        """Output tokens / input tokens (1.0 = nothing removed)."""
+        return self.tokens_out / self.tokens_in if self.tokens_in else 1.0
+
+    def summary(self) -> str:
+        if self.skipped:
+            return f"{self.tokens_in} tokens, within budget ({self.elapsed_ms:.1f}ms)"
+        return (
+            f"{self.tokens_in} -> {self.tokens_out} tokens ({100 * (1 - self.ratio):.0f}% removed), "
+            f"{self.sentences_kept}/{self.sentences_in} sentences kept in {self.elapsed_ms:.1f}ms"
+        )
+
+@dataclass
+class _Unit:
+    group: int  # result (or paragraph) the sentence belongs to
+    position: int
+    text: str
+    tokens: int
+    citation: bool = False
+
+class ContextCompressor:
+    """
+    Extractive compression of retrieved context: every sentence is scored
+    by cosine similarity to the query with the engine's embedding model, and
+    the best sentences are kept, in their original order, until the token
+    budget is spent. Retrieved chunks keep their source (and id); in free
+    text such as an agent's answer, citation lines ("Source: r1.pdf", URLs)
+    are kept together with the paragraph they cite.
+    """
+    def __init__(
+        self,
+        embed_query: Callable[[str], list[float]],
+        embed_passages: Callable[[list[str]], list],
+        count_tokens: Callable[[str], int] = approx_tokens,
+        token_budget: int = 600,
+        min_similarity: float | None = None,
+    ):
+        self.embed_query = embed_query
+        self.embed_passages = embed_passages
+        self.count_tokens = count_tokens
+        self.token_budget = token_budget
+        self.min_similarity = min_similarity
+        self._reports: deque[CompressionReport] = deque(maxlen=1000)
+
+    def _select(self, query: str, units: list[_Unit], budget: int) -> set[int]:
+        """Indexes of the units to keep: best-scoring sentences first, each with its group's citations."""
+        scored = [i for i, unit in enumerate(units) if not unit.citation]
+        if not scored:
+            return set(range(len(units)))
+        query_vector = np.asarray(self.embed_query(query), dtype=np.float32)
+        vectors = np.asarray(self.embed_passages([units[i].text for i in scored]), dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1) * (np.linalg.norm(query_vector) or 1.0)
+        similarities = vectors @ query_vector / np.where(norms == 0, 1.0, norms)
+
+        citations: dict[int, list[int]] = {}
+        for i, unit in enumerate(units):
+            if unit.citation:
+                citations.setdefault(unit.group, []).append(i)
+
+        kept, spent, cited = set(), 0, set()
+        for order in np.argsort(-similarities):
+            i = scored[order]
+            if self.min_similarity is not None and similarities[order] < self.min_similarity and kept:
+                break
+            extra = [] if units[i].group in cited else citations.get(units[i].group, [])
+            cost = units[i].tokens + sum(units[j].tokens for j in extra)
+            # The best sentence is always kept, even over budget
+            if spent + cost > budget and kept:
+                continue
+            kept.add(i)
+            kept.update(extra)
+            cited.add(units[i].group)
+            spent += cost
+        return kept
+
+    @staticmethod
+    def _join(units: list[_Unit]) -> str:
+        text = ""
+        for previous, unit in zip([None, *units], units):
+            if previous is not None:
+                text += GAP if unit.position != previous.position + 1 else " "
+            text += unit.text
+        return text
+
+    def compress(self, query: str, results: list[dict], token_budget: int | None = None) -> tuple[list[dict], CompressionReport]:
+        """
+        Shrink search results to their best sentences within token_budget
+        (total over all results). Results left with no sentence are dropped;
+        the others keep every field but "text", and record "original_tokens".
+        """
+        start = time.perf_counter()
+        budget = self.token_budget if token_budget is None else token_budget
+        units = [
+            _Unit(group, position, sentence, self.count_tokens(sentence))
+            for group, result in enumerate(results)
+            for position, sentence in enumerate(split_sentences(result["text"]))
+        ]
+        report = CompressionReport(tokens_in=sum(u.tokens for u in units), sentences_in=len(units))
+        if report.tokens_in <= budget:
+            report.tokens_out, report.sentences_kept, report.skipped = report.tokens_in, len(units), True
+            return self._finish(results, report, start)
+
+        kept = self._select(query, units, budget)
+        compressed = []
+        for group, result in enumerate(results):
+            chosen = [unit for i, unit in enumerate(units) if unit.group == group and i in kept]
+            if chosen:
+                compressed.append({
+                    **result,
+                    "text": self._join(chosen),
+                    "original_tokens": sum(u.tokens for u in units if u.group == group),
+                })
+        report.sentences_kept = len(kept)
+        report.tokens_out = sum(units[i].tokens for i in kept)
+        return self._finish(compressed, report, start)
+
+    def compress_text(self, query: str, text: str, token_budget: int | None = None) -> tuple[str, CompressionReport]:
+        """Shrink free text (e.g. one agent's answer handed to the next) to its best sentences within token_budget."""
+        start = time.perf_counter()
+        budget = self.token_budget if token_budget is None else token_budget
+        units = []
+        for group, paragraph in enumerate(re.split(r"\n\s*\n", text or "")):
+            for sentence in split_sentences(paragraph):
+                units.append(_Unit(
+                    group, len(units), sentence, self.count_tokens(sentence), bool(_CITATION_LINE.match(sentence))
+                ))
+        report = CompressionReport(tokens_in=sum(u.tokens for u in units), sentences_in=len(units))
+        if report.tokens_in <= budget:
+            report.tokens_out, report.sentences_kept, report.skipped = report.tokens_in, len(units), True
+            return self._finish(text, report, start)
+
+        kept = self._select(query, units, budget)
+        paragraphs = []
+        for group in dict.fromkeys(unit.group for unit in units):
+            chosen = [unit for i, unit in enumerate(units) if unit.group == group and i in kept]
+            if chosen:
+                paragraphs.append(self._join(chosen))
+        report.sentences_kept = len(kept)
+        report.tokens_out = sum(units[i].tokens for i in kept)
+        return self._finish("\n\n".join(paragraphs), report, start)
+
+    def _finish(self, output, report: CompressionReport, start: float):
+        report.elapsed_ms = (time.perf_counter() - start) * 1000
+        self._reports.append(report)
+        return output, report
+
+    def stats(self) -> dict:
+        reports = list(self._reports)
+        latencies = sorted(r.elapsed_ms for r in reports)
+        tokens_in = sum(r.tokens_in for r in reports)
+        tokens_out = sum(r.tokens_out for r in reports)
+        return {
+            "calls": len(reports),
+            "tokens_in": tokens_in,
+            "tokens_out": tokens_out,
+            "ratio": round(tokens_out / tokens_in, 3) if tokens_in else None,
+            "p50_ms": round(latencies[len(latencies) // 2], 1) if latencies else None,
+            "p99_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))], 1) if latencies else None,
+        }
+
+async def compress_handoff(query: str, text: str) -> str:
+    """
+    Shrink one agent's answer to the sentences (and their citations) closest
+    to the user query before it goes into the next agent's prompt.
+    """
+    if not Config.RAG_COMPRESSION or not text:
+        return text
+    from src.rag.engine import get_rag_engine
+
+    try:
+        compressed, report = await get_rag_engine().acompress_text(query, text, Config.RAG_HANDOFF_TOKEN_BUDGET)
+    except Exception as e:
+        logger.warning(f"Handoff compression skipped: {e}")
+        return text
+    logger.info(f"Handoff compression: {report.summary()}")
+    return compressed
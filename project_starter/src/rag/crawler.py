@@ -0,0 +1,302 @@
+"""
+Bounded same-site crawler feeding RAGEngine.crawl_site.
+
+Breadth-first from the seed URLs: pages are fetched concurrently (at most
+per_host_concurrency requests per host), links are normalized and
+deduplicated, and only hosts of the seeds (and their subdomains) are
+followed, up to max_depth links away and max_pages fetches per run. The
+frontier is saved to disk, so a crawl stopped by max_pages, an error or
+a restart resumes where it left off; a completed crawl clears it.
+"""
+import json
+import logging
+import os
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Iterable, Iterator
+from urllib.parse import parse_qsl, urldefrag, urlencode, urljoin, urlsplit, urlunsplit
+from urllib.robotparser import RobotFileParser
+
+from src.rag.fetching import HTML_PARSER, USER_AGENT, FetchResult, UrlFetchReport, UrlRecord, fetch
+
+logger = logging.getLogger(__name__)
+
+CRAWL_FRONTIER_FILENAME = "crawl_frontier.json"
+
+# Links to files the pipeline cannot ingest are never fetched
+SKIPPED_EXTENSIONS = (
+    ".jpg", ".jpeg", ".png", ".gif", ".svg", ".webp", ".ico", ".css", ".js", ".zip", ".rar",
+    ".doc", ".docx", ".xls", ".xlsx", ".ppt", ".pptx", ".mp3", ".mp4", ".avi", ".mov", ".xml", ".json",
+)
+_TRACKING_PARAMS = ("utm_", "fbclid", "gclid")
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+@dataclass
+class CrawlReport(UrlFetchReport):
+    pdfs: int = 0  # of the fetched sources
+    offsite_links: int = 0
+    disallowed: int = 0  # by robots.txt
+    frontier_left: int = 0  # URLs a resumed crawl will fetch
+
+    def summary(self) -> str:
+        return (
+            f"{super().summary()}; {self.pdfs} PDFs, {self.offsite_links} off-site links skipped, "
+            f"{self.disallowed} URLs disallowed by robots.txt, "
+            f"{self.frontier_left} URLs left in the frontier"
+        )
+
+def normalize_url(url: str, base: str | None = None) -> str | None:
+    """
+    Canonical form used for dedupe: absolute, http(s) only, lower-case
+    scheme and host, no default port, no fragment, no tracking parameters,
+    sorted query. Returns None for links that cannot be crawled.
+    """
+    url = (url or "").strip()
+    if base:
+        url = urljoin(base, url)
+    url, _ = urldefrag(url)
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return None
+    scheme = parts.scheme.lower()
+    if scheme not in _DEFAULT_PORTS or not parts.hostname:
+        return None
+    host = parts.hostname.lower()
+    if port and port != _DEFAULT_PORTS[scheme]:
+        host = f"{host}:{port}"
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith(_TRACKING_PARAMS)
+    )
+    return urlunsplit((scheme, host, parts.path or "/", urlencode(query), ""))
+
+def site_domain(url: str) -> str:
+    host = urlsplit(url).hostname or ""
+    return host[4:] if host.startswith("www.") else host
+
+def extract_links(html: str, base: str) -> list[str]:
+    """Normalized, deduplicated href targets of a page, in document order."""
+    from bs4 import BeautifulSoup, SoupStrainer
+
+    soup = BeautifulSoup(html, HTML_PARSER, parse_only=SoupStrainer(["a", "base"]))
+    base_tag = soup.find("base", href=True)
+    if base_tag is not None:
+        base = urljoin(base, base_tag["href"])
+    links = {}
+    for anchor in soup.find_all("a", href=True):
+        link = normalize_url(anchor["href"], base)
+        if link is not None:
+            links[link] = None
+    return list(links)
+
+class CrawlFrontier:
+    """
+    BFS frontier persisted as JSON: URLs still to fetch (with their depth)
+    and every URL already queued, so links are never queued twice.
+    """
+    def __init__(self, path: str | None = None):
+        self.path = path
+        self.queue: deque[tuple[str, int]] = deque()
+        self.seen: set[str] = set()
+        self.in_flight: dict[str, int] = {}
+        self._lock = threading.Lock()
+        if path:
+            self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.queue = deque((url, int(depth)) for url, depth in data.get("queue", []))
+            self.seen = set(data.get("seen", []))
+        except (OSError, ValueError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable crawl frontier {self.path}: {e}")
+            self.queue, self.seen = deque(), set()
+
+    def save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with self._lock:
+            # Fetches that had not completed are retried on resume
+            data = {
+                "queue": [[url, depth] for url, depth in self.in_flight.items()] + [list(item) for item in self.queue],
+                "seen": sorted(self.seen),
+            }
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        self.queue.clear()
+        self.seen.clear()
+        self.in_flight.clear()
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+    def add(self, url: str, depth: int) -> bool:
+        with self._lock:
+            if url in self.seen:
+                return False
+            self.seen.add(url)
+            self.queue.append((url, depth))
+            return True
+
+    def pop(self) -> tuple[str, int] | None:
+        with self._lock:
+            if not self.queue:
+                return None
+            url, depth = self.queue.popleft()
+            self.in_flight[url] = depth
+            return url, depth
+
+    def done(self, url: str):
+        with self._lock:
+            self.in_flight.pop(url, None)
+
+    def __len__(self) -> int:
+        return len(self.queue) + len(self.in_flight)
+
+class SiteCrawler:
+    """
+    crawl() yields (FetchResult, depth) for every HTML page and PDF fetched,
+    in frontier order; PDFs are streamed to files in download_dir.
+    record_for(url) returns the stored version of a URL (for conditional
+    GETs and, after a 304, its previously found links) or None.
+
+    A yielded URL stays in flight, and is fetched again by a resumed crawl,
+    until the consumer calls frontier.done(url) once it has been handled.
+    """
+    SAVE_EVERY = 50  # results between frontier checkpoints
+    def __init__(
+        self,
+        seeds: Iterable[str],
+        frontier: CrawlFrontier | None = None,
+        max_depth: int = 2,
+        max_pages: int = 200,
+        per_host_concurrency: int = 4,
+        allowed_domains: Iterable[str] | None = None,
+        respect_robots: bool = True,
+    ):
+        self.seeds = [url for url in (normalize_url(seed) for seed in seeds) if url]
+        self.frontier = frontier if frontier is not None else CrawlFrontier()
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.per_host_concurrency = max(1, per_host_concurrency)
+        self.allowed_domains = set(allowed_domains or (site_domain(seed) for seed in self.seeds))
+        self.respect_robots = respect_robots
+        self.fetched = 0
+        self.offsite_links = 0
+        self.disallowed = 0
+        self._host_slots: dict[str, threading.Semaphore] = {}
+        self._robots: dict[str, RobotFileParser | None] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def max_workers(self) -> int:
+        return self.per_host_concurrency * max(1, len(self.allowed_domains))
+
+    def allowed(self, url: str) -> bool:
+        host = site_domain(url)
+        return any(host == domain or host.endswith(f".{domain}") for domain in self.allowed_domains)
+
+    def _robots_for(self, session, url: str, timeout: float) -> RobotFileParser | None:
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        with self._lock:
+            if origin in self._robots:
+                return self._robots[origin]
+        parser = None
+        try:
+            response = session.get(f"{origin}/robots.txt", timeout=timeout)
+            if response.status_code == 200:
+                parser = RobotFileParser()
+                parser.parse(response.text.splitlines())
+        except Exception as e:
+            logger.info(f"No robots.txt for {origin}: {e}")
+        with self._lock:
+            self._robots[origin] = parser
+        return parser
+
+    def _fetch(self, session, url: str, record: UrlRecord | None, timeout: float, download_dir: str) -> FetchResult | None:
+        host = urlsplit(url).netloc
+        with self._lock:
+            slots = self._host_slots.setdefault(host, threading.Semaphore(self.per_host_concurrency))
+        with slots:
+            if self.respect_robots:
+                robots = self._robots_for(session, url, timeout)
+                if robots is not None and not robots.can_fetch(USER_AGENT, url):
+                    return None
+            return fetch(session, url, record, timeout, download_dir=download_dir)
+
+    def _enqueue_links(self, result: FetchResult, record: UrlRecord | None, depth: int):
+        # Links are kept even past max_depth so a deeper crawl can reuse them after a 304
+        if result.html:
+            result.links = extract_links(result.html, result.url)
+        elif result.unchanged and record is not None:
+            result.links = list(record.links)
+        if depth >= self.max_depth:
+            return
+        for link in result.links:
+            if not self.allowed(link):
+                self.offsite_links += 1
+            elif not urlsplit(link).path.lower().endswith(SKIPPED_EXTENSIONS):
+                self.frontier.add(link, depth + 1)
+
+    def crawl(
+        self,
+        session,
+        record_for: Callable[[str], UrlRecord | None],
+        download_dir: str,
+        timeout: float = 10.0,
+    ) -> Iterator[tuple[FetchResult, int]]:
+        for seed in self.seeds:
+            self.frontier.add(seed, 0)
+        window = 2 * self.max_workers
+        pending: deque[tuple[str, int, UrlRecord | None, Future]] = deque()
+        handled = 0
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="rag-crawl") as executor:
+            try:
+                while True:
+                    while len(pending) < window and self.fetched < self.max_pages:
+                        item = self.frontier.pop()
+                        if item is None:
+                            break
+                        url, depth = item
+                        record = record_for(url)
+                        pending.append((url, depth, record, executor.submit(
+                            self._fetch, session, url, record, timeout, download_dir
+                        )))
+                        self.fetched += 1
+                    if not pending:
+                        break
+                    url, depth, record, future = pending.popleft()
+                    result = future.result()
+                    if result is None:
+                        # Disallowed by robots.txt: not fetched, not counted against max_pages
+                        self.disallowed += 1
+                        self.fetched -= 1
+                        self.frontier.done(url)
+                        continue
+                    self._enqueue_links(result, record, depth)
+                    handled += 1
+                    if handled % self.SAVE_EVERY == 0:
+                        self.frontier.save()
+                    yield result, depth
+            finally:
+                for _, _, _, future in pending:
+                    future.cancel()
+
+    def finish(self):
+        """Persist what is left of the frontier, or delete it once the site is exhausted."""
+        if len(self.frontier):
+            self.frontier.save()
+        else:
+            self.frontier.clear()
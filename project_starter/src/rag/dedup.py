@@ -0,0 +1,242 @@
+import logging
+import os
+import pickle
+import zlib
+
+import numpy as np
+
+from src.rag.lexical import tokenize
+
+logger = logging.getLogger(__name__)
+
+_PRIME = np.uint64(4294967311)  # smallest prime > 2**32
+_MAX_HASH = np.uint64(0xFFFFFFFF)
+
+def _lsh_params(threshold: float, num_perm: int) -> tuple[int, int]:
+    """(bands, rows) with bands * rows == num_perm whose S-curve midpoint is closest to threshold."""
+    best = None
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        midpoint = (1.0 / bands) ** (1.0 / rows)
+        if best is None or abs(midpoint - threshold) < best[0]:
+            best = (abs(midpoint - threshold), bands, rows)
+    return best[1], best[2]
+
+class MinHasher:
+    """MinHash signatures over word shingles of Arabic-normalized tokens (stable across runs)."""
+    def __init__(self, num_perm: int = 128, shingle_size: int = 3, seed: int = 1):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        # a, b < 2**31 keep a * x + b (x < 2**32) inside uint64
+        self._a = rng.integers(1, 2**31, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, 2**31, size=num_perm, dtype=np.uint64)
+
+    def shingles(self, text: str) -> set[str]:
+        tokens = tokenize(text)
+        n = self.shingle_size
+        if len(tokens) <= n:
+            return {" ".join(tokens)} if tokens else set()
+        return {" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1)}
+
+    def signature(self, text: str) -> np.ndarray:
+        shingles = self.shingles(text)
+        if not shingles:
+            return np.full(self.num_perm, _MAX_HASH, dtype=np.uint64)
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+        permuted = (hashes[:, None] * self._a + self._b) % _PRIME & _MAX_HASH
+        return permuted.min(axis=0)
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return float(np.mean(a == b))
+
+class NearDuplicateIndex:
+    """
+    Persistent MinHash + LSH index of the chunks kept in the collection.
+
+    check() returns the id of a stored chunk whose estimated Jaccard
+    similarity (word 3-shingles) with the text is at least `threshold`, so
+    add_documents can suppress the new chunk instead of embedding it.
+
+    A suppressed chunk may belong to another source (the same article in an
+    amended edition, or a copy under another name), so it is held back
+    rather than dropped: hold() records it against the original it
+    duplicates, and release() hands it back when that original is deleted,
+    to be stored in its place.
+    """
+    VERSION = 3
+
+    def __init__(self, path: str | None = None, threshold: float = 0.9, num_perm: int = 128):
+        self.path = path
+        self.threshold = threshold
+        self.hasher = MinHasher(num_perm)
+        self.bands, self.rows = _lsh_params(threshold, num_perm)
+        self._signatures: dict[str, np.ndarray] = {}
+        self._buckets: dict[tuple[int, bytes], list[str]] = {}
+        # original id -> {copy id: {"id", "text", "metadata"}}, and copy id -> original id
+        self._copies: dict[str, dict[str, dict]] = {}
+        self._held_by: dict[str, str] = {}
+        self._dirty = False
+        self.suppressed = 0
+        if path:
+            self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "rb") as f:
+                state = pickle.load(f)
+            if state.get("version") not in (1, 2, self.VERSION) or state.get("num_perm") != self.hasher.num_perm:
+                logger.warning(f"Near-duplicate index {self.path} has an old format, starting a new one.")
+                return
+            signatures = state["signatures"]
+            # Versions 1 and 2 did not keep suppressed copies
+            copies = state.get("copies", {})
+        except (OSError, pickle.UnpicklingError, EOFError, KeyError) as e:
+            logger.warning(f"Ignoring unreadable near-duplicate index {self.path}: {e}")
+            return
+        for doc_id, signature in signatures.items():
+            self._insert(doc_id, signature)
+        for original_id, held in copies.items():
+            for copy in held.values():
+                self.hold(original_id, copy)
+        self._dirty = False
+
+    def save(self):
+        if not self.path or not self._dirty:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(
+                {
+                    "version": self.VERSION, "num_perm": self.hasher.num_perm,
+                    "signatures": self._signatures, "copies": self._copies,
+                },
+                f, protocol=pickle.HIGHEST_PROTOCOL,
+            )
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._signatures
+
+    def _band_keys(self, signature: np.ndarray):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def _insert(self, doc_id: str, signature: np.ndarray):
+        self._signatures[doc_id] = signature
+        for key in self._band_keys(signature):
+            self._buckets.setdefault(key, []).append(doc_id)
+
+    def ids(self) -> list[str]:
+        return list(self._signatures)
+
+    def find(self, signature: np.ndarray, exclude: set[str] | None = None) -> str | None:
+        """Most similar stored chunk at or above the threshold, if any (ids in exclude are ignored)."""
+        best_id, best_sim = None, self.threshold
+        seen = set(exclude or ())
+        for key in self._band_keys(signature):
+            for doc_id in self._buckets.get(key, ()):
+                if doc_id in seen:
+                    continue
+                seen.add(doc_id)
+                sim = similarity(signature, self._signatures[doc_id])
+                if sim >= best_sim:
+                    best_id, best_sim = doc_id, sim
+        return best_id
+
+    def check(self, doc_id: str, text: str, exclude: set[str] | None = None) -> str | None:
+        """
+        Register a chunk. Returns the id of the stored near-duplicate it was
+        suppressed in favour of, or None if the chunk is new (and is now indexed).
+        Chunks in exclude (e.g. the version of a source being replaced) never
+        suppress it.
+        """
+        if doc_id in self._signatures:
+            return None  # already kept: a re-ingest of the same chunk
+        signature = self.hasher.signature(text)
+        duplicate_of = self.find(signature, exclude)
+        if duplicate_of is not None:
+            self.suppressed += 1
+            return duplicate_of
+        self._insert(doc_id, signature)
+        self._dirty = True
+        return None
+
+    def hold(self, original_id: str, copy: dict):
+        """Keep a suppressed chunk ({"id", "text", "metadata"}) until original_id is deleted."""
+        self.drop_copies([copy["id"]])
+        self._copies.setdefault(original_id, {})[copy["id"]] = copy
+        self._held_by[copy["id"]] = original_id
+        self._dirty = True
+
+    def release(self, original_id: str) -> list[dict]:
+        """The chunks held back in favour of original_id, no longer held."""
+        held = self._copies.pop(original_id, {})
+        for copy_id in held:
+            del self._held_by[copy_id]
+        if held:
+            self._dirty = True
+        return list(held.values())
+
+    def copies(self) -> list[dict]:
+        """Every held-back chunk."""
+        return [copy for held in self._copies.values() for copy in held.values()]
+
+    def held_ids(self, sources) -> set[str]:
+        """Ids of the held-back chunks of these sources."""
+        sources = set(sources)
+        return {
+            copy_id for held in self._copies.values()
+            for copy_id, copy in held.items() if copy["metadata"].get("source") in sources
+        }
+
+    def drop_copies(self, copy_ids):
+        for copy_id in copy_ids:
+            original_id = self._held_by.pop(copy_id, None)
+            if original_id is None:
+                continue
+            held = self._copies[original_id]
+            del held[copy_id]
+            if not held:
+                del self._copies[original_id]
+            self._dirty = True
+
+    def remove(self, doc_id: str):
+        signature = self._signatures.pop(doc_id, None)
+        if signature is None:
+            return
+        for key in self._band_keys(signature):
+            bucket = self._buckets.get(key)
+            if bucket and doc_id in bucket:
+                bucket.remove(doc_id)
+                if not bucket:
+                    del self._buckets[key]
+        self._dirty = True
+
+    def stats(self) -> dict:
+        return {
+            "chunks": len(self), "held_back": len(self._held_by), "suppressed": self.suppressed,
+            "bands": self.bands, "rows": self.rows,
+        }
+
+def collapse_near_duplicates(results: list[dict], hasher: MinHasher, threshold: float) -> list[dict]:
+    """Keep the first (best-ranked) hit of each near-duplicate group, in order."""
+    kept: list[dict] = []
+    signatures: list[np.ndarray] = []
+    for result in results:
+        signature = hasher.signature(result["text"])
+        if any(similarity(signature, other) >= threshold for other in signatures):
+            continue
+        kept.append(result)
+        signatures.append(signature)
+    return kept
@@ -0,0 +1,181 @@
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import unicodedata
+from contextlib import contextmanager
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+def normalize_text(text: str) -> str:
+    """NFC + collapsed whitespace, so cosmetic re-extraction differences still hit the cache."""
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", text)).strip()
+
+class EmbeddingCache:
+    """
+    On-disk, content-addressed embedding cache for one embedding model.
+
+    Vectors live in an append-only float16 matrix (<model>.vectors) that is
+    read through np.memmap; <model>.index.json maps sha1(normalized text) to
+    a row. Rows are appended before the index is rewritten, so a crash can
+    only lose index entries, never point them at missing data. Writers are
+    serialized by an exclusive lock on <model>.lock, which also covers other
+    instances and processes on the same directory: each write re-reads the
+    index, appends at the current end of the matrix and saves the merged
+    index, so two writers never claim the same rows or drop each other's.
+    """
+    def __init__(self, directory: str, model_name: str, dtype: str = "float16"):
+        self.directory = directory
+        self.model_name = model_name
+        self.dtype = np.dtype(dtype)
+        safe_name = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+        self._vectors_path = os.path.join(directory, f"{safe_name}.vectors")
+        self._index_path = os.path.join(directory, f"{safe_name}.index.json")
+        self._lock_path = os.path.join(directory, f"{safe_name}.lock")
+
+        self.dim: int | None = None
+        self._rows: dict[str, int] = {}
+        self._matrix: np.memmap | None = None
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.RLock()
+        self._load()
+
+    def _load(self):
+        data = self._read_index()
+        if data is not None:
+            self.dim, self._rows = data["dim"], data["rows"]
+
+    def _read_index(self) -> dict | None:
+        if not os.path.exists(self._index_path):
+            return None
+        try:
+            with open(self._index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("model") != self.model_name or data.get("dtype") != self.dtype.name:
+                logger.warning(f"Embedding cache {self._index_path} belongs to another model/dtype, ignoring it.")
+                return None
+            return {"dim": data["dim"], "rows": data["rows"]}
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Ignoring unreadable embedding cache index {self._index_path}: {e}")
+            return None
+
+    @contextmanager
+    def _file_lock(self):
+        """Exclusive across threads, instances and processes sharing the directory."""
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock, open(self._lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _save_index(self):
+        with self._lock:
+            # A unique temp file: another process may be saving the same index
+            fd, tmp_path = tempfile.mkstemp(prefix=".index-", suffix=".tmp", dir=self.directory)
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump({"model": self.model_name, "dtype": self.dtype.name, "dim": self.dim, "rows": self._rows}, f)
+                os.replace(tmp_path, self._index_path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+
+    def _stored_rows(self) -> int:
+        if self.dim is None or not os.path.exists(self._vectors_path):
+            return 0
+        return os.path.getsize(self._vectors_path) // (self.dim * self.dtype.itemsize)
+
+    def _read_matrix(self) -> np.memmap | None:
+        rows = self._stored_rows()
+        if rows == 0:
+            return None
+        if self._matrix is None or self._matrix.shape[0] != rows:
+            self._matrix = np.memmap(self._vectors_path, dtype=self.dtype, mode="r", shape=(rows, self.dim))
+        return self._matrix
+
+    @staticmethod
+    def key(text: str) -> str:
+        return hashlib.sha1(normalize_text(text).encode("utf-8")).hexdigest()
+
+    def get_many(self, texts: list[str]) -> list[np.ndarray | None]:
+        """Look up vectors (as float32) for texts; None for misses."""
+        keys = [self.key(text) for text in texts]
+        results: list[np.ndarray | None] = []
+        with self._lock:
+            matrix = self._read_matrix()
+            for key in keys:
+                row = self._rows.get(key)
+                if row is not None and matrix is not None and row < matrix.shape[0]:
+                    results.append(np.asarray(matrix[row], dtype=np.float32))
+                    self.hits += 1
+                else:
+                    results.append(None)
+                    self.misses += 1
+        return results
+
+    def put_many(self, texts: list[str], vectors) -> None:
+        if not texts:
+            return
+        matrix = np.asarray(vectors, dtype=np.float32)
+        keys = [self.key(text) for text in texts]
+        with self._lock:
+            if self.dim is None:
+                self.dim = matrix.shape[1]
+            elif matrix.shape[1] != self.dim:
+                raise ValueError(f"Embedding dim {matrix.shape[1]} does not match cache dim {self.dim}")
+
+            with self._file_lock():
+                # Pick up what other writers stored since we last looked
+                data = self._read_index()
+                if data is not None:
+                    if data["dim"] not in (None, self.dim):
+                        raise ValueError(f"Embedding dim {self.dim} does not match cache dim {data['dim']}")
+                    self._rows.update(data["rows"])
+
+                new_keys, new_rows = [], []
+                for key, vector in zip(keys, matrix):
+                    if key not in self._rows and key not in new_keys:
+                        new_keys.append(key)
+                        new_rows.append(vector)
+                if not new_keys:
+                    return
+
+                row_bytes = self.dim * self.dtype.itemsize
+                with open(self._vectors_path, "ab") as f:
+                    end = f.seek(0, os.SEEK_END)
+                    if end % row_bytes:
+                        # A torn row from a writer that crashed mid-append; no index entry points at it
+                        end = f.truncate(end - end % row_bytes)
+                    f.write(np.asarray(new_rows, dtype=self.dtype).tobytes())
+                for offset, key in enumerate(new_keys):
+                    self._rows[key] = end // row_bytes + offset
+                self._save_index()
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = len(self._rows)
+        return {
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hit_rate, 4),
+            "bytes": os.path.getsize(self._vectors_path) if os.path.exists(self._vectors_path) else 0,
+        }
+
+    def __len__(self) -> int:
+        return len(self._rows)
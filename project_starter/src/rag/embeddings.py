@@ -0,0 +1,188 @@
+import logging
+import os
+import re
+from dataclasses import dataclass
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("sentence-transformers", "onnx", "onnx-int8")
+DEFAULT_BACKEND = "sentence-transformers"
+
+# Mixed Arabic / English e5 inputs used by the parity check
+PARITY_SAMPLES = [
+    "query: ما هي مدة الإجازة السنوية للعامل؟",
+    "query: What is retrieval-augmented generation?",
+    "query: مكافأة نهاية الخدمة",
+    "query: how does HNSW trade recall for latency",
+    "passage: يستحق العامل عن كل عام إجازة سنوية لا تقل مدتها عن واحد وعشرين يوماً.",
+    "passage: Retrieval-augmented generation grounds a language model on documents fetched at query time.",
+    "passage: المادة الرابعة والثمانون: إذا انتهت علاقة العمل وجب على صاحب العمل أن يدفع للعامل مكافأة عن مدة خدمته.",
+    "passage: HNSW builds a layered proximity graph; a larger ef_search visits more nodes and raises recall.",
+]
+
+def backend_cache_name(backend: str, model_name: str) -> str:
+    """Identity of the vectors a backend produces (embedding cache / manifest key)."""
+    return model_name if backend == DEFAULT_BACKEND else f"{model_name}@{backend}"
+
+class SentenceTransformerBackend:
+    """fp32 PyTorch reference backend (the original RAGEngine setup)."""
+    def __init__(self, model_name: str, device: str = "cpu", batch_size: int = 32):
+        from sentence_transformers import SentenceTransformer
+
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.model = SentenceTransformer(model_name, device=device)
+
+    def __call__(self, input: list[str]) -> list[np.ndarray]:
+        vectors = self.model.encode(
+            list(input), batch_size=self.batch_size, convert_to_numpy=True, show_progress_bar=False
+        )
+        return [np.asarray(v, dtype=np.float32) for v in vectors]
+
+def export_onnx(model, tokenizer, model_dir: str, quantize: bool = True) -> str:
+    """
+    Export a Hugging Face encoder to ONNX (dynamic batch / sequence axes)
+    and optionally quantize its weights to int8. Returns the model path.
+    """
+    import torch
+
+    class _Encoder(torch.nn.Module):
+        # Keyword call: positional forward() arguments differ between transformers versions
+        def __init__(self, encoder):
+            super().__init__()
+            self.encoder = encoder
+
+        def forward(self, input_ids, attention_mask):
+            return self.encoder(input_ids=input_ids, attention_mask=attention_mask)[0]
+
+    os.makedirs(model_dir, exist_ok=True)
+    tokenizer.save_pretrained(model_dir)
+    fp32_path = os.path.join(model_dir, "model.onnx")
+    if not os.path.exists(fp32_path):
+        dummy = tokenizer(["query: export"], return_tensors="pt")
+        dynamic = {0: "batch", 1: "sequence"}
+        with torch.no_grad():
+            torch.onnx.export(
+                _Encoder(model).eval(),
+                (dummy["input_ids"], dummy["attention_mask"]),
+                fp32_path,
+                input_names=["input_ids", "attention_mask"],
+                output_names=["last_hidden_state"],
+                dynamic_axes={"input_ids": dynamic, "attention_mask": dynamic, "last_hidden_state": dynamic},
+                opset_version=17,
+                dynamo=False,
+            )
+    if not quantize:
+        return fp32_path
+
+    int8_path = os.path.join(model_dir, "model_int8.onnx")
+    if not os.path.exists(int8_path):
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+    return int8_path
+
+class OnnxBackend:
+    """
+    ONNX Runtime backend (CPU) for the same encoder: mean pooling + L2
+    normalization, like the sentence-transformers e5 pipeline.
+
+    The model is exported (and int8-quantized with quantize=True) into
+    model_dir on first use; afterwards the tokenizer and the inference
+    session are loaded from there once and reused for every call.
+    """
+    def __init__(
+        self,
+        model_name: str,
+        model_dir: str,
+        quantize: bool = True,
+        batch_size: int = 32,
+        max_length: int = 512,
+        threads: int | None = None,
+    ):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.model_dir = model_dir
+
+        model_file = "model_int8.onnx" if quantize else "model.onnx"
+        model_path = os.path.join(model_dir, model_file)
+        if not os.path.exists(model_path):
+            from transformers import AutoModel, AutoTokenizer
+
+            logger.info(f"Exporting {model_name} to ONNX in {model_dir} (one-time)...")
+            model_path = export_onnx(
+                AutoModel.from_pretrained(model_name), AutoTokenizer.from_pretrained(model_name), model_dir, quantize
+            )
+        self._open(model_path, threads)
+
+    def _open(self, model_path: str, threads: int | None):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.tokenizer = AutoTokenizer.from_pretrained(self.model_dir)
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self._inputs = {i.name for i in self.session.get_inputs()}
+
+    def _encode(self, texts: list[str]) -> np.ndarray:
+        encoded = self.tokenizer(
+            texts, padding=True, truncation=True, max_length=self.max_length, return_tensors="np"
+        )
+        feeds = {name: np.asarray(encoded[name], dtype=np.int64) for name in self._inputs if name in encoded}
+        hidden = self.session.run(None, feeds)[0]
+        mask = encoded["attention_mask"][..., None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        return pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+
+    def __call__(self, input: list[str]) -> list[np.ndarray]:
+        texts = list(input)
+        # Length-sorted batches keep padding (and wasted compute) low
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        vectors: list[np.ndarray | None] = [None] * len(texts)
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            for i, vector in zip(batch, self._encode([texts[i] for i in batch])):
+                vectors[i] = vector.astype(np.float32)
+        return vectors
+
+def create_embedding_backend(backend: str, model_name: str, model_dir: str | None = None):
+    """Build the embedding function for a backend name from BACKENDS."""
+    if backend == "sentence-transformers":
+        return SentenceTransformerBackend(model_name)
+    if backend in ("onnx", "onnx-int8"):
+        safe_name = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+        return OnnxBackend(
+            model_name, os.path.join(model_dir or "onnx_models", safe_name), quantize=backend == "onnx-int8"
+        )
+    raise ValueError(f"Unknown embedding backend {backend!r}, expected one of {BACKENDS}")
+
+@dataclass
+class ParityReport:
+    samples: int
+    min_cosine: float
+    mean_cosine: float
+    threshold: float
+    passed: bool
+
+def parity_check(candidate, reference, texts: list[str] | None = None, threshold: float = 0.99) -> ParityReport:
+    """Cosine agreement between two embedding functions on the same inputs."""
+    texts = texts or PARITY_SAMPLES
+    a = np.asarray(candidate(texts), dtype=np.float32)
+    b = np.asarray(reference(texts), dtype=np.float32)
+    cosines = (a * b).sum(axis=1) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1))
+    report = ParityReport(
+        samples=len(texts),
+        min_cosine=round(float(cosines.min()), 4),
+        mean_cosine=round(float(cosines.mean()), 4),
+        threshold=threshold,
+        passed=bool(cosines.min() >= threshold),
+    )
+    if not report.passed:
+        logger.warning(f"Embedding parity check failed: {report}")
+    return report
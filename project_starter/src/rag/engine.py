@@ -1,173 +1,1542 @@
 # src\rag\engine.py
 import os
+import asyncio
+import functools
 import hashlib
 import logging
-import chromadb
 import glob
-from chromadb.config import Settings
-from chromadb.utils import embedding_functions
-import pdfplumber
-import requests
-from bs4 import BeautifulSoup
+import shutil
+import tempfile
+import time
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import Iterator
 
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+from src.rag.batching import QueryBatcher
+from src.rag.catalog import CATALOG_FILENAME, SourceCatalog, SourceSwap, build_where, detect_language
+from src.rag.chunking import RecursiveChunker, SectionChunker
+from src.rag.dedup import MinHasher, NearDuplicateIndex, collapse_near_duplicates
+from src.rag.embedding_cache import EmbeddingCache
+from src.rag.embeddings import (
+    DEFAULT_BACKEND,
+    SentenceTransformerBackend,
+    backend_cache_name,
+    create_embedding_backend,
+    parity_check,
+)
+from src.rag.fusion import weighted_rrf
+from src.rag.generations import (
+    ALIASES_FILENAME,
+    GENERATIONS_DIRNAME,
+    CollectionAliases,
+    Generation,
+    ReindexReport,
+    SwapLock,
+    check_candidate,
+    generation_name,
+    run_probes,
+    sample_probes,
+)
+from src.rag.lexical import BM25Index
+from src.rag.parents import PARENTS_FILENAME, ParentStore
+from src.rag.extraction import ExtractedDocument, extract_pdf_chunks
+from src.rag.crawler import CRAWL_FRONTIER_FILENAME, CrawlFrontier, CrawlReport, SiteCrawler
+from src.rag.fetching import (
+    URL_MANIFEST_FILENAME,
+    FetchResult,
+    UrlFetchReport,
+    UrlManifest,
+    UrlRecord,
+    fetch_many,
+    make_session,
+)
+from src.rag.ingestion import IngestionPipeline, IngestionRun, PdfJob, PreparedBatch, SourceState
+from src.rag.query_cache import QueryCache
+from src.rag.reranker import CrossEncoderReranker
+from src.rag.compression import CompressionReport, ContextCompressor, TokenCounter
+from src.rag.tuning import HnswParams, set_search_ef
+from src.rag.storage import (
+    PASSAGE_PREFIX,
+    CompactionReport,
+    chunk_text,
+    directory_size,
+    scan_chunk_versions,
+    scan_parent_ids,
+    vacuum_sqlite,
+)
+from src.rag.vectors import cosine_scores, truncate
+from src.rag.manifest import MANIFEST_FILENAME, IngestionManifest, IngestionReport
 
 logger = logging.getLogger(__name__)
 
-class RecursiveChunker:
+LEXICAL_INDEX_FILENAME = "lexical_index.pkl"
+DEDUP_INDEX_FILENAME = "dedup_index.pkl"
+# Side indexes belonging to one generation of the collection
+GENERATION_FILES = (
+    LEXICAL_INDEX_FILENAME, DEDUP_INDEX_FILENAME, CATALOG_FILENAME, MANIFEST_FILENAME, URL_MANIFEST_FILENAME,
+    CRAWL_FRONTIER_FILENAME, PARENTS_FILENAME,
+)
 
-    def __init__(self, chunk_size=1000, chunk_overlap=200):
-        self.splitter = RecursiveCharacterTextSplitter(
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap,
-            length_function=len,
-            separators=["\n\n", "\n", ". ", " ", ""] 
-        )
-
-    def split_text(self, text: str) -> list[str]:
-        return self.splitter.split_text(text)
+def _ingest_locked(method):
+    """Run an engine method that writes to the collection under the ingest lock."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._ingest_lock:
+            return method(self, *args, **kwargs)
+    return wrapper
 
 class RAGEngine:
-    def __init__(self, persist_directory="./chroma_db", collection_name="research_papers"):
+    EMBEDDING_MODEL = "intfloat/multilingual-e5-base"
+    EMBEDDING_MAX_TOKENS = 512
+    # Chunk size / overlap defaults per chunk unit
+    CHUNK_DEFAULTS = {"chars": (1000, 200), "tokens": (480, 64)}
+    # Parent/child layout: small, non-overlapping children are embedded; parents are what search returns
+    CHILD_CHUNK_DEFAULTS = {"chars": (400, 0), "tokens": (128, 0)}
+    PARENT_CHUNK_DEFAULTS = {"chars": 2000, "tokens": 512}
+    # Children fetched per requested parent, so hits sharing a parent still leave n_results parents
+    PARENT_FANOUT = 4
+    # Constructor arguments that change what a generation stores; reindex() may change these
+    GENERATION_SETTINGS = (
+        "chunk_unit", "chunk_size", "chunk_overlap", "embedding_backend", "dedup_threshold",
+        "hnsw_m", "hnsw_construction_ef", "hnsw_search_ef", "parent_child", "parent_chunk_size",
+    )
+    # Engine state that belongs to the live generation, swapped by reindex()
+    GENERATION_ATTRS = (
+        "collection_name", "index_directory", "_collection", "_embedding_fn", "embedding_backend",
+        "embedding_cache", "hnsw", "chunker", "dedup_threshold", "_lexical_index", "_dedup_index",
+        "catalog", "manifest", "url_manifest", "parent_chunker", "_parent_store",
+    )
+
+    def __init__(
+        self,
+        persist_directory="./chroma_db",
+        collection_name="research_papers",
+        use_embedding_cache=True,
+        search_workers=4,
+        query_cache_ttl=3600.0,
+        query_cache_on_disk=False,
+        embedding_backend=DEFAULT_BACKEND,
+        vector_dims=None,
+        rescore_factor=4,
+        dedup_threshold=0.9,
+        pipeline_queue_size=8,
+        chunk_unit="chars",
+        chunk_size=None,
+        chunk_overlap=None,
+        parent_child=False,
+        parent_chunk_size=None,
+        hnsw_m=16,
+        hnsw_construction_ef=200,
+        hnsw_search_ef=100,
+        generation_grace_s=3600.0,
+        generation=None,
+    ):
+        """
+        Cheap to construct: the Chroma client, the collection and the embedding
+        model are loaded on first use (search / ingest) or by warmup().
+
+        collection_name is an alias for the live generation (see reindex());
+        generation names a specific one instead.
+
+        parent_child=True switches to small-to-big retrieval: small child
+        chunks without overlap are embedded and searched, and each hit is
+        returned as its parent section (a legal article, or up to
+        parent_chunk_size of text), stored once in the parent store.
+        """
+        # Constructor arguments, reused by reindex() to build the next generation
+        self._init_args = {name: value for name, value in locals().items() if name not in ("self", "generation")}
+        self.persist_directory = persist_directory
+        # Chroma fixes a collection's dimension on first insert, so truncated
+        # indexes live in their own collection
+        self.alias = f"{collection_name}_d{vector_dims}" if vector_dims else collection_name
+        self.aliases = CollectionAliases(os.path.join(persist_directory, ALIASES_FILENAME))
+        self.collection_name = generation or self.aliases.live(self.alias) or self.alias
+        self.index_directory = self._generation_directory(self.collection_name)
+        # A generation is always served with the settings it was built with, whatever the config says
+        record = self.aliases.get(self.alias, self.collection_name)
+        pinned = {
+            name: value for name, value in (record.settings if record else {}).items()
+            if name in self.GENERATION_SETTINGS and name != "hnsw_search_ef" and self._init_args.get(name) != value
+        }
+        if pinned:
+            logger.info(f"Collection {self.collection_name} was built with {pinned}; using those settings")
+            self._init_args.update(pinned)
+        args = self._init_args
+        self.generation_grace_s = generation_grace_s
+        self._swap_lock = SwapLock()
+        # Held by ingestion, so a generation switch never lands in the middle of one
+        self._ingest_lock = threading.RLock()
+        self._reindex_lock = threading.Lock()
+        self._reindex_executor = None
+        self.vector_dims = vector_dims
+        self.rescore_factor = rescore_factor
+        self.embedding_backend = args["embedding_backend"]
+        # HNSW build parameters apply when the collection is created; search_ef also to an existing one
+        # (python -m src.rag.tuning picks them from the collection's own vectors)
+        self.hnsw = HnswParams(args["hnsw_m"], args["hnsw_construction_ef"], hnsw_search_ef)
+        self._client = None
+        self._embedding_fn = None
+        self._collection = None
+        self._lexical_index = None
+        self._dedup_index = None
+        # Jaccard threshold for near-duplicate suppression (None disables it)
+        self.dedup_threshold = args["dedup_threshold"]
+        self._minhasher = MinHasher()
+        # The pipeline's embed stage checks the index while its upsert stage may roll entries back
+        self._dedup_lock = threading.Lock()
+        self._reranker = None
+        self._reranker_failed = False
+        self._compressor = None
+        self._parent_store = None
+        self._load_lock = threading.Lock()
+
+        # Async path: model inference and Chroma I/O run off the event loop, in
+        # bounded pools. Ingestion gets its own single worker so a long ingest
+        # never starves searches.
+        self._search_executor = ThreadPoolExecutor(max_workers=search_workers, thread_name_prefix="rag-search")
+        self._ingest_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rag-ingest")
+        self.query_batcher = QueryBatcher(self.search_many, self._search_executor)
+        # Staged ingestion (src/rag/ingestion.py): items buffered between stages
+        self.pipeline_queue_size = pipeline_queue_size
+        self.last_ingestion_run: IngestionRun | None = None
         
-        self.client = chromadb.PersistentClient(
-            path=persist_directory,
-            settings=Settings(anonymized_telemetry=False)
+        #Chunking   
+        # chunk_unit="tokens" measures chunks with the embedding model's own tokenizer,
+        # so they fit its window ([CLS], [SEP] and the "passage: " prefix take ~8 tokens)
+        chunk_defaults = self.CHILD_CHUNK_DEFAULTS if args["parent_child"] else self.CHUNK_DEFAULTS
+        default_size, default_overlap = chunk_defaults.get(args["chunk_unit"], chunk_defaults["chars"])
+        self.chunker = RecursiveChunker(
+            chunk_size=args["chunk_size"] or default_size,
+            chunk_overlap=default_overlap if args["chunk_overlap"] is None else args["chunk_overlap"],
+            unit=args["chunk_unit"],
+            tokenizer_name=self.EMBEDDING_MODEL,
+            token_limit=self.EMBEDDING_MAX_TOKENS - 8,
         )
-        
-        #embedding
-        self.embedding_fn = embedding_functions.SentenceTransformerEmbeddingFunction(
-            model_name="intfloat/multilingual-e5-base",
-            device="cpu"
+        # Parent sections are cut at article headings; only their children are embedded
+        self.parent_chunker = SectionChunker(
+            chunk_size=args["parent_chunk_size"] or self.PARENT_CHUNK_DEFAULTS.get(args["chunk_unit"], 2000),
+            unit=args["chunk_unit"],
+            tokenizer_name=self.EMBEDDING_MODEL,
+        ) if args["parent_child"] else None
+
+        # Content-addressed embedding cache: re-ingesting unchanged chunks costs no inference
+        self.embedding_cache = (
+            EmbeddingCache(os.path.join(persist_directory, "embedding_cache"), self.embedding_model_id)
+            if use_embedding_cache else None
         )
-        
-        # HNSW and similarity (using Cosine similarity)
-        self.collection = self.client.get_or_create_collection(
-            name=collection_name,
-            embedding_function=self.embedding_fn,
-            metadata={
-                "hnsw:space": "cosine",
-                "hnsw:construction_ef": 200,
-                "hnsw:search_ef": 100,
-                "hnsw:M": 16,
-            }
+        if vector_dims and self.embedding_cache is None:
+            logger.warning("vector_dims is set without the embedding cache: results will not be rescored.")
+
+        # Query embedding + result cache, invalidated by a collection version counter
+        self.query_cache = QueryCache(
+            ttl_seconds=query_cache_ttl,
+            disk_path=os.path.join(persist_directory, "query_cache.sqlite3") if query_cache_on_disk else None,
         )
-        
-        #Chunking   
-        self.chunker = RecursiveChunker(chunk_size=1000, chunk_overlap=200)
+
+        # Ingestion manifest: lets ingest_directory skip unchanged files
+        self.manifest = IngestionManifest(os.path.join(self.index_directory, MANIFEST_FILENAME))
+        # Per-URL validators (ETag / Last-Modified) for conditional re-fetches
+        self.url_manifest = UrlManifest(os.path.join(self.index_directory, URL_MANIFEST_FILENAME))
+        # One record per source (type, title, language), for filters and the agent
+        self.catalog = SourceCatalog(os.path.join(self.index_directory, CATALOG_FILENAME))
+
+    def _load(self):
+        """Open the client, load the embedding model and open the collection (once, thread-safe)."""
+        if self._collection is not None:
+            return
+        with self._load_lock:
+            if self._collection is not None:
+                return
+            start = time.perf_counter()
+            # Deferred: importing chromadb / sentence_transformers costs seconds
+            import chromadb
+            from chromadb.config import Settings
+
+            client = self._client or chromadb.PersistentClient(
+                path=self.persist_directory,
+                settings=Settings(anonymized_telemetry=False)
+            )
+            
+            #embedding (reindex() hands a new generation the model already loaded)
+            embedding_fn = self._embedding_fn or create_embedding_backend(
+                self.embedding_backend,
+                self.EMBEDDING_MODEL,
+                model_dir=os.path.join(self.persist_directory, "onnx_models"),
+            )
+            
+            # HNSW and similarity (using Cosine similarity)
+            collection = client.get_or_create_collection(
+                name=self.collection_name,
+                # Vectors are always computed by the engine and passed explicitly
+                embedding_function=None,
+                metadata=self.hnsw.metadata(),
+            )
+            built = HnswParams.of(collection)
+            if built.search_ef != self.hnsw.search_ef:
+                try:
+                    set_search_ef(collection, self.hnsw.search_ef)
+                except Exception as e:
+                    logger.warning(f"Could not set HNSW ef_search to {self.hnsw.search_ef}: {e}")
+            if (built.M, built.construction_ef) != (self.hnsw.M, self.hnsw.construction_ef):
+                logger.info(
+                    f"Collection was built with HNSW M={built.M}, ef_construction={built.construction_ef}; "
+                    f"M={self.hnsw.M}, ef_construction={self.hnsw.construction_ef} apply to the next build"
+                )
+            self._client, self._embedding_fn = client, embedding_fn
+            self._collection = collection
+            logger.info(f"RAG engine loaded in {time.perf_counter() - start:.2f}s")
+
+    @property
+    def client(self):
+        self._load()
+        return self._client
+
+    @property
+    def embedding_fn(self):
+        self._load()
+        return self._embedding_fn
+
+    @property
+    def collection(self):
+        self._load()
+        return self._collection
+
+    @property
+    def lexical_index(self) -> BM25Index:
+        """BM25 index over the same chunk ids, persisted beside Chroma."""
+        if self._lexical_index is None:
+            with self._load_lock:
+                if self._lexical_index is None:
+                    self._lexical_index = BM25Index(os.path.join(self.index_directory, LEXICAL_INDEX_FILENAME))
+        if self._lexical_index.outdated:
+            # e.g. an index saved before it kept the filter fields
+            self.rebuild_lexical_index()
+        return self._lexical_index
+
+    @property
+    def dedup_index(self) -> NearDuplicateIndex | None:
+        """MinHash/LSH index of stored chunks, used to suppress near-duplicates at ingest."""
+        if self._dedup_index is None and self.dedup_threshold:
+            with self._load_lock:
+                if self._dedup_index is None:
+                    self._dedup_index = NearDuplicateIndex(
+                        os.path.join(self.index_directory, DEDUP_INDEX_FILENAME), threshold=self.dedup_threshold
+                    )
+        return self._dedup_index
+
+    @property
+    def parent_store(self) -> ParentStore | None:
+        """Parent sections of the parent/child layout (None in the default layout)."""
+        if self._parent_store is None and self.parent_chunker is not None:
+            with self._load_lock:
+                if self._parent_store is None:
+                    self._parent_store = ParentStore(os.path.join(self.index_directory, PARENTS_FILENAME))
+        return self._parent_store
+
+    @property
+    def reranker(self) -> CrossEncoderReranker:
+        if self._reranker is None:
+            with self._load_lock:
+                if self._reranker is None:
+                    self._reranker = CrossEncoderReranker()
+        return self._reranker
+
+    @property
+    def compressor(self) -> ContextCompressor:
+        if self._compressor is None:
+            with self._load_lock:
+                if self._compressor is None:
+                    # Looked up per call, so a reindex that changes the embedding backend is followed.
+                    # Sentences go straight to the model: the embedding cache is for stored chunks only
+                    self._compressor = ContextCompressor(
+                        embed_query=lambda query: self._embed_queries([f"query: {query}"])[0],
+                        embed_passages=lambda texts: self.embedding_fn([f"{PASSAGE_PREFIX}{t}" for t in texts]),
+                        count_tokens=TokenCounter(self.EMBEDDING_MODEL),
+                    )
+        return self._compressor
+
+    def rebuild_lexical_index(self, page_size: int = 1000) -> int:
+        """(Re)build the BM25 index from the collection, e.g. for a chroma_db created before it existed."""
+        index = BM25Index()
+        offset = 0
+        while True:
+            page = self.collection.get(limit=page_size, offset=offset, include=["metadatas", "documents"])
+            if not page["ids"]:
+                break
+            for doc_id, metadata, document in zip(page["ids"], page["metadatas"], page["documents"]):
+                index.add(doc_id, chunk_text(metadata, document), metadata)
+            offset += len(page["ids"])
+        index.path = os.path.join(self.index_directory, LEXICAL_INDEX_FILENAME)
+        index.save()
+        self._lexical_index = index
+        logger.info(f"Lexical index rebuilt with {len(index)} chunks.")
+        return len(index)
+
+    @property
+    def embedding_model_id(self) -> str:
+        """Model + backend: vectors from different backends are cached separately."""
+        return backend_cache_name(self.embedding_backend, self.EMBEDDING_MODEL)
+
+    def check_embedding_parity(self, texts: list[str] | None = None, threshold: float = 0.99):
+        """Compare the configured backend against the fp32 sentence-transformers model."""
+        return parity_check(self.embedding_fn, SentenceTransformerBackend(self.EMBEDDING_MODEL), texts, threshold)
+
+    def warmup(self):
+        """Pay the model / index loading cost upfront (e.g. at server start)."""
+        self._load()
+        self.embedding_fn(["query: warmup"])
+        return self
+
+    def _chunker_label(self) -> str:
+        """For ingest logs, e.g. "RecursiveChunker (tokens)" or "SectionChunker > RecursiveChunker (chars)"."""
+        label = type(self.chunker).__name__
+        if self.parent_chunker is not None:
+            label = f"{type(self.parent_chunker).__name__} > {label}"
+        return f"{label} ({self.chunker.unit})"
+
+    def _ingestion_settings(self) -> dict:
+        """Everything that changes the stored chunks/vectors of a file."""
+        settings = {
+            "chunk_size": self.chunker.chunk_size,
+            "chunk_overlap": self.chunker.chunk_overlap,
+            "embedding_model": self.embedding_model_id,
+            "extraction": "page-stream",
+        }
+        if self.chunker.unit != "chars":
+            settings["chunk_unit"] = self.chunker.unit
+        if self.parent_chunker is not None:
+            settings["parent_chunk_size"] = self.parent_chunker.chunk_size
+        if self.vector_dims:
+            settings["vector_dims"] = self.vector_dims
+        return settings
      # generate id for each chunk
     def _generate_id(self, text: str, source: str) -> str:
         unique_str = f"{source}_{text}"
         return hashlib.md5(unique_str.encode("utf-8")).hexdigest()
 
-    def add_documents(self, documents: list[dict], batch_size: int = 100):
-        total_docs = len(documents)
-        for i in range(0, total_docs, batch_size):
-            batch = documents[i : i + batch_size]
-            
-            unique_docs = {}
-            for doc in batch:
-                text_content = doc["text"]
-                source = doc["source"]
-                doc_id = self._generate_id(text_content, source)
-                
-                if doc_id not in unique_docs:
-                    unique_docs[doc_id] = {
-                        "id": doc_id,
-                        "text": f"passage: {text_content}",
-                        "metadata": {"source": source, "original_text": text_content}
-                    }
-            
-            ids = [d["id"] for d in unique_docs.values()]
-            texts = [d["text"] for d in unique_docs.values()]
-            metadatas = [d["metadata"] for d in unique_docs.values()]
+    def _parent_id(self, text: str, source: str) -> str:
+        # Prefixed so a parent never shares an id with a chunk of the same text
+        return f"p{self._generate_id(text, source)}"
 
-            if not ids:
-                continue
+    def _store_parents(self, parents: list[dict], swap: SourceSwap | None = None):
+        self.parent_store.put_many(parents)
+        if swap is not None:
+            swap.new_parent_ids.update(parent["id"] for parent in parents)
+
+    def _embed_passages(self, texts: list[str]) -> list:
+        """Embed texts through the cache; only the misses go to the model, in one batch."""
+        if self.embedding_cache is None:
+            return list(self.embedding_fn(texts))
+
+        vectors = self.embedding_cache.get_many(texts)
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            missing_texts = [texts[i] for i in missing]
+            computed = self.embedding_fn(missing_texts)
+            self.embedding_cache.put_many(missing_texts, computed)
+            for i, vector in zip(missing, computed):
+                vectors[i] = vector
+        return vectors
+
+    def _persist_indexes(self):
+        """Write the side indexes kept next to Chroma."""
+        if self._lexical_index is not None:
+            self._lexical_index.save()
+        if self._dedup_index is not None:
+            self._dedup_index.save()
+        self.catalog.save()
+
+    def _embed_queries(self, texts: list[str]) -> list:
+        """Embed query texts through the query-embedding LRU; misses are embedded in one batch."""
+        vectors = [self.query_cache.get_embedding(text) for text in texts]
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            computed = self.embedding_fn([texts[i] for i in missing])
+            for i, vector in zip(missing, computed):
+                vectors[i] = vector
+                self.query_cache.put_embedding(texts[i], vector)
+        return vectors
+
+    def _index_vectors(self, vectors) -> list:
+        """Vectors as stored in / queried against the HNSW index (truncated when vector_dims is set)."""
+        if not self.vector_dims:
+            return list(vectors)
+        return list(truncate(vectors, self.vector_dims))
+
+    def _rescore(self, query_vector, results: list[dict]) -> list[dict]:
+        """
+        Re-rank first-stage candidates by full-dimension cosine, using the
+        vectors kept in the embedding cache. Candidates without a cached
+        vector keep their first-stage score.
+        """
+        if not results or self.embedding_cache is None:
+            return results
+        full = self.embedding_cache.get_many([f"{PASSAGE_PREFIX}{r['text']}" for r in results])
+        found = [i for i, vector in enumerate(full) if vector is not None]
+        if found:
+            scores = cosine_scores(query_vector, [full[i] for i in found])
+            for i, score in zip(found, scores):
+                results[i]["score"] = round(float(score), 4)
+        return sorted(results, key=lambda r: r["score"], reverse=True)
+
+    def add_documents(
+        self, documents: list[dict], batch_size: int = 100, persist: bool = True, swap: SourceSwap | None = None
+    ) -> int:
+        """
+        Embed and upsert chunks. Exact duplicates collapse onto one id; with
+        dedup_threshold set, near-duplicates of already stored chunks (of any
+        source) are suppressed before embedding and held back by the dedup
+        index, to be stored if their original is deleted. Returns the number
+        suppressed.
 
+        With a swap (see _begin_swap) the stored ids are collected on it, and
+        the version being replaced cannot suppress the new chunks.
+        """
+        swaps = {source: swap for source in swap.sources} if swap is not None else None
+        collection_changed = False
+        suppressed = 0
+        for i in range(0, len(documents), batch_size):
+            batch = self._prepare_batch(documents[i : i + batch_size], swaps)
+            suppressed += batch.suppressed
+            if not batch.ids:
+                continue
             try:
-                self.collection.upsert(
-                    ids=ids,
-                    documents=texts,
-                    metadatas=metadatas
-                )
-                logger.info(f"Batch {i//batch_size + 1} added/updated successfully.")
+                self._embed_batch(batch)
             except Exception as e:
-                logger.error(f"Error adding batch: {e}")
-                
-    def ingest_pdf(self, file_path: str):
+                batch.error = e
+            collection_changed = self._upsert_batch(batch) or collection_changed
+
+        if suppressed:
+            logger.info(f"Suppressed {suppressed} near-duplicate chunks.")
+        if collection_changed:
+            # New chunks can change any query's top-k
+            self.query_cache.bump_version()
+        if persist:
+            self._persist_indexes()
+        return suppressed
+
+    def _prepare_batch(self, documents: list[dict], swaps: dict[str, SourceSwap] | None = None) -> PreparedBatch:
+        """Ids and metadata for a batch of chunks, minus exact and near-duplicates."""
+        unique_docs = {}
+        for doc in documents:
+            text_content = doc["text"]
+            source = doc["source"]
+            doc_id = self._generate_id(text_content, source)
+
+            if doc_id not in unique_docs:
+                # Any extra keys (e.g. page numbers, source type, title) are stored as metadata
+                extra = {k: v for k, v in doc.items() if k not in ("text", "source") and v is not None}
+                unique_docs[doc_id] = {
+                    "id": doc_id,
+                    "text": text_content,
+                    "metadata": {"source": source, "language": detect_language(text_content), **extra}
+                }
+
+        batch = PreparedBatch()
+        swaps = swaps or {}
+        if self.dedup_index is not None:
+            with self._dedup_lock:
+                for doc_id, doc in list(unique_docs.items()):
+                    known = doc_id in self.dedup_index
+                    swap = swaps.get(doc["metadata"]["source"])
+                    original = self.dedup_index.check(doc_id, doc["text"], swap.old_ids if swap else None)
+                    if original is not None:
+                        # Held back, not dropped: another source's copy comes back if the original is removed
+                        self.dedup_index.hold(original, doc)
+                        if swap is not None:
+                            swap.held_ids.add(doc_id)
+                        del unique_docs[doc_id]
+                        batch.suppressed += 1
+                    elif not known:
+                        batch.added_to_dedup.append(doc_id)
+
+        batch.ids = [d["id"] for d in unique_docs.values()]
+        batch.texts = [d["text"] for d in unique_docs.values()]
+        batch.metadatas = [d["metadata"] for d in unique_docs.values()]
+        batch.swaps = {m["source"]: swaps[m["source"]] for m in batch.metadatas if m["source"] in swaps}
+        return batch
+
+    def _embed_batch(self, batch: PreparedBatch):
+        # The e5 prefix only exists at embedding time; the raw text is stored once
+        batch.vectors = self._index_vectors(self._embed_passages([f"{PASSAGE_PREFIX}{text}" for text in batch.texts]))
+
+    def _upsert_batch(self, batch: PreparedBatch) -> bool:
+        """Write an embedded batch to Chroma and the lexical index. Returns True if it added new ids."""
         try:
-            full_text = ""
-            with pdfplumber.open(file_path) as pdf:
-                for page in pdf.pages:
-                    text = page.extract_text()
-                    if text:
-                        full_text += text + "\n"
-            
-            chunks = self.chunker.split_text(full_text)
-            
-            docs_to_add = [{"text": chunk, "source": os.path.basename(file_path)} for chunk in chunks]
-            self.add_documents(docs_to_add)
-            
-            print(f" Processed PDF with RecursiveChunker: {os.path.basename(file_path)} ({len(chunks)} chunks)")
+            if batch.error is not None:
+                raise batch.error
+            stored = self.collection.get(ids=batch.ids, include=["metadatas"])
+            existing = set(stored["ids"])
+            for doc_id, metadata in zip(stored["ids"], stored["metadatas"]):
+                swap = batch.swaps.get((metadata or {}).get("source"))
+                # First write wins: a later batch of the same ingest must not overwrite the old version's stamp
+                if swap is not None and doc_id in swap.old_ids:
+                    swap.old_metadatas.setdefault(doc_id, metadata or {})
+            self.collection.upsert(
+                ids=batch.ids,
+                documents=batch.texts,
+                metadatas=batch.metadatas,
+                embeddings=batch.vectors,
+            )
+            for doc_id, text, metadata in zip(batch.ids, batch.texts, batch.metadatas):
+                self.lexical_index.add(doc_id, text, metadata)
+            for doc_id, metadata in zip(batch.ids, batch.metadatas):
+                if metadata["source"] in batch.swaps:
+                    batch.swaps[metadata["source"]].new_ids.add(doc_id)
+            logger.info(f"Batch of {len(batch.ids)} chunks added/updated successfully.")
+            return len(existing) < len(batch.ids)
         except Exception as e:
-            print(f" Error reading PDF {file_path}: {e}")
-            
-    def ingest_directory(self, directory_path: str):
+            logger.error(f"Error adding batch: {e}")
+            for swap in batch.swaps.values():
+                swap.failed = True
+            if self.dedup_index is not None:
+                with self._dedup_lock:
+                    for doc_id in batch.added_to_dedup:
+                        self.dedup_index.remove(doc_id)
+            return False
+
+    def _begin_swap(self, sources: list[str]) -> SourceSwap:
+        """Snapshot the chunk ids currently stored for the sources about to be re-ingested."""
+        stored = self.collection.get(where=build_where(source=list(sources)), include=[])["ids"]
+        parents = self.parent_store.ids_for(sources) if self.parent_store is not None else set()
+        held = set()
+        if self.dedup_index is not None:
+            with self._dedup_lock:
+                held = self.dedup_index.held_ids(sources)
+        return SourceSwap(sources=list(sources), old_ids=set(stored), old_parent_ids=parents, old_held_ids=held)
+
+    def _finish_swap(self, swap: SourceSwap) -> int:
+        """
+        Complete a source re-ingest: delete the chunks of the previous version
+        that the new one no longer has, in one bulk delete. If the ingest
+        failed, roll back instead by deleting what it added and restoring the
+        metadata of the chunks it rewrote, so the source keeps its previous
+        chunk set and compact() still sees one version. Returns the number
+        of chunks deleted.
+        """
+        doomed = swap.added_ids if swap.failed else swap.stale_ids
+        if self.dedup_index is not None:
+            # Copies held back by the version that is going away must not come back with it
+            with self._dedup_lock:
+                self.dedup_index.drop_copies(
+                    swap.held_ids - swap.old_held_ids if swap.failed else swap.old_held_ids - swap.held_ids
+                )
+        self._delete_chunks(doomed)
+        if swap.failed:
+            self._restore_metadatas(swap.old_metadatas)
+        if self.parent_store is not None:
+            if swap.failed:
+                self.parent_store.remove_ids(swap.new_parent_ids - swap.old_parent_ids)
+            else:
+                self.parent_store.remove_ids(swap.old_parent_ids - swap.new_parent_ids)
+        return len(doomed)
+
+    def _restore_metadatas(self, metadatas: dict[str, dict]) -> None:
+        """Put back the stored metadata of rewritten chunks (Chroma merges updates, so new keys are set to None)."""
+        ids = sorted(metadatas)
+        step = self.client.get_max_batch_size()
+        for i in range(0, len(ids), step):
+            chunk = ids[i : i + step]
+            current = self.collection.get(ids=chunk, include=["metadatas", "documents"])
+            restored = [
+                {**{key: None for key in (metadata or {}) if key not in metadatas[doc_id]}, **metadatas[doc_id]}
+                for doc_id, metadata in zip(current["ids"], current["metadatas"])
+            ]
+            if current["ids"]:
+                self.collection.update(ids=current["ids"], metadatas=restored)
+            # The lexical index keeps the filter fields too
+            for doc_id, document in zip(current["ids"], current["documents"]):
+                self.lexical_index.add(doc_id, chunk_text(metadatas[doc_id], document), metadatas[doc_id])
+
+    def _delete_chunks(self, ids, promote: bool = True) -> None:
+        """Delete chunks from Chroma and the side indexes, promoting their held-back near-duplicates."""
+        ids = sorted(ids)
+        if not ids:
+            return
+        step = self.client.get_max_batch_size()
+        for i in range(0, len(ids), step):
+            self.collection.delete(ids=ids[i : i + step])
+        for doc_id in ids:
+            self.lexical_index.remove(doc_id)
+        if self.dedup_index is not None:
+            with self._dedup_lock:
+                for doc_id in ids:
+                    self.dedup_index.remove(doc_id)
+        self.query_cache.bump_version()
+        logger.info(f"Deleted {len(ids)} chunks.")
+        if promote:
+            self._promote_copies(ids)
+
+    def _promote_copies(self, deleted_ids) -> int:
+        """Store the near-duplicates held back in favour of deleted chunks in their place."""
+        if self.dedup_index is None:
+            return 0
+        with self._dedup_lock:
+            copies = [copy for doc_id in deleted_ids for copy in self.dedup_index.release(doc_id)]
+        if not copies:
+            return 0
+        # Re-checked on the way in: copies of one original keep only the first of them
+        self.add_documents([{**copy["metadata"], "text": copy["text"]} for copy in copies], persist=False)
+        logger.info(f"Promoted {len(copies)} held-back near-duplicates of deleted chunks.")
+        return len(copies)
+
+    @_ingest_locked
+    def remove_source(self, source: str) -> int:
+        """Delete every chunk of a source (file name or URL) and its catalog record."""
+        swap = self._begin_swap([source])
+        if self.dedup_index is not None:
+            with self._dedup_lock:
+                self.dedup_index.drop_copies(swap.old_held_ids)
+        self._delete_chunks(swap.old_ids)
+        if self.parent_store is not None:
+            self.parent_store.remove_ids(swap.old_parent_ids)
+        self.catalog.remove(source)
+        self._persist_indexes()
+        if self.url_manifest.get(source) is not None:
+            self.url_manifest.remove(source)
+            self.url_manifest.save()
+        return len(swap.old_ids)
+
+    @_ingest_locked
+    def compact(self, vacuum: bool = True, page_size: int = 1000) -> CompactionReport:
+        """
+        Bring the index back to the live corpus: delete chunks left over from
+        earlier versions of a source (ingested before replace semantics),
+        drop lexical / near-duplicate entries and parent sections whose chunks
+        are gone, compact the
+        BM25 slots and VACUUM Chroma's SQLite file.
+
+        Deleted vectors are only marked deleted in Chroma's HNSW segment and
+        their slots are reused by later inserts, so the index file itself
+        does not shrink.
+        """
+        start = time.perf_counter()
+        report = CompactionReport(bytes_before=directory_size(self.persist_directory))
+        ids, stale = scan_chunk_versions(self.collection, page_size)
+        report.chunks_before = len(ids)
+        report.stale_chunks = len(stale)
+        # Promoted after the orphan sweep below, which only knows the chunks scanned here
+        self._delete_chunks(stale, promote=False)
 
-        pdf_files = glob.glob(os.path.join(directory_path, "*.pdf"))
+        live = ids - stale
+        orphaned = [doc_id for doc_id in self.lexical_index.ids() if doc_id not in live]
+        for doc_id in orphaned:
+            self.lexical_index.remove(doc_id)
+        report.orphaned_index_entries = len(orphaned)
+        if self.dedup_index is not None:
+            orphaned = [doc_id for doc_id in self.dedup_index.ids() if doc_id not in live]
+            with self._dedup_lock:
+                for doc_id in orphaned:
+                    self.dedup_index.remove(doc_id)
+            report.orphaned_index_entries += len(orphaned)
+            self._promote_copies([*stale, *orphaned])
+        if self.parent_store is not None:
+            referenced = scan_parent_ids(self.collection, page_size)
+            if self.dedup_index is not None:
+                # Sections of held-back copies are needed again if a copy is promoted
+                with self._dedup_lock:
+                    referenced.update(copy["metadata"].get("parent_id") for copy in self.dedup_index.copies())
+            report.orphaned_index_entries += self.parent_store.remove_ids(self.parent_store.ids() - referenced)
+        self.lexical_index.compact()
+        self._persist_indexes()
+
+        if vacuum:
+            vacuum_sqlite(self.persist_directory)
+        report.bytes_after = directory_size(self.persist_directory)
+        report.elapsed_s = time.perf_counter() - start
+        print(f" Compaction: {report.summary()}")
+        return report
+
+    @staticmethod
+    def _source_fields(source_type: str, title: str) -> dict:
+        """Source-level metadata copied onto every chunk, so `where` filters can use it."""
+        return {"source_type": source_type, "title": title, "ingested_at": int(time.time())}
+
+    def _record_source(self, source: str, source_type: str, title: str, sample: list[str], chunks: int, pages: int = 0):
+        self.catalog.record(source, source_type, title, detect_language(" ".join(sample)), chunks, pages)
+
+    def _run_pipeline(self, jobs, batch_size: int = 100, on_source_done=None) -> IngestionRun:
+        """Run jobs through the staged ingestion pipeline and print where the time went."""
+        run = IngestionPipeline(
+            self, batch_size=batch_size, queue_size=self.pipeline_queue_size, on_source_done=on_source_done
+        ).run(jobs)
+        self.last_ingestion_run = run
+        print(f" Chunk sizes: {run.chunk_stats.summary()}")
+        for metrics in run.stages:
+            logger.info(f"Ingestion stage {metrics.summary()}")
+        busiest = max(run.stages, key=lambda m: m.busy_s, default=None)
+        if busiest is not None and busiest.busy_s:
+            print(f" Pipeline: {run.elapsed_s:.1f}s, bottleneck stage '{busiest.name}' ({busiest.busy_s:.1f}s busy)")
+        return run
+
+    @_ingest_locked
+    def ingest_pdf(self, file_path: str, batch_size: int = 100) -> int | None:
+        """
+        Ingest a PDF page by page through the staged pipeline. Chunks go to the
+        embed stage in batches of batch_size, so memory depends on the batch
+        and queue sizes, not the document. Returns the number of chunks, or
+        None on failure.
+        """
+        run = self._run_pipeline([PdfJob(file_path)], batch_size)
+        state = run.sources[0]
+        if not state.stored:
+            print(f" Error reading PDF {file_path}: {state.error}")
+            return None
+        print(f" Processed PDF with {self._chunker_label()}: {state.source} ({state.chunks} chunks, {run.suppressed} near-duplicates suppressed, {state.removed} stale chunks removed)")
+        # Recorded like ingest_directory's files, so reindex() can rebuild it
+        self.manifest.record(file_path, self._ingestion_settings(), state.chunks, state.seconds)
+        self.manifest.save()
+        return state.chunks
+
+    def _extract_many(self, pdf_files: list[str], workers: int, deterministic: bool) -> Iterator[ExtractedDocument]:
+        """
+        Extract + chunk PDFs, in a process pool when workers > 1.
+        With deterministic=True results come back in input order, otherwise as they finish.
+        """
+        chunker = self.chunker
+        args = (
+            chunker.chunk_size, chunker.chunk_overlap, chunker.unit, chunker.tokenizer_name, chunker.token_limit,
+            # Parent/child layout: workers cut parent sections, the pipeline cuts their children
+            self.parent_chunker.chunk_size if self.parent_chunker is not None else None,
+        )
+        if workers <= 1 or len(pdf_files) <= 1:
+            for pdf_file in pdf_files:
+                yield extract_pdf_chunks(pdf_file, *args)
+            return
+
+        # spawn: the parent holds torch / chromadb threads, which fork does not handle well
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=min(workers, len(pdf_files)), mp_context=ctx) as executor:
+            futures = [
+                executor.submit(extract_pdf_chunks, pdf_file, *args)
+                for pdf_file in pdf_files
+            ]
+            for future in (futures if deterministic else as_completed(futures)):
+                yield future.result()
+
+    @_ingest_locked
+    def ingest_directory(
+        self,
+        directory_path: str,
+        force: bool = False,
+        workers: int = 1,
+        deterministic: bool = True,
+        batch_size: int = 100,
+    ) -> IngestionReport:
+        """
+        Ingest every PDF in a directory, skipping files the manifest says are
+        unchanged (same content and same chunker/embedding settings).
+        Pass force=True to re-ingest everything.
+
+        With workers > 1, extraction and chunking run in a process pool and
+        feed the pipeline's embed and upsert stages in this process; embedding
+        batches span files either way.
+        """
+        pdf_files = sorted(glob.glob(os.path.join(directory_path, "*.pdf")))
         print(f" Found {len(pdf_files)} PDFs in {directory_path}...")
-        
+        return self._ingest_files(pdf_files, force, workers, deterministic, batch_size)
+
+    def _ingest_files(
+        self,
+        pdf_files: list[str],
+        force: bool = False,
+        workers: int = 1,
+        deterministic: bool = True,
+        batch_size: int = 100,
+    ) -> IngestionReport:
+        start = time.perf_counter()
+        report = self.manifest.reset_report()
+        settings = self._ingestion_settings()
+        pending_files = []
         for pdf_file in pdf_files:
-            self.ingest_pdf(pdf_file)        
+            if not force and self.manifest.is_unchanged(pdf_file, settings):
+                self.manifest.mark_skipped(pdf_file)
+            else:
+                pending_files.append(pdf_file)
+
+        def source_done(state: SourceState):
+            # Only record files once their chunks are actually stored
+            if not state.stored:
+                print(f" Error reading PDF {state.file_path}: {state.error}")
+                self.manifest.mark_failed()
+                return
+            print(f" Processed PDF with {self._chunker_label()}: {state.source} ({state.chunks} chunks, {state.pages} pages)")
+            self.manifest.record(state.file_path, settings, state.chunks, state.seconds)
+            self.manifest.mark_reprocessed()
+
+        if workers > 1 and len(pending_files) > 1:
+            jobs = self._extract_many(pending_files, workers, deterministic)
+        else:
+            jobs = [PdfJob(pdf_file) for pdf_file in pending_files]
+        run = self._run_pipeline(jobs, batch_size, on_source_done=source_done)
+        report.near_duplicates = run.suppressed
+        report.stale_chunks = run.removed
+
+        self.manifest.save()
+        report.elapsed_s = time.perf_counter() - start
+        print(f" Ingestion manifest: {report.summary()}")
+        if self.embedding_cache is not None:
+            print(f" Embedding cache: {self.embedding_cache.stats()}")
+        return report
+
+    def _url_record(self, url: str, settings: dict, force: bool = False) -> UrlRecord | None:
+        # Stored validators only count if the chunks were made with the current settings
+        record = None if force else self.url_manifest.get(url)
+        return record if record is not None and record.settings == settings else None
+
+    def _fetched_jobs(self, results, record_for, report: UrlFetchReport, fetched: dict, on_skip=None):
+        """
+        Ingestion jobs for fetch results, with the download accounting: failed
+        and unchanged results are counted and skipped, PDFs downloaded to a
+        file become PdfJobs sourced by their URL.
+        """
+        for result in results:
+            if result.error or result.unchanged:
+                if result.path:
+                    os.remove(result.path)
+                if result.error:
+                    print(f"Error reading URL {result.url}: {result.error}")
+                    report.failed += 1
+                else:
+                    report.bytes_fetched += result.size
+                    if result.status == 304:
+                        report.not_modified += 1
+                        report.bytes_revalidated += record_for(result.url).size
+                    else:
+                        report.unchanged += 1
+                    self.url_manifest.touch(result)
+                if on_skip is not None:
+                    on_skip(result)
+                continue
+            report.bytes_fetched += result.size
+            fetched[result.url] = result
+            yield PdfJob(result.path, source=result.url) if result.path else result
+
+    def _url_done(self, state: SourceState, result: FetchResult, settings: dict, report: UrlFetchReport):
+        if result.path and os.path.exists(result.path):
+            os.remove(result.path)
+        if not state.stored:
+            print(f"Error reading URL {state.source}: {state.error}")
+            report.failed += 1
+            return
+        self.url_manifest.record(result, settings, state.chunks)
+        report.fetched += 1
+        print(f"Processed URL with {self._chunker_label()}: {state.source} ({state.chunks} chunks, {state.removed} stale chunks removed)")
+
+    @_ingest_locked
+    def ingest_urls(
+        self,
+        urls: list[str],
+        concurrency: int = 8,
+        force: bool = False,
+        timeout: float = 10.0,
+        batch_size: int = 100,
+    ) -> UrlFetchReport:
+        """
+        Fetch and ingest web pages, `concurrency` at a time over one pooled
+        HTTP session. URLs ingested before are revalidated with conditional
+        GETs (ETag / Last-Modified); a 304, or a body identical to the stored
+        one, skips parsing and embedding. Changed pages replace their
+        previous chunks; PDF links go through the PDF path. Pass force=True
+        to fetch and re-ingest everything.
+        """
+        start = time.perf_counter()
+        report = UrlFetchReport()
+        settings = self._ingestion_settings()
+        urls = list(dict.fromkeys(urls))
+        records = {url: self._url_record(url, settings, force) for url in urls}
+        fetched: dict[str, FetchResult] = {}
+
+        def jobs(download_dir: str):
+            session = make_session(concurrency)
+            try:
+                yield from self._fetched_jobs(
+                    fetch_many(session, urls, records, concurrency, timeout, download_dir), records.get, report, fetched
+                )
+            finally:
+                session.close()
+
+        def source_done(state: SourceState):
+            self._url_done(state, fetched.pop(state.source), settings, report)
+
+        with tempfile.TemporaryDirectory(prefix="rag-fetch-") as download_dir:
+            run = self._run_pipeline(jobs(download_dir), batch_size, on_source_done=source_done)
+        report.near_duplicates = run.suppressed
+        report.stale_chunks = run.removed
+        self.url_manifest.save()
+        report.elapsed_s = time.perf_counter() - start
+        print(f"URL ingestion: {report.summary()}")
+        return report
+
+    @_ingest_locked
+    def crawl_site(
+        self,
+        seeds: list[str] | str,
+        max_depth: int = 2,
+        max_pages: int = 200,
+        per_host_concurrency: int = 4,
+        resume: bool = True,
+        force: bool = False,
+        timeout: float = 10.0,
+        batch_size: int = 100,
+    ) -> CrawlReport:
+        """
+        Crawl a site from its seed pages and ingest every page and linked PDF
+        on the seeds' domains, up to max_depth links away and max_pages
+        fetches per call. Pages seen before are revalidated like
+        ingest_urls; PDFs are streamed to disk and go through the PDF
+        ingestion path with their URL as source.
+
+        The frontier is saved in the persist directory: with resume=True a
+        crawl cut short (by max_pages or an error) continues where it stopped.
+        """
+        start = time.perf_counter()
+        report = CrawlReport()
+        settings = self._ingestion_settings()
+        frontier = CrawlFrontier(os.path.join(self.index_directory, CRAWL_FRONTIER_FILENAME))
+        if not resume:
+            frontier.clear()
+        crawler = SiteCrawler(
+            [seeds] if isinstance(seeds, str) else seeds, frontier,
+            max_depth=max_depth, max_pages=max_pages, per_host_concurrency=per_host_concurrency,
+        )
+        fetched: dict[str, FetchResult] = {}
+
+        def record_for(url: str) -> UrlRecord | None:
+            return self._url_record(url, settings, force)
+
+        def jobs(download_dir: str):
+            session = make_session(crawler.max_workers)
+            try:
+                results = (result for result, _ in crawler.crawl(session, record_for, download_dir, timeout))
+                yield from self._fetched_jobs(
+                    results, record_for, report, fetched, on_skip=lambda result: frontier.done(result.url)
+                )
+            finally:
+                session.close()
 
-    def ingest_url(self, url: str):
+        def source_done(state: SourceState):
+            result = fetched.pop(state.source)
+            self._url_done(state, result, settings, report)
+            if state.stored and result.path:
+                report.pdfs += 1
+            frontier.done(state.source)
+
+        with tempfile.TemporaryDirectory(prefix="rag-crawl-") as download_dir:
+            try:
+                run = self._run_pipeline(jobs(download_dir), batch_size, on_source_done=source_done)
+            finally:
+                crawler.finish()
+                self.url_manifest.save()
+        report.near_duplicates = run.suppressed
+        report.stale_chunks = run.removed
+        report.offsite_links = crawler.offsite_links
+        report.disallowed = crawler.disallowed
+        report.frontier_left = len(frontier)
+        report.elapsed_s = time.perf_counter() - start
+        print(f"Site crawl: {report.summary()}")
+        return report
+
+    def ingest_url(self, url: str) -> UrlFetchReport:
+        return self.ingest_urls([url], concurrency=1)
+
+    # ---- generations (blue/green reindexing) ------------------------------
+
+    def _generation_directory(self, name: str) -> str:
+        # Only the original full-dimension collection keeps its side indexes in the persist directory; a
+        # truncated-dims collection (the {collection}_d{dims} alias) and later generations get their own
+        if name == self._init_args["collection_name"]:
+            return self.persist_directory
+        return os.path.join(self.persist_directory, GENERATIONS_DIRNAME, name)
+
+    def _sync_generation(self, target: "RAGEngine", workers: int = 1) -> list[str]:
+        """
+        Bring target to this generation's sources: ingest the files and URLs
+        it lacks (from this generation's manifests) and remove sources this
+        one no longer has. Returns the sources target still lacks.
+        """
+        files = [path for path in self.manifest.paths() if os.path.exists(path)]
+        if files:
+            target._ingest_files(files, workers=workers)
+        urls = [url for url in self.url_manifest.urls() if target.url_manifest.get(url) is None]
+        if urls:
+            target.ingest_urls(urls, force=True)
+        for record in target.catalog.list():
+            if record.source not in self.catalog:
+                target.remove_source(record.source)
+        return [record.source for record in self.catalog.list() if record.source not in target.catalog]
+
+    def _drop_generation(self, name: str):
+        """Delete a generation's collection and side indexes (never the one being served)."""
+        if name == self.collection_name:
+            return
         try:
-            response = requests.get(url, headers={"User-Agent": "Mozilla/5.0"}, timeout=10)
-            soup = BeautifulSoup(response.text, "html.parser")
-            
-            for script in soup(["script", "style"]):
-                script.decompose()
-            
-            text = soup.get_text(separator="\n")
-            lines = (line.strip() for line in text.splitlines())
-            clean_text = '\n'.join(chunk for chunk in lines if chunk)
+            self.client.delete_collection(name)
+        except Exception as e:
+            logger.info(f"Collection {name} was already gone: {e}")
+        directory = self._generation_directory(name)
+        if directory == self.persist_directory:
+            for filename in GENERATION_FILES:
+                path = os.path.join(directory, filename)
+                if os.path.exists(path):
+                    os.remove(path)
+        else:
+            shutil.rmtree(directory, ignore_errors=True)
+        self.aliases.drop(self.alias, name)
+        self.aliases.save()
 
-            
-            chunks = self.chunker.split_text(clean_text)
-            
-            docs_to_add = [{"text": chunk, "source": url} for chunk in chunks]
-            self.add_documents(docs_to_add)
-            
-            print(f"Processed URL with RecursiveChunker: {url} ({len(chunks)} chunks)")
+    def collect_generations(self, grace_s: float | None = None) -> list[str]:
+        """Delete generations retired more than grace_s (default generation_grace_s) ago."""
+        grace_s = self.generation_grace_s if grace_s is None else grace_s
+        self.aliases = CollectionAliases(self.aliases.path)  # another process may have switched
+        collected = []
+        for generation in self.aliases.expired(self.alias, grace_s):
+            if generation.name != self.collection_name:
+                self._drop_generation(generation.name)
+                collected.append(generation.name)
+                logger.info(f"Garbage-collected retired generation {generation.name}")
+        return collected
+
+    def reindex(
+        self,
+        background: bool = False,
+        probes: int = 50,
+        probe_k: int = 5,
+        max_recall_drop: float = 0.05,
+        max_latency_factor: float = 2.0,
+        allow_missing_sources: bool = False,
+        workers: int = 1,
+        **settings,
+    ):
+        """
+        Rebuild the collection with new settings (any of GENERATION_SETTINGS,
+        e.g. chunk_unit="tokens" or hnsw_m=32) without taking search down.
+
+        A new generation is built from this one's manifests (ingested files and
+        URLs) while this one keeps serving. Both are then queried with probe
+        chunks sampled from the live collection: the switch only happens if
+        every source was rebuilt, probe recall@probe_k dropped by at most
+        max_recall_drop and p95 latency grew by at most max_latency_factor.
+        The alias then points at the new generation and this engine swaps to
+        it between two searches; the old generation is deleted after
+        generation_grace_s.
+
+        With background=True the rebuild runs on its own thread and a Future
+        of the ReindexReport is returned.
+        """
+        unknown = set(settings) - set(self.GENERATION_SETTINGS)
+        if unknown:
+            raise TypeError(f"reindex() cannot change {sorted(unknown)}; allowed: {self.GENERATION_SETTINGS}")
+        options = dict(
+            probes=probes, probe_k=probe_k, max_recall_drop=max_recall_drop, max_latency_factor=max_latency_factor,
+            allow_missing_sources=allow_missing_sources, workers=workers,
+        )
+        if background:
+            if self._reindex_executor is None:
+                self._reindex_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rag-reindex")
+            return self._reindex_executor.submit(self.reindex, **options, **settings)
+        if not self._reindex_lock.acquire(blocking=False):
+            raise RuntimeError(f"A reindex of {self.alias} is already running")
+        try:
+            return self._reindex(settings, **options)
+        finally:
+            self._reindex_lock.release()
+
+    def _reindex(
+        self, settings: dict, probes: int, probe_k: int, max_recall_drop: float, max_latency_factor: float,
+        allow_missing_sources: bool, workers: int,
+    ) -> ReindexReport:
+        start = time.perf_counter()
+        collected = self.collect_generations()
+        name = generation_name(self.alias)
+        generation_settings = {key: self._init_args[key] for key in self.GENERATION_SETTINGS}
+        generation_settings.update(settings)
+        report = ReindexReport(self.alias, name, self.collection_name, settings=generation_settings, collected=collected)
+        self.aliases.register(self.alias, Generation(name, generation_settings))
+        self.aliases.save()
+        print(f" Reindex: building {name} with {settings or 'the current settings'} while {self.collection_name} serves")
+
+        # The candidate shares this engine's Chroma client and, if the backend is unchanged, its loaded model
+        # and embedding cache (one instance, so the live engine's ingests and the rebuild write the same index)
+        candidate = RAGEngine(**{**self._init_args, **settings, "query_cache_on_disk": False}, generation=name)
+        candidate._client = self.client
+        if candidate.embedding_backend == self.embedding_backend:
+            candidate._embedding_fn = self.embedding_fn
+        if candidate.embedding_cache is not None and candidate.embedding_model_id == self.embedding_model_id:
+            candidate.embedding_cache = self.embedding_cache
+        try:
+            missing = self._sync_generation(candidate, workers)
+            report.build_s = time.perf_counter() - start
+            report.sources = len(candidate.catalog)
+            report.chunks = candidate.collection.count()
+
+            sample = sample_probes(self.collection, probes, seed=None)
+            report.live = run_probes(lambda query, k: self.search_many([query], n_results=k)[0], sample, probe_k)
+            report.candidate = run_probes(lambda query, k: candidate.search_many([query], n_results=k)[0], sample, probe_k)
+            report.missing_sources = missing
+            report.passed, report.reason = check_candidate(
+                report.live, report.candidate, [] if allow_missing_sources else missing, report.chunks,
+                max_recall_drop, max_latency_factor,
+            )
+            if report.passed:
+                with self._ingest_lock:
+                    # Catch up with ingests that finished during the build; new ones wait for the switch
+                    missing = self._sync_generation(candidate, workers)
+                    report.missing_sources = missing
+                    if missing and not allow_missing_sources:
+                        report.passed, report.reason = False, f"{len(missing)} sources could not be rebuilt"
+                    else:
+                        self._switch_to(candidate, settings)
+                        report.switched = True
+        finally:
+            candidate._search_executor.shutdown(wait=False)
+            candidate._ingest_executor.shutdown(wait=False)
+            if not report.switched:
+                self._drop_generation(name)
+
+        if report.switched:
+            if self.generation_grace_s <= 0:
+                report.collected += self.collect_generations()
+            else:
+                timer = threading.Timer(self.generation_grace_s, self.collect_generations)
+                timer.daemon = True
+                timer.start()
+        report.elapsed_s = time.perf_counter() - start
+        print(f" Reindex: {report.summary()}")
+        return report
+
+    def _switch_to(self, candidate: "RAGEngine", settings: dict):
+        """Point the alias at candidate's generation and serve it from this engine."""
+        with self._swap_lock.writing():
+            self.aliases.switch(self.alias, candidate.collection_name)
+            for attr in self.GENERATION_ATTRS:
+                setattr(self, attr, getattr(candidate, attr))
+            self._init_args.update(settings)
+            self._reranker_failed = False
+            # Cached results and query vectors belong to the previous generation
+            self.query_cache.bump_version()
+            self.query_cache.clear_embeddings()
+
+    @staticmethod
+    def _format_results(results: dict, row: int) -> list[dict]:
+        formatted_results = []
+        for i in range(len(results['ids'][row])):
+            distance = results['distances'][row][i]
+            similarity = 1 - distance
+
+            metadata = results['metadatas'][row][i] or {}
+
+            formatted_results.append({
+                "id": results['ids'][row][i],
+                "text": chunk_text(metadata, results['documents'][row][i]),
+                "source": metadata.get("source", "Unknown"),
+                "score": round(similarity, 4)
+            })
+            if "parent_id" in metadata:
+                formatted_results[-1]["parent_id"] = metadata["parent_id"]
+        return formatted_results
+
+    @staticmethod
+    def merge_results(result_lists: list[list[dict]], limit: int | None = None) -> list[dict]:
+        """Merge per-query results into one list, deduplicated by (source, text), best score first."""
+        best: dict[tuple[str, str], dict] = {}
+        for results in result_lists:
+            for res in results:
+                key = (res["source"], res["text"])
+                if key not in best or res["score"] > best[key]["score"]:
+                    best[key] = res
+        merged = sorted(best.values(), key=lambda r: r["score"], reverse=True)
+        return merged[:limit] if limit else merged
+
+    def search(
+        self,
+        query: str,
+        n_results: int = 5,
+        mode: str = "dense",
+        rerank: bool = False,
+        candidates: int = 20,
+        min_score: float | None = None,
+        where: dict | None = None,
+    ) -> list[dict]: # top-k =5
+        """
+        Search the collection. With rerank=True, over-fetch `candidates`
+        results, rescore them with the cross-encoder and keep the best
+        n_results scoring at least min_score.
+
+        `where` is a Chroma metadata filter (see catalog.build_where), e.g.
+        {"source_type": "pdf"} or {"source": "r1.pdf"}. It is applied inside
+        the index, before ranking, for both the dense and the BM25 side.
+        """
+        if not rerank:
+            return self.search_many([query], n_results=n_results, mode=mode, where=where)[0]
+        results = self.search_many([query], n_results=max(candidates, n_results), mode=mode, where=where)[0]
+        return self.rerank(query, results, n_results, min_score)
+
+    def rerank(self, query: str, results: list[dict], n_results: int, min_score: float | None = None) -> list[dict]:
+        """Rerank first-stage results; falls back to them if the cross-encoder is unavailable."""
+        if not results or self._reranker_failed:
+            return results[:n_results]
+        try:
+            self.reranker.model
+        except Exception as e:
+            # Don't retry a missing model on every query
+            self._reranker_failed = True
+            logger.warning(f"Reranking disabled, using first-stage results: {e}")
+            return results[:n_results]
+        try:
+            reranked = self.reranker.rerank(query, results, top_k=n_results, min_score=min_score)
         except Exception as e:
-            print(f"Error reading URL {url}: {e}")
+            # A scoring error (timeout, bad input) only costs this query its reranking
+            logger.warning(f"Reranking failed, using first-stage results for this query: {e}")
+            return results[:n_results]
+        logger.info(f"Reranked {len(results)} candidates -> {len(reranked)} ({self.reranker.stats()})")
+        return reranked
 
-    def search(self, query: str, n_results: int = 5) -> list[dict]: # top-k =5
-        query_text = f"query: {query}"
-        
+    def compress(self, query: str, results: list[dict], token_budget: int | None = None) -> tuple[list[dict], CompressionReport]:
+        """Keep only the results' sentences closest to the query, within token_budget (see ContextCompressor)."""
+        return self.compressor.compress(query, results, token_budget)
+
+    def compress_text(self, query: str, text: str, token_budget: int | None = None) -> tuple[str, CompressionReport]:
+        """Same for free text, e.g. one agent's answer before it goes into the next agent's prompt."""
+        return self.compressor.compress_text(query, text, token_budget)
+
+    def search_many(
+        self,
+        queries: list[str],
+        n_results: int = 5,
+        where: dict | None = None,
+        merge: bool = False,
+        mode: str = "dense",
+    ):
+        """
+        Search several queries with one embedding batch and one collection.query call.
+
+        mode="dense" ranks by cosine similarity; mode="hybrid" also runs BM25
+        over the lexical index and fuses both rankings with weighted RRF (the
+        score is then the fused RRF score).
+
+        Returns one result list per query (same shape as search()), or, with
+        merge=True, a single list deduplicated across queries.
+        """
+        if not queries:
+            return [] 
+        if mode not in ("dense", "hybrid"):
+            raise ValueError(f"Unknown search mode: {mode}")
+
+        # Level-2 cache: final results per (query, n_results, mode, filter, collection and layout)
+        version = self.query_cache.version
+        scope = [self.collection_name, self.embedding_model_id, self.parent_chunker is not None]
+        keys = [self.query_cache.result_key(query, n_results, mode, where, scope) for query in queries]
+        per_query = [self.query_cache.get_results(key) for key in keys]
+        todo = [i for i, cached in enumerate(per_query) if cached is None]
+
+        if todo:
+            with self._swap_lock.reading():
+                self._search_uncached(queries, todo, per_query, keys, version, n_results, where, mode)
+
+        if merge:
+            return self.merge_results(per_query)
+        return per_query
+
+    def _search_uncached(self, queries, todo, per_query, keys, version, n_results, where, mode):
+        """Search the queries at indexes `todo` against the live generation and fill per_query."""
+        # Headroom so collapsing near-duplicate hits still leaves n_results
+        keep = n_results * 2 if self.dedup_threshold else n_results
+        if self.parent_chunker is not None:
+            keep *= self.PARENT_FANOUT
+        candidates = keep if mode == "dense" else max(n_results * 4, 20)
+        query_vectors = self._embed_queries([f"query: {queries[i]}" for i in todo])
         results = self.collection.query(
-            query_texts=[query_text],
-            n_results=n_results,
+            query_embeddings=self._index_vectors(query_vectors),
+            # Truncated vectors are only a first stage: over-fetch, then rescore
+            n_results=candidates * self.rescore_factor if self.vector_dims else candidates,
+            where=where,
             include=["metadatas", "distances", "documents"]
         )
-        
-        formatted_results = []
-        if results['ids']:
-            for i in range(len(results['ids'][0])):
-                distance = results['distances'][0][i]
-                similarity = 1 - distance 
-                
-                metadata = results['metadatas'][0][i]
-                original_text = metadata.get("original_text", results['documents'][0][i])
-
-                formatted_results.append({
-                    "text": original_text,
-                    "source": metadata.get("source", "Unknown"),
-                    "score": round(similarity, 4)
-                })
-                
-        return formatted_results
 
-rag_engine = RAGEngine()
+        for row, i in enumerate(todo):
+            fresh = self._format_results(results, row)
+            if self.vector_dims:
+                fresh = self._rescore(query_vectors[row], fresh)[:candidates]
+            if mode == "hybrid":
+                fresh = self._fuse_lexical(queries[i], fresh, keep, where)
+            if self.dedup_threshold:
+                fresh = collapse_near_duplicates(fresh, self._minhasher, self.dedup_threshold)
+            if self.parent_chunker is not None:
+                fresh = self._expand_parents(fresh)
+            fresh = fresh[:n_results]
+            per_query[i] = fresh
+            self.query_cache.put_results(keys[i], fresh, version)
+
+    def _expand_parents(self, results: list[dict]) -> list[dict]:
+        """
+        Small-to-big: replace child hits by their parent section, fetched by id
+        from the parent store. Hits sharing a parent merge into one result,
+        ranked at its best child, so no text reaches the LLM twice; child_ids
+        lists the children that matched. Results without a parent (e.g. from
+        add_documents) pass through unchanged.
+        """
+        merged: dict[str, dict] = {}
+        for result in results:
+            parent_id = result.get("parent_id")
+            if parent_id is None:
+                merged.setdefault(result["id"], result)
+            elif parent_id in merged:
+                merged[parent_id]["child_ids"].append(result["id"])
+            else:
+                child = {key: value for key, value in result.items() if key != "parent_id"}
+                merged[parent_id] = {**child, "id": parent_id, "child_ids": [result["id"]]}
+
+        parents = self.parent_store.get_many([key for key, result in merged.items() if "child_ids" in result])
+        for parent_id, parent in parents.items():
+            merged[parent_id]["text"] = parent["text"]
+            if "page" in parent:
+                merged[parent_id]["page"], merged[parent_id]["page_end"] = parent["page"], parent["page_end"]
+        missing = sum("child_ids" in result for result in merged.values()) - len(parents)
+        if missing:
+            # Should not happen outside a concurrent re-ingest; the child text is still a valid hit
+            logger.warning(f"{missing} parent sections not found, returning their child chunks")
+        return list(merged.values())
+
+    def _fuse_lexical(
+        self,
+        query: str,
+        dense: list[dict],
+        n_results: int,
+        where: dict | None,
+        weights: tuple[float, float] = (1.0, 1.0),
+    ) -> list[dict]:
+        """Fuse dense candidates with BM25 candidates using weighted RRF."""
+        if len(self.lexical_index) == 0 and self.collection.count() > 0:
+            self.rebuild_lexical_index()
+
+        # Restrict BM25 to the chunks matching the filter before scoring, with the fields kept in the index
+        k = max(len(dense), n_results)
+        try:
+            lexical = self.lexical_index.search(query, k=k, where=where)
+        except ValueError:
+            # A filter on other metadata: ask Chroma which chunks match
+            lexical = self.lexical_index.search(
+                query, k=k, allowed=set(self.collection.get(where=where, include=[])["ids"])
+            )
+        fused = weighted_rrf([[(r["id"], r["score"]) for r in dense], lexical], weights=list(weights))
+
+        by_id = {r["id"]: r for r in dense}
+        # Lexical-only hits: fetch their text (and apply the filter) in one call
+        missing = [doc_id for doc_id, _ in fused if doc_id not in by_id]
+        if missing:
+            fetched = self.collection.get(ids=missing, where=where, include=["metadatas", "documents"])
+            for doc_id, metadata, document in zip(fetched["ids"], fetched["metadatas"], fetched["documents"]):
+                by_id[doc_id] = {
+                    "id": doc_id,
+                    "text": chunk_text(metadata, document),
+                    "source": (metadata or {}).get("source", "Unknown"),
+                }
+                if "parent_id" in (metadata or {}):
+                    by_id[doc_id]["parent_id"] = metadata["parent_id"]
+
+        return [
+            {**by_id[doc_id], "score": round(score, 4)}
+            for doc_id, score in fused if doc_id in by_id
+        ][:n_results]
+
+    # ---- async API -------------------------------------------------------
+
+    async def asearch(
+        self,
+        query: str,
+        n_results: int = 5,
+        mode: str = "dense",
+        rerank: bool = False,
+        candidates: int = 20,
+        min_score: float | None = None,
+        where: dict | None = None,
+    ) -> list[dict]:
+        """Non-blocking search(); concurrent calls are coalesced into micro-batches."""
+        fetch = max(candidates, n_results) if rerank else n_results
+        results = await self.query_batcher.search(query, n_results=fetch, mode=mode, where=where)
+        if rerank:
+            return await self.arerank(query, results, n_results, min_score)
+        return results
+
+    async def asearch_many(self, queries: list[str], n_results: int = 5, where: dict | None = None,
+                           merge: bool = False, mode: str = "dense"):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._search_executor, lambda: self.search_many(queries, n_results, where, merge, mode)
+        )
+
+    async def arerank(self, query: str, results: list[dict], n_results: int, min_score: float | None = None) -> list[dict]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._search_executor, lambda: self.rerank(query, results, n_results, min_score)
+        )
+
+    async def acompress(self, query: str, results: list[dict], token_budget: int | None = None):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._search_executor, lambda: self.compress(query, results, token_budget))
+
+    async def acompress_text(self, query: str, text: str, token_budget: int | None = None):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._search_executor, lambda: self.compress_text(query, text, token_budget))
+
+    async def _run_ingest(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._ingest_executor, lambda: fn(*args, **kwargs))
+
+    async def aingest_pdf(self, file_path: str, batch_size: int = 100) -> int | None:
+        return await self._run_ingest(self.ingest_pdf, file_path, batch_size=batch_size)
+
+    async def aingest_directory(self, directory_path: str, **kwargs) -> IngestionReport:
+        return await self._run_ingest(self.ingest_directory, directory_path, **kwargs)
+
+    async def aingest_url(self, url: str):
+        return await self._run_ingest(self.ingest_url, url)
+
+    async def aingest_urls(self, urls: list[str], **kwargs) -> UrlFetchReport:
+        return await self._run_ingest(self.ingest_urls, urls, **kwargs)
+
+    async def acrawl_site(self, seeds: list[str] | str, **kwargs) -> CrawlReport:
+        return await self._run_ingest(self.crawl_site, seeds, **kwargs)
+
+    async def areindex(self, **kwargs) -> ReindexReport:
+        return await asyncio.wrap_future(self.reindex(background=True, **kwargs))
+
+_engine: RAGEngine | None = None
+_engine_lock = threading.Lock()
+
+def get_rag_engine() -> RAGEngine:
+    """Shared RAGEngine, created on first call (thread-safe)."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                from src.config import Config
+
+                _engine = RAGEngine(
+                    query_cache_ttl=Config.RAG_QUERY_CACHE_TTL,
+                    query_cache_on_disk=Config.RAG_QUERY_CACHE_ON_DISK,
+                    embedding_backend=Config.RAG_EMBEDDING_BACKEND,
+                    vector_dims=Config.RAG_VECTOR_DIMS,
+                    dedup_threshold=Config.RAG_DEDUP_THRESHOLD,
+                    pipeline_queue_size=Config.RAG_PIPELINE_QUEUE_SIZE,
+                    chunk_unit=Config.RAG_CHUNK_UNIT,
+                    chunk_size=Config.RAG_CHUNK_SIZE,
+                    chunk_overlap=Config.RAG_CHUNK_OVERLAP,
+                    parent_child=Config.RAG_PARENT_CHILD,
+                    parent_chunk_size=Config.RAG_PARENT_CHUNK_SIZE,
+                    hnsw_m=Config.RAG_HNSW_M,
+                    hnsw_construction_ef=Config.RAG_HNSW_CONSTRUCTION_EF,
+                    hnsw_search_ef=Config.RAG_HNSW_SEARCH_EF,
+                    generation_grace_s=Config.RAG_REINDEX_GRACE_S,
+                )
+    return _engine
+
+def __getattr__(name):
+    # Backwards compatibility: `from src.rag.engine import rag_engine` still works,
+    # but only builds the engine when someone actually asks for it.
+    if name == "rag_engine":
+        return get_rag_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
@@ -0,0 +1,311 @@
+"""
+Retrieval quality and latency benchmark for RAGEngine.search.
+
+A golden set is a JSONL file, one query per line, in the lab_05 format
+plus two optional ways of naming relevant chunks that survive a change of
+chunking (chunk ids do not):
+
+    {"query_id": "q1", "query": "...", "relevant_doc_ids": ["<chunk id>"],
+     "relevant_sources": ["r1.pdf"], "relevant_texts": ["a phrase the answer contains"],
+     "where": {"source_type": "pdf"}}
+
+A chunk is relevant if its id is listed, or if it contains one of the
+relevant_texts (and, when relevant_sources is given, belongs to one of
+them). Metrics (src.rag.metrics, from lab_05) are reported at two levels:
+"chunk" over those chunks, for queries that name any, and "source" over
+the deduplicated sources of the results.
+
+run_benchmark() also measures sequential latency (p50/p95/p99), QPS with
+N concurrent clients and process memory. The query cache is bypassed
+unless use_cache=True, so repeated queries measure the index, not the cache.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+
+import numpy as np
+
+from src.rag.metrics import hit_rate_at_k, mean_reciprocal_rank, precision_at_k, recall_at_k
+from src.rag.query_cache import QueryCache
+from src.rag.storage import chunk_text, directory_size
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class GoldenQuery:
+    query_id: str
+    query: str
+    relevant_doc_ids: set[str] = field(default_factory=set)
+    relevant_sources: set[str] = field(default_factory=set)
+    relevant_texts: list[str] = field(default_factory=list)
+    where: dict | None = None
+
+def load_golden_set(path: str) -> list[GoldenQuery]:
+    golden = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            if not item.get("query"):
+                raise ValueError(f"{path}:{line_number}: missing 'query'")
+            golden.append(GoldenQuery(
+                query_id=str(item.get("query_id") or f"q{line_number}"),
+                query=item["query"],
+                relevant_doc_ids=set(item.get("relevant_doc_ids", [])),
+                relevant_sources=set(item.get("relevant_sources", [])),
+                relevant_texts=list(item.get("relevant_texts", [])),
+                where=item.get("where"),
+            ))
+            if not (golden[-1].relevant_doc_ids or golden[-1].relevant_sources or golden[-1].relevant_texts):
+                raise ValueError(f"{path}:{line_number}: no relevant_doc_ids, relevant_sources or relevant_texts")
+    return golden
+
+def file_digest(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:16]
+
+def _normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip().casefold()
+
+def relevant_chunks(collection, golden: list[GoldenQuery], page_size: int = 1000) -> tuple[list[set[str]], list[set[str]]]:
+    """
+    Relevant chunk ids and sources per golden query, resolved against the
+    stored chunks (one pass over the collection). In the parent/child layout
+    search returns parent sections, so the parent of a relevant child counts
+    as relevant too.
+    """
+    chunk_ids = [set(item.relevant_doc_ids) for item in golden]
+    sources = [set(item.relevant_sources) for item in golden]
+    texts = [[_normalize(text) for text in item.relevant_texts] for item in golden]
+    offset = 0
+    while True:
+        page = collection.get(limit=page_size, offset=offset, include=["metadatas", "documents"])
+        if not page["ids"]:
+            break
+        for doc_id, metadata, document in zip(page["ids"], page["metadatas"], page["documents"]):
+            source = (metadata or {}).get("source", "Unknown")
+            parent_id = (metadata or {}).get("parent_id")
+            stored = None
+            for i, item in enumerate(golden):
+                if doc_id in item.relevant_doc_ids:
+                    sources[i].add(source)
+                    if parent_id:
+                        chunk_ids[i].add(parent_id)
+                    continue
+                if not texts[i] or (item.relevant_sources and source not in item.relevant_sources):
+                    continue
+                stored = stored if stored is not None else _normalize(chunk_text(metadata, document))
+                if any(text in stored for text in texts[i]):
+                    chunk_ids[i].add(doc_id)
+                    sources[i].add(source)
+                    if parent_id:
+                        chunk_ids[i].add(parent_id)
+        offset += len(page["ids"])
+    return chunk_ids, sources
+
+def unique_sources(results: list[dict]) -> list[str]:
+    return list(dict.fromkeys(result["source"] for result in results))
+
+def quality(retrieved: list[list[str]], relevant: list[set[str]], k: int) -> dict:
+    """The lab_05 metrics over the queries that have relevance labels."""
+    pairs = [(ret, rel) for ret, rel in zip(retrieved, relevant) if rel]
+    if not pairs:
+        return {"queries": 0}
+    retrieved, relevant = [ret for ret, _ in pairs], [rel for _, rel in pairs]
+    return {
+        "queries": len(pairs),
+        f"hit@{k}": round(hit_rate_at_k(retrieved, relevant, k), 4),
+        "mrr": round(mean_reciprocal_rank(retrieved, relevant), 4),
+        f"precision@{k}": round(precision_at_k(retrieved, relevant, k), 4),
+        f"recall@{k}": round(recall_at_k(retrieved, relevant, k), 4),
+    }
+
+def latency_stats(latencies_ms: list[float]) -> dict:
+    if not latencies_ms:
+        return {}
+    return {
+        "count": len(latencies_ms),
+        "mean_ms": round(float(np.mean(latencies_ms)), 3),
+        "p50_ms": round(float(np.percentile(latencies_ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(latencies_ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(latencies_ms, 99)), 3),
+    }
+
+def memory_stats() -> dict:
+    """Current and peak resident set size of this process, in MB (Linux / macOS)."""
+    stats = {}
+    try:
+        with open("/proc/self/statm") as f:
+            stats["rss_mb"] = round(int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6, 1)
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        import sys
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in KB on Linux, bytes on macOS
+        stats["peak_rss_mb"] = round(peak / 1e6 if sys.platform == "darwin" else peak / 1e3, 1)
+    except ImportError:
+        pass
+    return stats
+
+@dataclass
+class BenchmarkRun:
+    engine: str
+    variant: str
+    settings: dict = field(default_factory=dict)  # engine and search parameters
+    k: int = 5
+    chunks: int = 0
+    index_mb: float = 0.0
+    quality: dict = field(default_factory=dict)  # level -> metrics
+    latency: dict = field(default_factory=dict)  # sequential, one client
+    throughput: list[dict] = field(default_factory=list)  # per concurrency level
+    memory: dict = field(default_factory=dict)
+    chars_per_result: float = 0.0  # context handed to the LLM per hit
+    per_query: list[dict] = field(default_factory=list)
+
+    @property
+    def key(self) -> str:
+        return f"{self.engine}/{self.variant}"
+
+    def row(self) -> str:
+        chunk, source = self.quality.get("chunk", {}), self.quality.get("source", {})
+        qps = " ".join(f"{t['clients']}:{t['qps']:.1f}" for t in self.throughput)
+        return (
+            f"{self.key:<28} {chunk.get(f'hit@{self.k}', float('nan')):>7.3f} {chunk.get('mrr', float('nan')):>6.3f} "
+            f"{source.get(f'hit@{self.k}', float('nan')):>7.3f} {source.get('mrr', float('nan')):>6.3f} "
+            f"{self.latency.get('p50_ms', 0):>7.1f} {self.latency.get('p95_ms', 0):>7.1f} {self.latency.get('p99_ms', 0):>7.1f} "
+            f"{self.memory.get('rss_mb', 0):>7.0f}  {qps}"
+        )
+
+TABLE_HEADER = (
+    f"{'engine/variant':<28} {'chunk':>7} {'':>6} {'source':>7} {'':>6} {'p50':>7} {'p95':>7} {'p99':>7} {'RSS MB':>7}  QPS by clients\n"
+    f"{'':<28} {'hit@k':>7} {'MRR':>6} {'hit@k':>7} {'MRR':>6} {'ms':>7} {'ms':>7} {'ms':>7}"
+)
+
+def run_benchmark(
+    engine,
+    golden: list[GoldenQuery],
+    k: int = 5,
+    search_kwargs: dict | None = None,
+    clients: tuple[int, ...] = (1, 4),
+    rounds: int = 1,
+    warmup: int = 3,
+    use_cache: bool = False,
+    engine_name: str = "default",
+    variant: str = "default",
+    settings: dict | None = None,
+) -> BenchmarkRun:
+    """
+    Run every golden query through engine.search(query, n_results=k,
+    **search_kwargs): quality and sequential latency over `rounds` passes,
+    then QPS with each number of concurrent clients over the same passes.
+    """
+    search_kwargs = dict(search_kwargs or {})
+    run = BenchmarkRun(engine_name, variant, {**(settings or {}), **search_kwargs}, k)
+    run.chunks = engine.collection.count()
+    run.index_mb = round(directory_size(engine.persist_directory) / 1e6, 1)
+    chunk_relevant, source_relevant = relevant_chunks(engine.collection, golden)
+
+    def search(item: GoldenQuery) -> list[dict]:
+        return engine.search(item.query, n_results=k, where=item.where, **search_kwargs)
+
+    cache = engine.query_cache
+    if not use_cache:
+        engine.query_cache = QueryCache(max_embeddings=0, max_results=0)
+    try:
+        for item in golden[:warmup]:
+            search(item)
+
+        latencies, results = [], []
+        for round_ in range(rounds):
+            for item in golden:
+                start = time.perf_counter()
+                found = search(item)
+                latencies.append((time.perf_counter() - start) * 1000)
+                if round_ == 0:
+                    results.append(found)
+        run.latency = latency_stats(latencies)
+
+        for n in clients:
+            jobs = golden * rounds
+            timings = []
+
+            def timed(item: GoldenQuery):
+                start = time.perf_counter()
+                search(item)
+                timings.append((time.perf_counter() - start) * 1000)
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=n, thread_name_prefix="rag-bench") as executor:
+                list(executor.map(timed, jobs))
+            elapsed = time.perf_counter() - start
+            run.throughput.append({"clients": n, "qps": round(len(jobs) / elapsed, 2), **latency_stats(timings)})
+    finally:
+        engine.query_cache = cache
+
+    hits = [result for found in results for result in found]
+    run.chars_per_result = round(sum(len(result["text"]) for result in hits) / len(hits), 1) if hits else 0.0
+    retrieved_chunks = [[result["id"] for result in found] for found in results]
+    retrieved_sources = [unique_sources(found) for found in results]
+    run.quality = {
+        "chunk": quality(retrieved_chunks, chunk_relevant, k),
+        "source": quality(retrieved_sources, source_relevant, k),
+    }
+    for item, found, chunk_rel, source_rel in zip(golden, results, chunk_relevant, source_relevant):
+        ranks = [rank for rank, result in enumerate(found, 1) if result["id"] in chunk_rel]
+        source_ranks = [rank for rank, source in enumerate(unique_sources(found), 1) if source in source_rel]
+        run.per_query.append({
+            "query_id": item.query_id,
+            "first_chunk_rank": ranks[0] if ranks else 0,
+            "first_source_rank": source_ranks[0] if source_ranks else 0,
+            "relevant_chunks": len(chunk_rel),
+            "retrieved": [result["id"] for result in found],
+        })
+    run.memory = memory_stats()
+    return run
+
+def report_dict(runs: list[BenchmarkRun], golden_path: str, **meta) -> dict:
+    """Machine-readable report; two of them can be compared with compare_reports()."""
+    return {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "golden_set": {"path": golden_path, "sha256": file_digest(golden_path)},
+        **meta,
+        "runs": [asdict(run) for run in runs],
+    }
+
+def _flatten(run: dict) -> dict[str, float]:
+    values = {}
+    for level, metrics in run.get("quality", {}).items():
+        values.update({f"{level}.{name}": value for name, value in metrics.items() if name != "queries"})
+    values.update({f"latency.{name}": value for name, value in run.get("latency", {}).items() if name != "count"})
+    for level in run.get("throughput", []):
+        values[f"qps@{level['clients']}"] = level["qps"]
+    values.update({f"memory.{name}": value for name, value in run.get("memory", {}).items()})
+    values["index_mb"] = run.get("index_mb", 0.0)
+    values["chunks"] = run.get("chunks", 0)
+    values["chars_per_result"] = run.get("chars_per_result", 0.0)
+    return values
+
+def compare_reports(baseline: dict, current: dict) -> list[dict]:
+    """Per engine/variant and metric: baseline, current and the change, for runs present in both."""
+    before = {f"{run['engine']}/{run['variant']}": _flatten(run) for run in baseline.get("runs", [])}
+    rows = []
+    for run in current.get("runs", []):
+        key = f"{run['engine']}/{run['variant']}"
+        if key not in before:
+            continue
+        for metric, value in _flatten(run).items():
+            if metric in before[key]:
+                old = before[key][metric]
+                rows.append({"run": key, "metric": metric, "baseline": old, "current": value, "delta": round(value - old, 4)})
+    if baseline.get("golden_set", {}).get("sha256") != current.get("golden_set", {}).get("sha256"):
+        logger.warning("The two reports were produced with different golden sets")
+    return rows
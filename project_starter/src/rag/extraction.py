@@ -0,0 +1,159 @@
+# PDF extraction that can run inside worker processes.
+# Kept free of chromadb / sentence_transformers imports so spawned workers stay light.
+import bisect
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator
+
+from src.rag.chunking import ChunkStats, RecursiveChunker, SectionChunker
+
+@dataclass
+class ExtractedDocument:
+    file_path: str
+    source: str
+    chunks: list[dict] = field(default_factory=list)  # {"text", "page", "page_end", "char_start", "char_end"}
+    pages: int = 0
+    title: str = ""
+    chunk_stats: ChunkStats | None = None
+    seconds: float = 0.0
+    error: str | None = None
+
+def _iter_pages(pdf) -> Iterator[tuple[int, str]]:
+    for page_number, page in enumerate(pdf.pages, 1):
+        text = page.extract_text()
+        page.close()  # release the page's cached layout objects
+        if text:
+            yield page_number, text
+
+def _pdf_title(pdf, file_path: str) -> str:
+    title = (pdf.metadata or {}).get("Title")
+    if isinstance(title, bytes):
+        title = title.decode("utf-8", errors="ignore")
+    title = str(title).strip() if title else ""
+    return title or os.path.splitext(os.path.basename(file_path))[0]
+
+def read_pdf_title(file_path: str) -> str:
+    """Title from the PDF metadata, falling back to the file name."""
+    try:
+        import pdfplumber
+
+        with pdfplumber.open(file_path) as pdf:
+            return _pdf_title(pdf, file_path)
+    except Exception:
+        return os.path.splitext(os.path.basename(file_path))[0]
+
+def iter_pdf_pages(file_path: str, info: dict | None = None) -> Iterator[tuple[int, str]]:
+    """Yield (page_number, text) one page at a time. info, if given, gets the title and page count."""
+    import pdfplumber
+
+    with pdfplumber.open(file_path) as pdf:
+        if info is not None:
+            info["title"] = _pdf_title(pdf, file_path)
+            info["pages"] = len(pdf.pages)
+        yield from _iter_pages(pdf)
+
+class PageChunker:
+    """
+    Chunk a stream of pages without building the full document text.
+
+    Pages are appended to a carry-over buffer. Every chunk except the last one
+    is final and gets emitted; the last one stays in the buffer so chunks can
+    still cross page boundaries. Each chunk is tagged with the page it starts
+    on, the page it ends on and its character span in the document text.
+
+    Pages are fed one at a time (feed / finish), so the chunker can sit in
+    a pipeline stage; iter_page_chunks is the generator form.
+    """
+    def __init__(self, chunker: RecursiveChunker):
+        self.chunker = chunker
+        self.buffer = ""
+        self.base = 0  # document offset of buffer[0]
+        self.page_starts: list[int] = []  # buffer offset where each page begins
+        self.page_numbers: list[int] = []
+
+    def _page_at(self, offset: int) -> int:
+        return self.page_numbers[max(bisect.bisect_right(self.page_starts, offset) - 1, 0)]
+
+    def _tag(self, chunk: str, start: int, end: int, length: int) -> dict:
+        self.chunker.stats.add(length)
+        return {
+            "text": chunk,
+            "page": self._page_at(start),
+            "page_end": self._page_at(max(end - 1, start)),
+            "char_start": self.base + start,
+            "char_end": self.base + end,
+        }
+
+    def feed(self, page_number: int, text: str) -> list[dict]:
+        """Add a page; returns the chunks that became final."""
+        self.page_starts.append(len(self.buffer))
+        self.page_numbers.append(page_number)
+        self.buffer += text + "\n"
+        if len(self.buffer) <= self.chunker.chunk_size:
+            return []
+
+        located = self.chunker.split_spans(self.buffer)
+        if len(located) < 2:
+            return []
+
+        chunks = [self._tag(chunk, start, end, length) for chunk, start, end, length in located[:-1]]
+
+        # Carry the (possibly incomplete) last chunk over to the next page
+        carry_start = located[-1][1]
+        self.buffer = self.buffer[carry_start:]
+        self.base += carry_start
+        kept = [i for i, start in enumerate(self.page_starts) if start > carry_start]
+        first_page = self._page_at(carry_start)
+        self.page_starts = [0] + [self.page_starts[i] - carry_start for i in kept]
+        self.page_numbers = [first_page] + [self.page_numbers[i] for i in kept]
+        return chunks
+
+    def finish(self) -> list[dict]:
+        """Chunk whatever is left in the buffer."""
+        buffer, self.buffer = self.buffer, ""
+        if not buffer.strip():
+            return []
+        return [self._tag(chunk, start, end, length) for chunk, start, end, length in self.chunker.split_spans(buffer)]
+
+def iter_page_chunks(pages: Iterable[tuple[int, str]], chunker: RecursiveChunker) -> Iterator[dict]:
+    """Chunk a stream of (page_number, text) pages; see PageChunker."""
+    page_chunker = PageChunker(chunker)
+    for page_number, text in pages:
+        yield from page_chunker.feed(page_number, text)
+    yield from page_chunker.finish()
+
+def extract_pdf_chunks(
+    file_path: str,
+    chunk_size: int = 1000,
+    chunk_overlap: int = 200,
+    unit: str = "chars",
+    tokenizer_name: str | None = None,
+    token_limit: int | None = None,
+    parent_size: int | None = None,
+) -> ExtractedDocument:
+    """
+    Extract text from a PDF and chunk it. Never raises; errors are returned on the result.
+    With parent_size set, the chunks are parent sections (SectionChunker) for the
+    parent/child layout; the caller cuts them into children.
+    """
+    start = time.perf_counter()
+    doc = ExtractedDocument(file_path=file_path, source=os.path.basename(file_path))
+    try:
+        import pdfplumber
+
+        if parent_size:
+            chunker = SectionChunker(parent_size, unit=unit, tokenizer_name=tokenizer_name)
+        else:
+            chunker = RecursiveChunker(
+                chunk_size, chunk_overlap, unit=unit, tokenizer_name=tokenizer_name, token_limit=token_limit
+            )
+        with pdfplumber.open(file_path) as pdf:
+            doc.pages = len(pdf.pages)
+            doc.title = _pdf_title(pdf, file_path)
+            doc.chunks = list(iter_page_chunks(_iter_pages(pdf), chunker))
+        doc.chunk_stats = chunker.stats
+    except Exception as e:
+        doc.error = str(e)
+    doc.seconds = time.perf_counter() - start
+    return doc
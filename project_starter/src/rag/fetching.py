@@ -0,0 +1,230 @@
+import hashlib
+import importlib.util
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Iterable, Iterator
+
+logger = logging.getLogger(__name__)
+
+URL_MANIFEST_FILENAME = "url_manifest.json"
+USER_AGENT = "Mozilla/5.0"
+
+# lxml parses large pages several times faster than the stdlib parser
+HTML_PARSER = "lxml" if importlib.util.find_spec("lxml") else "html.parser"
+
+def make_session(pool_size: int = 8, retries: int = 2):
+    """requests.Session with a connection pool sized for pool_size concurrent fetches."""
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+        max_retries=Retry(total=retries, backoff_factor=0.5, status_forcelist=(429, 502, 503, 504)),
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers["User-Agent"] = USER_AGENT
+    return session
+
+@dataclass
+class UrlRecord:
+    url: str
+    content_hash: str
+    size: int
+    settings: dict
+    etag: str | None = None
+    last_modified: str | None = None
+    chunks: int = 0
+    links: list[str] = field(default_factory=list)  # outlinks found by the crawler, reused after a 304
+    fetched_at: float = field(default_factory=time.time)
+
+@dataclass
+class FetchResult:
+    url: str
+    status: int = 0
+    html: str = ""
+    path: str | None = None  # PDFs are streamed to a file instead of kept in memory
+    links: list[str] = field(default_factory=list)
+    size: int = 0
+    content_hash: str = ""
+    etag: str | None = None
+    last_modified: str | None = None
+    unchanged: bool = False  # 304, or same body as the stored version
+    error: str | None = None
+    seconds: float = 0.0
+
+@dataclass
+class UrlFetchReport:
+    fetched: int = 0
+    not_modified: int = 0  # 304 responses
+    unchanged: int = 0  # 200 with the same body as last time
+    failed: int = 0
+    bytes_fetched: int = 0
+    bytes_revalidated: int = 0  # size of the stored versions that 304s confirmed
+    near_duplicates: int = 0
+    stale_chunks: int = 0
+    elapsed_s: float = 0.0
+
+    def summary(self) -> str:
+        return (
+            f"{self.fetched} fetched, {self.not_modified} not modified, {self.unchanged} unchanged, "
+            f"{self.failed} failed; {self.bytes_fetched / 1e3:.1f}KB downloaded, "
+            f"{self.bytes_revalidated / 1e3:.1f}KB revalidated without download; "
+            f"{self.near_duplicates} near-duplicate chunks suppressed, {self.stale_chunks} stale chunks removed "
+            f"in {self.elapsed_s:.1f}s"
+        )
+
+class UrlManifest:
+    """
+    Persistent record of ingested URLs: their validators (ETag /
+    Last-Modified) for conditional GETs, a hash of the body, and the
+    ingestion settings they were embedded with.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._records: dict[str, UrlRecord] = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self._records = {key: UrlRecord(**rec) for key, rec in data.get("urls", {}).items()}
+        except (OSError, ValueError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable URL manifest {self.path}: {e}")
+            self._records = {}
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with self._lock:
+            data = {"urls": {key: asdict(rec) for key, rec in self._records.items()}}
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def get(self, url: str) -> UrlRecord | None:
+        return self._records.get(url)
+
+    def record(self, result: FetchResult, settings: dict, chunks: int):
+        with self._lock:
+            self._records[result.url] = UrlRecord(
+                url=result.url,
+                content_hash=result.content_hash,
+                size=result.size,
+                settings=dict(settings),
+                etag=result.etag,
+                last_modified=result.last_modified,
+                chunks=chunks,
+                links=list(result.links),
+            )
+
+    def touch(self, result: FetchResult):
+        """Keep the stored version, refreshing its validators after a revalidation."""
+        with self._lock:
+            record = self._records.get(result.url)
+            if record is not None:
+                record.etag = result.etag
+                record.last_modified = result.last_modified
+                record.fetched_at = time.time()
+
+    def remove(self, url: str):
+        with self._lock:
+            self._records.pop(url, None)
+
+    def urls(self) -> list[str]:
+        return list(self._records)
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+def is_pdf(url: str, content_type: str = "") -> bool:
+    return "application/pdf" in content_type.lower() or url.lower().split("?")[0].endswith(".pdf")
+
+def fetch(
+    session, url: str, record: UrlRecord | None, timeout: float = 10.0, download_dir: str | None = None
+) -> FetchResult:
+    """
+    GET a page, conditionally when a stored record has validators. With a
+    download_dir, PDF responses are streamed to a file there (result.path)
+    instead of being decoded. Never raises; errors are returned on the
+    result.
+    """
+    start = time.perf_counter()
+    result = FetchResult(url=url)
+    headers = {}
+    if record is not None:
+        if record.etag:
+            headers["If-None-Match"] = record.etag
+        if record.last_modified:
+            headers["If-Modified-Since"] = record.last_modified
+    try:
+        # Closed on every path, so streamed responses go back to the session pool during long crawls
+        with session.get(url, headers=headers, timeout=timeout, stream=download_dir is not None) as response:
+            result.status = response.status_code
+            if response.status_code == 304:
+                if record is None:
+                    raise ValueError("304 Not Modified for a URL without a stored version")
+                result.unchanged = True
+            elif download_dir is not None and is_pdf(url, response.headers.get("Content-Type", "")):
+                response.raise_for_status()
+                digest = hashlib.sha256()
+                with tempfile.NamedTemporaryFile(dir=download_dir, suffix=".pdf", delete=False) as f:
+                    result.path = f.name
+                    for block in response.iter_content(1 << 16):
+                        f.write(block)
+                        digest.update(block)
+                        result.size += len(block)
+                result.content_hash = digest.hexdigest()
+                result.unchanged = record is not None and record.content_hash == result.content_hash
+            else:
+                response.raise_for_status()
+                body = response.content
+                result.size = len(body)
+                result.content_hash = hashlib.sha256(body).hexdigest()
+                result.html = response.text
+                result.unchanged = record is not None and record.content_hash == result.content_hash
+            result.etag = response.headers.get("ETag") or (record.etag if record else None)
+            result.last_modified = response.headers.get("Last-Modified") or (record.last_modified if record else None)
+    except Exception as e:
+        result.error = str(e)
+    result.seconds = time.perf_counter() - start
+    return result
+
+def fetch_many(
+    session,
+    urls: Iterable[str],
+    records: dict[str, UrlRecord | None],
+    concurrency: int = 8,
+    timeout: float = 10.0,
+    download_dir: str | None = None,
+) -> Iterator[FetchResult]:
+    """
+    Fetch URLs on `concurrency` threads and yield results in input order. At
+    most 2 * concurrency responses are held at once, so a slow consumer
+    throttles the downloads. See fetch() for download_dir.
+    """
+    urls = list(urls)
+    window = max(1, 2 * concurrency)
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="rag-fetch") as executor:
+        futures = []
+        next_index = 0
+        for position in range(len(urls)):
+            while next_index < len(urls) and next_index < position + window:
+                url = urls[next_index]
+                futures.append(executor.submit(fetch, session, url, records.get(url), timeout, download_dir))
+                next_index += 1
+            yield futures[position].result()
+            futures[position] = None  # let the response be collected
@@ -0,0 +1,21 @@
+def weighted_rrf(ranked_lists, weights=None, k=60):
+    """
+    Weighted Reciprocal Rank Fusion (lab_04).
+
+    Args:
+        ranked_lists: List of lists, each containing (doc_id, score) tuples sorted by score desc
+        weights: One weight per list (default 1.0 each)
+        k: Smoothing constant (default 60)
+
+    Returns:
+        List of (doc_id, fused_score) sorted by fused score descending
+    """
+    if weights is None:
+        weights = [1.0] * len(ranked_lists)
+
+    fused_scores = {}
+    for result_list, weight in zip(ranked_lists, weights):
+        for rank, (doc_id, _score) in enumerate(result_list):
+            fused_scores[doc_id] = fused_scores.get(doc_id, 0.0) + weight * (1.0 / (rank + k))
+
+    return sorted(fused_scores.items(), key=lambda x: x[1], reverse=True)
@@ -0,0 +1,269 @@
+"""
+Blue/green collection generations for RAGEngine.reindex.
+
+RAGEngine resolves its collection through an alias: the alias file maps the
+logical collection name (e.g. "research_papers") to the generation that is
+live. A reindex builds a new generation next to the live one, checks it
+against the live one on probe queries, then switches the alias; retired
+generations are deleted after a grace period, so processes still reading
+them have time to reload.
+
+A generation is a Chroma collection plus its side indexes (BM25, MinHash,
+source catalog, manifests). The original collection, named like its alias,
+keeps its side indexes in the persist directory; later generations keep
+theirs under generations/<name>/.
+"""
+import json
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+ALIASES_FILENAME = "collection_aliases.json"
+GENERATIONS_DIRNAME = "generations"
+
+def generation_name(alias: str) -> str:
+    """A new, unique Chroma collection name for the next generation of an alias."""
+    return f"{alias}-g{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+@dataclass
+class Generation:
+    name: str
+    settings: dict = field(default_factory=dict)  # constructor overrides it was built with
+    created_at: float = field(default_factory=time.time)
+    live_at: float | None = None
+    retired_at: float | None = None
+
+class CollectionAliases:
+    """
+    Persistent alias -> live generation map, with the generations known for
+    each alias. switch() rewrites the file with os.replace, so readers see
+    either the old or the new live generation, never a partial update.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._aliases: dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self._aliases = {
+                alias: {"live": entry.get("live"), "generations": [Generation(**g) for g in entry.get("generations", [])]}
+                for alias, entry in data.get("aliases", {}).items()
+            }
+        except (OSError, ValueError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable collection aliases {self.path}: {e}")
+            self._aliases = {}
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with self._lock:
+            data = {
+                "aliases": {
+                    alias: {"live": entry["live"], "generations": [asdict(g) for g in entry["generations"]]}
+                    for alias, entry in self._aliases.items()
+                }
+            }
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def _entry(self, alias: str) -> dict:
+        return self._aliases.setdefault(alias, {"live": None, "generations": []})
+
+    def live(self, alias: str) -> str | None:
+        entry = self._aliases.get(alias)
+        return entry["live"] if entry else None
+
+    def generations(self, alias: str) -> list[Generation]:
+        entry = self._aliases.get(alias)
+        return list(entry["generations"]) if entry else []
+
+    def get(self, alias: str, name: str) -> Generation | None:
+        return next((g for g in self.generations(alias) if g.name == name), None)
+
+    def register(self, alias: str, generation: Generation):
+        with self._lock:
+            entry = self._entry(alias)
+            entry["generations"] = [g for g in entry["generations"] if g.name != generation.name] + [generation]
+
+    def switch(self, alias: str, name: str) -> str | None:
+        """Make `name` the live generation and retire the previous one. Returns the previous name."""
+        now = time.time()
+        with self._lock:
+            entry = self._entry(alias)
+            previous = entry["live"] or alias
+            for generation in entry["generations"]:
+                if generation.name == name:
+                    generation.live_at, generation.retired_at = now, None
+                elif generation.name == previous:
+                    generation.retired_at = now
+            if not any(g.name == previous for g in entry["generations"]) and previous != name:
+                entry["generations"].insert(0, Generation(previous, created_at=0.0, retired_at=now))
+            entry["live"] = name
+        self.save()
+        return previous
+
+    def expired(self, alias: str, grace_s: float, now: float | None = None) -> list[Generation]:
+        """Retired generations whose grace period is over."""
+        now = time.time() if now is None else now
+        return [
+            g for g in self.generations(alias)
+            if g.retired_at is not None and g.retired_at + grace_s <= now and g.name != self.live(alias)
+        ]
+
+    def drop(self, alias: str, name: str):
+        with self._lock:
+            entry = self._aliases.get(alias)
+            if entry:
+                entry["generations"] = [g for g in entry["generations"] if g.name != name]
+
+def live_collection(persist_directory: str, alias: str) -> str:
+    """Chroma collection currently serving an alias (the alias itself until a reindex switched it)."""
+    return CollectionAliases(os.path.join(persist_directory, ALIASES_FILENAME)).live(alias) or alias
+
+class SwapLock:
+    """
+    Reader/writer lock around the live generation: searches read
+    concurrently; a generation switch waits for the searches in flight,
+    holds new ones back while it swaps a few attributes, then lets them go.
+    Waiting writers take precedence, so a steady query load cannot starve
+    a switch.
+    """
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    @contextmanager
+    def reading(self):
+        with self._cond:
+            while self._writer or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def writing(self):
+        with self._cond:
+            self._writers_waiting += 1
+            try:
+                while self._writer or self._readers:
+                    self._cond.wait()
+            finally:
+                self._writers_waiting -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
+
+@dataclass
+class Probe:
+    """A stored chunk used as a query: a good index returns its source in the top k."""
+    text: str
+    source: str
+
+def sample_probes(collection, n: int, seed: int | None = None, max_chars: int = 300) -> list[Probe]:
+    """Up to n stored chunks (truncated to max_chars) picked at random, so cached results do not skew latency."""
+    ids = collection.get(include=[])["ids"]
+    picked = random.Random(seed).sample(ids, min(n, len(ids)))
+    if not picked:
+        return []
+    page = collection.get(ids=picked, include=["documents", "metadatas"])
+    return [
+        Probe(document[:max_chars], (metadata or {}).get("source", ""))
+        for document, metadata in zip(page["documents"], page["metadatas"])
+        if document
+    ]
+
+@dataclass
+class ProbeResult:
+    recall: float = 0.0  # share of probes whose source is in the top k
+    p50_ms: float = 0.0
+    p95_ms: float = 0.0
+
+def run_probes(search, probes: list[Probe], k: int = 5) -> ProbeResult:
+    """Recall and latency of search(query, n_results) over the probes, one query at a time."""
+    if not probes:
+        return ProbeResult()
+    hits, latencies = 0, []
+    for probe in probes:
+        start = time.perf_counter()
+        results = search(probe.text, k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        hits += any(result["source"] == probe.source for result in results)
+    return ProbeResult(
+        recall=hits / len(probes),
+        p50_ms=float(np.percentile(latencies, 50)),
+        p95_ms=float(np.percentile(latencies, 95)),
+    )
+
+@dataclass
+class ReindexReport:
+    alias: str
+    generation: str
+    previous: str
+    settings: dict = field(default_factory=dict)
+    sources: int = 0
+    chunks: int = 0
+    missing_sources: list[str] = field(default_factory=list)  # live sources the new generation lacks
+    live: ProbeResult = field(default_factory=ProbeResult)
+    candidate: ProbeResult = field(default_factory=ProbeResult)
+    passed: bool = False
+    reason: str = ""
+    switched: bool = False
+    collected: list[str] = field(default_factory=list)  # generations garbage-collected
+    build_s: float = 0.0
+    elapsed_s: float = 0.0
+
+    def summary(self) -> str:
+        outcome = f"switched {self.alias} -> {self.generation}" if self.switched else f"kept {self.previous} ({self.reason})"
+        return (
+            f"{outcome}; {self.sources} sources / {self.chunks} chunks built in {self.build_s:.1f}s; "
+            f"probe recall {self.live.recall:.3f} -> {self.candidate.recall:.3f}, "
+            f"p95 {self.live.p95_ms:.1f}ms -> {self.candidate.p95_ms:.1f}ms"
+        )
+
+def check_candidate(
+    live: ProbeResult,
+    candidate: ProbeResult,
+    missing_sources: list[str],
+    chunks: int,
+    max_recall_drop: float = 0.05,
+    max_latency_factor: float = 2.0,
+    latency_slack_ms: float = 5.0,
+) -> tuple[bool, str]:
+    """Whether a new generation may go live, and why not."""
+    if chunks == 0:
+        return False, "new generation is empty"
+    if missing_sources:
+        return False, f"{len(missing_sources)} sources could not be rebuilt"
+    if candidate.recall < live.recall - max_recall_drop:
+        return False, f"probe recall fell from {live.recall:.3f} to {candidate.recall:.3f}"
+    if candidate.p95_ms > live.p95_ms * max_latency_factor + latency_slack_ms:
+        return False, f"probe p95 latency rose from {live.p95_ms:.1f}ms to {candidate.p95_ms:.1f}ms"
+    return True, "ok"
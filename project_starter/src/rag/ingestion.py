@@ -0,0 +1,312 @@
+"""
+Staged ingestion: extract -> clean -> chunk -> embed -> upsert.
+
+Each stage runs in its own thread with bounded queues in between (see
+src/rag/pipeline.py), so PDF parsing, model inference and Chroma's SQLite
+writes overlap instead of taking turns, and a slow stage throttles the
+ones feeding it. RAGEngine.ingest_pdf / ingest_directory / ingest_urls /
+crawl_site are thin wrappers around IngestionPipeline.run().
+
+Items passed between stages are (kind, SourceState, payload) tuples:
+  "start" / "end"  bracket each source
+  "page"           (page_number, text) of a PDF
+  "html" / "text"  a whole web page (fetched by src/rag/fetching.py), before / after cleaning
+  "parents"        parent sections for the parent store (parent/child layout only)
+  "chunks"         chunk dicts ready for add_documents
+  "batch"          a PreparedBatch (embed -> upsert)
+"""
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator
+
+from src.rag.catalog import SourceSwap
+from src.rag.chunking import ChunkStats
+from src.rag.extraction import ExtractedDocument, PageChunker, iter_pdf_pages
+from src.rag.fetching import HTML_PARSER, FetchResult
+from src.rag.pipeline import Pipeline, Stage, StageMetrics
+
+@dataclass
+class PdfJob:
+    file_path: str
+    source: str | None = None  # defaults to the file name; the URL for crawled PDFs
+
+@dataclass
+class PreparedBatch:
+    """A batch of unique, non-suppressed chunks on its way from embed to upsert."""
+    ids: list[str] = field(default_factory=list)
+    texts: list[str] = field(default_factory=list)
+    metadatas: list[dict] = field(default_factory=list)
+    swaps: dict[str, SourceSwap] = field(default_factory=dict)  # by source
+    added_to_dedup: list[str] = field(default_factory=list)
+    suppressed: int = 0
+    vectors: list | None = None
+    error: Exception | None = None
+
+@dataclass
+class SourceState:
+    """One source (PDF or URL) moving through the pipeline."""
+    source: str
+    source_type: str
+    file_path: str | None = None
+    title: str = ""
+    pages: int = 0
+    chunks: int = 0
+    sample: list[str] = field(default_factory=list)
+    fields: dict | None = None
+    swap: SourceSwap | None = None
+    page_chunker: PageChunker | None = None
+    chunk_stats: ChunkStats | None = None  # chunked elsewhere (process pool)
+    removed: int = 0  # chunks of the previous version deleted
+    error: str | None = None
+    stored: bool = False
+    started: float = field(default_factory=time.perf_counter)
+    seconds: float = 0.0
+
+@dataclass
+class IngestionRun:
+    sources: list[SourceState] = field(default_factory=list)
+    suppressed: int = 0
+    chunk_stats: ChunkStats | None = None
+    stages: list[StageMetrics] = field(default_factory=list)
+    elapsed_s: float = 0.0
+
+    @property
+    def removed(self) -> int:
+        return sum(state.removed for state in self.sources)
+
+def clean_html(html: str) -> tuple[str, str]:
+    """(title, text) of an HTML page, without scripts, styles or blank lines."""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, HTML_PARSER)
+    title = soup.title.get_text(strip=True) if soup.title else ""
+    for script in soup(["script", "style"]):
+        script.decompose()
+    lines = (line.strip() for line in soup.get_text(separator="\n").splitlines())
+    return title, "\n".join(line for line in lines if line)
+
+class IngestionPipeline:
+    """
+    One ingest run over a list of jobs: PdfJob, ExtractedDocument (already
+    chunked, e.g. by the extraction process pool) or FetchResult (a page
+    downloaded by fetch_many or the site crawler). Embedding batches
+    span sources; a source's chunk set is swapped (see RAGEngine._begin_swap)
+    once all of its batches are stored. on_source_done(state) is called from
+    the upsert stage as each source completes.
+    """
+    def __init__(self, engine, batch_size: int = 100, queue_size: int = 8, on_source_done=None):
+        self.engine = engine
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.on_source_done = on_source_done
+        self.run_info = IngestionRun()
+        # embed-stage state
+        self._docs: list[dict] = []
+        self._received = 0
+        self._flushed = 0
+        self._pending_ends: list[tuple[int, SourceState]] = []
+        self._swaps: dict[str, SourceSwap] = {}
+        self._collection_changed = False
+
+    # ---- stages -----------------------------------------------------------
+
+    def extract(self, job) -> Iterator[tuple]:
+        if isinstance(job, ExtractedDocument):
+            state = SourceState(
+                job.source, "pdf", file_path=job.file_path, title=job.title, pages=job.pages,
+                chunk_stats=job.chunk_stats, error=job.error,
+            )
+            state.started -= job.seconds  # extraction happened in a worker process
+            yield "start", state, None
+            if not job.error:
+                yield "chunks", state, job.chunks
+            yield "end", state, None
+        elif isinstance(job, PdfJob):
+            state = SourceState(job.source or os.path.basename(job.file_path), "pdf", file_path=job.file_path)
+            yield "start", state, None
+            info: dict = {}
+            try:
+                for page in iter_pdf_pages(job.file_path, info):
+                    # Set before the first page moves on: the chunk stage copies the title onto chunks
+                    state.title, state.pages = info["title"], info["pages"]
+                    yield "page", state, page
+            except Exception as e:
+                state.error = str(e)
+            yield "end", state, None
+        elif isinstance(job, FetchResult):
+            state = SourceState(job.url, "web", error=job.error)
+            yield "start", state, None
+            if not job.error:
+                yield "html", state, job.html
+            yield "end", state, None
+        else:
+            raise TypeError(f"Unknown ingestion job: {job!r}")
+
+    def clean(self, item) -> Iterable[tuple]:
+        kind, state, payload = item
+        if kind == "html" and not state.error:
+            try:
+                state.title, text = clean_html(payload)
+                return [("text", state, text)]
+            except Exception as e:
+                state.error = str(e)
+                return []
+        return [item]
+
+    def chunk(self, item) -> Iterable[tuple]:
+        kind, state, payload = item
+        # Parent/child layout: pages and texts are cut into parent sections first
+        chunker = self.engine.parent_chunker or self.engine.chunker
+        if kind == "start":
+            if state.chunk_stats is not None and self.engine.parent_chunker is None:
+                chunker.stats.merge(state.chunk_stats)
+            return [item]
+        if state.error and kind != "end":
+            return []
+        if kind == "page":
+            if state.page_chunker is None:
+                state.page_chunker = PageChunker(chunker)
+            chunks = state.page_chunker.feed(*payload)
+        elif kind == "text":
+            chunks = []
+            for text, start, end, length in chunker.split_spans(payload):
+                chunker.stats.add(length)
+                chunks.append({"text": text, "char_start": start, "char_end": end})
+        elif kind == "end":
+            chunks = state.page_chunker.finish() if state.page_chunker is not None and not state.error else []
+            return self._chunk_items(state, chunks) + [item]
+        else:
+            chunks = payload
+        return self._chunk_items(state, chunks)
+
+    def _chunk_items(self, state: SourceState, chunks: list[dict]) -> list[tuple]:
+        if not chunks:
+            return []
+        if self.engine.parent_chunker is None:
+            return [("chunks", state, self._tag(state, chunks))]
+        parents, children = self._split_children(state, chunks)
+        # Parents go first, so a stored child never points at a missing parent
+        return [("parents", state, parents), ("chunks", state, self._tag(state, children))]
+
+    def _split_children(self, state: SourceState, sections: list[dict]) -> tuple[list[dict], list[dict]]:
+        """Parent/child layout: each section is stored once and cut into small children that get embedded."""
+        chunker = self.engine.chunker
+        parents, children = [], []
+        for section in sections:
+            parent_id = self.engine._parent_id(section["text"], state.source)
+            parents.append({**section, "id": parent_id, "source": state.source})
+            offset = section.get("char_start", 0)
+            for text, start, end, length in chunker.split_spans(section["text"]):
+                chunker.stats.add(length)
+                child = {"text": text, "parent_id": parent_id, "char_start": offset + start, "char_end": offset + end}
+                if "page" in section:
+                    child["page"], child["page_end"] = section["page"], section["page_end"]
+                children.append(child)
+        return parents, children
+
+    def _tag(self, state: SourceState, chunks: list[dict]) -> list[dict]:
+        if state.fields is None:
+            state.fields = self.engine._source_fields(state.source_type, state.title or self._fallback_title(state))
+        for chunk in chunks:
+            if len(state.sample) < 5:
+                state.sample.append(chunk["text"])
+            if "page_end" in chunk:
+                state.pages = max(state.pages, chunk["page_end"])
+        state.chunks += len(chunks)
+        return [{**chunk, **state.fields, "source": state.source} for chunk in chunks]
+
+    @staticmethod
+    def _fallback_title(state: SourceState) -> str:
+        if state.source_type == "pdf":
+            return os.path.splitext(os.path.basename(state.source))[0]
+        return state.source
+
+    def embed(self, item) -> Iterator[tuple]:
+        kind, state, payload = item
+        if kind == "start":
+            state.swap = self.engine._begin_swap([state.source])
+            self._swaps[state.source] = state.swap
+        elif kind == "parents":
+            self.engine._store_parents(payload, state.swap)
+        elif kind == "chunks":
+            self._docs.extend(payload)
+            self._received += len(payload)
+        elif kind == "end":
+            self._pending_ends.append((self._received, state))
+        yield from self._flush(full_only=True)
+
+    def close_embed(self) -> Iterator[tuple]:
+        yield from self._flush(full_only=False)
+
+    def _flush(self, full_only: bool) -> Iterator[tuple]:
+        while len(self._docs) >= self.batch_size or (self._docs and not full_only):
+            documents, self._docs = self._docs[:self.batch_size], self._docs[self.batch_size:]
+            self._flushed += len(documents)
+            batch = self.engine._prepare_batch(documents, self._swaps)
+            self.run_info.suppressed += batch.suppressed
+            if batch.ids:
+                try:
+                    self.engine._embed_batch(batch)
+                except Exception as e:
+                    batch.error = e
+                yield "batch", None, batch
+        # A source is done once every chunk it sent is in an emitted batch
+        while self._pending_ends and self._pending_ends[0][0] <= self._flushed:
+            yield "end", self._pending_ends.pop(0)[1], None
+
+    def upsert(self, item) -> Iterable[tuple]:
+        kind, state, payload = item
+        if kind == "batch":
+            self._collection_changed |= self.engine._upsert_batch(payload)
+        elif kind == "end":
+            self._finish_source(state)
+        return ()
+
+    def _finish_source(self, state: SourceState):
+        swap = state.swap
+        if swap is not None and swap.failed and not state.error:
+            state.error = "some chunks could not be stored; kept the previous version"
+        if state.error:
+            if swap is not None:
+                swap.failed = True
+                self.engine._finish_swap(swap)  # roll back to the previous version
+        else:
+            state.removed = self.engine._finish_swap(swap) if swap is not None else 0
+            self.engine._record_source(
+                state.source, state.source_type, state.title or self._fallback_title(state),
+                state.sample, state.chunks, state.pages,
+            )
+            state.stored = True
+        state.seconds = time.perf_counter() - state.started
+        self._swaps.pop(state.source, None)
+        self.run_info.sources.append(state)
+        if self.on_source_done is not None:
+            self.on_source_done(state)
+
+    # ---- run --------------------------------------------------------------
+
+    def run(self, jobs: Iterable) -> IngestionRun:
+        start = time.perf_counter()
+        self.run_info.chunk_stats = self.engine.chunker.reset_stats()
+        if self.engine.parent_chunker is not None:
+            self.engine.parent_chunker.reset_stats()
+        pipeline = Pipeline(
+            [
+                Stage("extract", self.extract),
+                Stage("clean", self.clean),
+                Stage("chunk", self.chunk),
+                Stage("embed", self.embed, self.close_embed),
+                Stage("upsert", self.upsert),
+            ],
+            queue_size=self.queue_size,
+        )
+        try:
+            self.run_info.stages = pipeline.run(jobs)
+        finally:
+            if self._collection_changed:
+                # New chunks can change any query's top-k
+                self.engine.query_cache.bump_version()
+            self.engine._persist_indexes()
+        self.run_info.elapsed_s = time.perf_counter() - start
+        return self.run_info
@@ -0,0 +1,327 @@
+import logging
+import os
+import pickle
+import re
+import threading
+from collections import Counter
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_DIACRITICS = re.compile(r"[\u0610-\u061A\u064B-\u065F\u0670\u06D6-\u06ED\u0640]")  # tashkeel + tatweel
+_TOKEN = re.compile(r"\w+")
+_ARABIC_DIGITS = str.maketrans("٠١٢٣٤٥٦٧٨٩۰۱۲۳۴۵۶۷۸۹", "01234567890123456789")
+_CHAR_MAP = str.maketrans({"أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا", "ى": "ي", "ة": "ه", "ؤ": "و", "ئ": "ي"})
+_PREFIXES = ("وبال", "وكال", "وال", "بال", "كال", "فال", "لل", "ال")
+
+def normalize_arabic(text: str) -> str:
+    """Strip diacritics/tatweel, unify alef/yaa/taa-marbuta forms and digits, lowercase Latin."""
+    return _DIACRITICS.sub("", text).translate(_ARABIC_DIGITS).translate(_CHAR_MAP).lower()
+
+def tokenize(text: str) -> list[str]:
+    """Arabic-aware tokens: normalized words with the definite-article prefixes removed."""
+    tokens = []
+    for token in _TOKEN.findall(normalize_arabic(text)):
+        for prefix in _PREFIXES:
+            if token.startswith(prefix) and len(token) - len(prefix) >= 2:
+                token = token[len(prefix):]
+                break
+        tokens.append(token)
+    return tokens
+
+_RANGE_OPS = {"$gt": np.greater, "$gte": np.greater_equal, "$lt": np.less, "$lte": np.less_equal}
+
+class BM25Index:
+    """
+    Incremental BM25 inverted index over chunk ids.
+
+    Postings are kept as dicts so documents can be added/replaced/removed one
+    at a time; on query, the posting list of each query term is compiled once
+    into numpy arrays and cached until that term changes.
+
+    The metadata fields `where` filters use (FILTER_FIELDS) are kept per
+    document too, so a filtered search masks its candidates inside the index
+    before scoring instead of asking Chroma for every matching id.
+
+    The ingestion pipeline's upsert stage adds and removes documents while
+    hybrid searches score against the same arrays, so every public method
+    holds the index lock.
+    """
+    VERSION = 2
+    # Metadata fields catalog.build_where filters on
+    FILTER_FIELDS = ("source", "source_type", "language", "ingested_at")
+
+    def __init__(self, path: str | None = None, k1: float = 1.5, b: float = 0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._ids: list[str] = []
+        self._slot: dict[str, int] = {}
+        self._doc_len: list[int] = []
+        self._doc_terms: list[dict[str, int]] = []
+        self._postings: dict[str, dict[int, int]] = {}
+        self._doc_fields: list[dict] = []
+        # (field, value) -> slots, compiled like the term postings; per-field value arrays for range filters
+        self._field_slots: dict[tuple[str, object], set[int]] = {}
+        self._compiled_fields: dict[tuple[str, object], np.ndarray] = {}
+        self._field_arrays: dict[str, np.ndarray] = {}
+        self._total_len = 0
+        self._live = 0
+        self._compiled: dict[str, tuple[np.ndarray, np.ndarray]] = {}
+        self._doc_len_array: np.ndarray | None = None
+        self._dirty = False
+        # Set when the file on disk had an older format and was not loaded
+        self.outdated = False
+        self._lock = threading.RLock()
+        if path:
+            self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "rb") as f:
+                state = pickle.load(f)
+            if state.get("version") != self.VERSION:
+                logger.warning(f"Lexical index {self.path} has an old format, it will be rebuilt.")
+                self.outdated = True
+                return
+            self._ids = state["ids"]
+            self._doc_len = state["doc_len"]
+            self._doc_terms = state["doc_terms"]
+            self._doc_fields = state["doc_fields"]
+        except (OSError, pickle.UnpicklingError, EOFError, KeyError) as e:
+            logger.warning(f"Ignoring unreadable lexical index {self.path}: {e}")
+            self._ids, self._doc_len, self._doc_terms, self._doc_fields = [], [], [], []
+            return
+
+        self._slot = {doc_id: i for i, doc_id in enumerate(self._ids) if doc_id is not None}
+        self._index_slots()
+        self._total_len = sum(self._doc_len)
+        self._live = len(self._slot)
+
+    def save(self):
+        with self._lock:
+            if not self.path or not self._dirty:
+                return
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "wb") as f:
+                pickle.dump(
+                    {
+                        "version": self.VERSION, "ids": self._ids, "doc_len": self._doc_len,
+                        "doc_terms": self._doc_terms, "doc_fields": self._doc_fields,
+                    },
+                    f, protocol=pickle.HIGHEST_PROTOCOL,
+                )
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._live
+
+    def __contains__(self, doc_id: str) -> bool:
+        with self._lock:
+            return doc_id in self._slot
+
+    def ids(self) -> list[str]:
+        with self._lock:
+            return list(self._slot)
+
+    def _index_slots(self):
+        """Postings and field slots from the per-slot terms and fields."""
+        self._postings, self._field_slots = {}, {}
+        for slot, terms in enumerate(self._doc_terms):
+            for term, tf in terms.items():
+                self._postings.setdefault(term, {})[slot] = tf
+            for field, value in self._doc_fields[slot].items():
+                self._field_slots.setdefault((field, value), set()).add(slot)
+
+    def _touch(self, terms, fields: dict):
+        for term in terms:
+            self._compiled.pop(term, None)
+        for item in fields.items():
+            self._compiled_fields.pop(item, None)
+        self._field_arrays = {}
+        self._doc_len_array = None
+        self._dirty = True
+
+    def add(self, doc_id: str, text: str, metadata: dict | None = None):
+        """Add a document, replacing any previous version with the same id."""
+        terms = dict(Counter(tokenize(text)))
+        fields = {
+            field: (metadata or {})[field] for field in self.FILTER_FIELDS if (metadata or {}).get(field) is not None
+        }
+        with self._lock:
+            if doc_id in self._slot:
+                self.remove(doc_id)
+            slot = len(self._ids)
+            self._ids.append(doc_id)
+            self._slot[doc_id] = slot
+            self._doc_len.append(sum(terms.values()))
+            self._doc_terms.append(terms)
+            self._doc_fields.append(fields)
+            for term, tf in terms.items():
+                self._postings.setdefault(term, {})[slot] = tf
+            for item in fields.items():
+                self._field_slots.setdefault(item, set()).add(slot)
+            self._total_len += self._doc_len[slot]
+            self._live += 1
+            self._touch(terms, fields)
+
+    def remove(self, doc_id: str):
+        with self._lock:
+            slot = self._slot.pop(doc_id, None)
+            if slot is None:
+                return
+            terms, fields = self._doc_terms[slot], self._doc_fields[slot]
+            for term in terms:
+                postings = self._postings.get(term)
+                if postings is not None:
+                    postings.pop(slot, None)
+                    if not postings:
+                        del self._postings[term]
+            for item in fields.items():
+                slots = self._field_slots.get(item)
+                if slots is not None:
+                    slots.discard(slot)
+                    if not slots:
+                        del self._field_slots[item]
+            self._total_len -= self._doc_len[slot]
+            self._ids[slot] = None
+            self._doc_len[slot] = 0
+            self._doc_terms[slot] = {}
+            self._doc_fields[slot] = {}
+            self._live -= 1
+            self._touch(terms, fields)
+
+    def compact(self) -> int:
+        """Drop the slots left behind by removed/replaced documents. Returns how many were dropped."""
+        with self._lock:
+            dropped = len(self._ids) - self._live
+            if not dropped:
+                return 0
+            live = [slot for slot, doc_id in enumerate(self._ids) if doc_id is not None]
+            self._ids = [self._ids[slot] for slot in live]
+            self._doc_len = [self._doc_len[slot] for slot in live]
+            self._doc_terms = [self._doc_terms[slot] for slot in live]
+            self._doc_fields = [self._doc_fields[slot] for slot in live]
+            self._slot = {doc_id: i for i, doc_id in enumerate(self._ids)}
+            self._index_slots()
+            self._compiled = {}
+            self._compiled_fields = {}
+            self._field_arrays = {}
+            self._doc_len_array = None
+            self._dirty = True
+            return dropped
+
+    def _compile(self, term: str) -> tuple[np.ndarray, np.ndarray] | None:
+        compiled = self._compiled.get(term)
+        if compiled is None:
+            postings = self._postings.get(term)
+            if not postings:
+                return None
+            compiled = (
+                np.fromiter(postings.keys(), dtype=np.int64, count=len(postings)),
+                np.fromiter(postings.values(), dtype=np.float32, count=len(postings)),
+            )
+            self._compiled[term] = compiled
+        return compiled
+
+    def _field_mask(self, field: str, value) -> np.ndarray:
+        mask = np.zeros(len(self._ids), dtype=bool)
+        compiled = self._compiled_fields.get((field, value))
+        if compiled is None:
+            slots = self._field_slots.get((field, value), ())
+            compiled = np.fromiter(slots, dtype=np.int64, count=len(slots))
+            self._compiled_fields[(field, value)] = compiled
+        mask[compiled] = True
+        return mask
+
+    def _field_array(self, field: str) -> np.ndarray:
+        values = self._field_arrays.get(field)
+        if values is None:
+            values = np.array([fields.get(field, np.nan) for fields in self._doc_fields], dtype=np.float64)
+            self._field_arrays[field] = values
+        return values
+
+    def _where_mask(self, where: dict) -> np.ndarray:
+        """
+        Boolean mask over slots for a Chroma `where` filter on FILTER_FIELDS
+        ($and / $or, equality, $ne, $in, $nin and numeric ranges). Raises
+        ValueError for anything else, so the caller can filter another way.
+        """
+        masks = []
+        for key, condition in where.items():
+            if key in ("$and", "$or"):
+                parts = [self._where_mask(clause) for clause in condition]
+                if not parts:
+                    raise ValueError(f"Empty {key} filter")
+                masks.append(np.logical_and.reduce(parts) if key == "$and" else np.logical_or.reduce(parts))
+                continue
+            if key not in self.FILTER_FIELDS:
+                raise ValueError(f"Field {key!r} is not kept in the lexical index")
+            if not isinstance(condition, dict):
+                condition = {"$eq": condition}
+            for op, value in condition.items():
+                if op in ("$eq", "$ne"):
+                    mask = self._field_mask(key, value)
+                elif op in ("$in", "$nin"):
+                    mask = np.zeros(len(self._ids), dtype=bool)
+                    for v in value:
+                        mask |= self._field_mask(key, v)
+                elif op in _RANGE_OPS:
+                    mask = _RANGE_OPS[op](self._field_array(key), value)  # NaN (field missing) never matches
+                else:
+                    raise ValueError(f"Unsupported filter operator {op}")
+                masks.append(~mask if op in ("$ne", "$nin") else mask)
+        if not masks:
+            raise ValueError("Empty filter")
+        return np.logical_and.reduce(masks)
+
+    def search(
+        self, query: str, k: int = 10, allowed: set[str] | None = None, where: dict | None = None
+    ) -> list[tuple[str, float]]:
+        """
+        Top-k (doc_id, bm25_score), best first. `where` (a Chroma filter, see
+        _where_mask) or `allowed` (chunk ids) limit the candidates before scoring.
+        """
+        with self._lock:
+            if not self._live or allowed is not None and not allowed:
+                return []
+            mask = None
+            if where:
+                mask = self._where_mask(where)
+            if allowed is not None:
+                allowed_mask = np.zeros(len(self._ids), dtype=bool)
+                allowed_mask[[self._slot[doc_id] for doc_id in allowed if doc_id in self._slot]] = True
+                mask = allowed_mask if mask is None else mask & allowed_mask
+            if self._doc_len_array is None:
+                self._doc_len_array = np.asarray(self._doc_len, dtype=np.float32)
+            doc_len = self._doc_len_array
+            avg_len = self._total_len / self._live or 1.0
+
+            scores = np.zeros(len(self._ids), dtype=np.float32)
+            for term in set(tokenize(query)):
+                compiled = self._compile(term)
+                if compiled is None:
+                    continue
+                slots, tf = compiled
+                # idf from the whole index; only the candidates that pass the filter are scored
+                df = len(slots)
+                if mask is not None:
+                    keep = mask[slots]
+                    slots, tf = slots[keep], tf[keep]
+                idf = np.log(1.0 + (self._live - df + 0.5) / (df + 0.5))
+                norm = tf + self.k1 * (1.0 - self.b + self.b * doc_len[slots] / avg_len)
+                scores[slots] += idf * tf * (self.k1 + 1.0) / norm
+
+            matched = int(np.count_nonzero(scores))
+            if not matched:
+                return []
+            k = min(k, matched)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [(self._ids[slot], float(scores[slot])) for slot in top]
@@ -0,0 +1,133 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from dataclasses import asdict, dataclass, field
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILENAME = "ingestion_manifest.json"
+
+@dataclass
+class FileRecord:
+    path: str
+    content_hash: str
+    size: int
+    mtime: float
+    settings: dict
+    chunks: int = 0
+    ingest_seconds: float = 0.0
+    ingested_at: float = field(default_factory=time.time)
+
+@dataclass
+class IngestionReport:
+    skipped: int = 0
+    reprocessed: int = 0
+    failed: int = 0
+    near_duplicates: int = 0
+    stale_chunks: int = 0  # chunks of previous file versions deleted
+    time_saved_s: float = 0.0
+    elapsed_s: float = 0.0
+
+    def summary(self) -> str:
+        return (
+            f"{self.reprocessed} reprocessed, {self.skipped} skipped, {self.failed} failed, "
+            f"{self.near_duplicates} near-duplicate chunks suppressed, "
+            f"{self.stale_chunks} stale chunks removed in {self.elapsed_s:.1f}s (~{self.time_saved_s:.1f}s saved)"
+        )
+
+class IngestionManifest:
+    """
+    Persistent record of which files were ingested, and with which settings.
+
+    A file is considered unchanged when its size, mtime and the ingestion
+    settings (chunker + embedding model) match the stored record. If only the
+    mtime differs, the content hash decides, so a `touch` does not trigger a
+    re-embed.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._records: dict[str, FileRecord] = {}
+        self.report = IngestionReport()
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self._records = {key: FileRecord(**rec) for key, rec in data.get("files", {}).items()}
+        except (OSError, ValueError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable ingestion manifest {self.path}: {e}")
+            self._records = {}
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"files": {key: asdict(rec) for key, rec in self._records.items()}}, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    @staticmethod
+    def _key(file_path: str) -> str:
+        return os.path.realpath(file_path)
+
+    @staticmethod
+    def content_hash(file_path: str, block_size: int = 1 << 20) -> str:
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(block_size), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def paths(self) -> list[str]:
+        """Paths of every recorded file, as they were ingested."""
+        return [record.path for record in self._records.values()]
+
+    def is_unchanged(self, file_path: str, settings: dict) -> bool:
+        """Check a file against the manifest without parsing it."""
+        record = self._records.get(self._key(file_path))
+        if record is None or record.settings != settings:
+            return False
+
+        stat = os.stat(file_path)
+        if stat.st_size != record.size:
+            return False
+        if stat.st_mtime == record.mtime:
+            return True
+
+        # Touched but maybe not modified: fall back to the content hash.
+        if self.content_hash(file_path) != record.content_hash:
+            return False
+        record.mtime = stat.st_mtime
+        return True
+
+    def record(self, file_path: str, settings: dict, chunks: int, ingest_seconds: float):
+        stat = os.stat(file_path)
+        self._records[self._key(file_path)] = FileRecord(
+            path=file_path,
+            content_hash=self.content_hash(file_path),
+            size=stat.st_size,
+            mtime=stat.st_mtime,
+            settings=dict(settings),
+            chunks=chunks,
+            ingest_seconds=ingest_seconds,
+        )
+
+    def mark_skipped(self, file_path: str):
+        self.report.skipped += 1
+        record = self._records.get(self._key(file_path))
+        if record:
+            self.report.time_saved_s += record.ingest_seconds
+
+    def mark_reprocessed(self):
+        self.report.reprocessed += 1
+
+    def mark_failed(self):
+        self.report.failed += 1
+
+    def reset_report(self) -> IngestionReport:
+        self.report = IngestionReport()
+        return self.report
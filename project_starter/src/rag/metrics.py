@@ -0,0 +1,40 @@
+"""Retrieval metrics from lab_05 (04_rag_foundations_data_pipelines/lab/lab_05_evaluation_framework.ipynb)."""
+
+def hit_rate_at_k(retrieved: list[list[str]], relevant: list[set[str]], k: int) -> float:
+    """Fraction of queries where at least one relevant doc is in top K."""
+    hits = 0
+    for ret, rel in zip(retrieved, relevant):
+        if any(doc_id in rel for doc_id in ret[:k]):
+            hits += 1
+    return hits / len(retrieved)
+
+def mean_reciprocal_rank(retrieved: list[list[str]], relevant: list[set[str]]) -> float:
+    """Average of 1/rank of first relevant document."""
+    rr_sum = 0.0
+    for ret, rel in zip(retrieved, relevant):
+        for rank, doc_id in enumerate(ret, 1):
+            if doc_id in rel:
+                rr_sum += 1.0 / rank
+                break
+    return rr_sum / len(retrieved)
+
+def precision_at_k(retrieved: list[list[str]], relevant: list[set[str]], k: int) -> float:
+    """Average fraction of relevant docs in top K."""
+    precisions = []
+    for ret, rel in zip(retrieved, relevant):
+        top_k = ret[:k]
+        relevant_in_k = sum(1 for d in top_k if d in rel)
+        precisions.append(relevant_in_k / k)
+    return sum(precisions) / len(precisions)
+
+def recall_at_k(retrieved: list[list[str]], relevant: list[set[str]], k: int) -> float:
+    """Average fraction of all relevant docs found in top K."""
+    recalls = []
+    for ret, rel in zip(retrieved, relevant):
+        if not rel:
+            recalls.append(0.0)
+            continue
+        top_k = ret[:k]
+        found = sum(1 for d in top_k if d in rel)
+        recalls.append(found / len(rel))
+    return sum(recalls) / len(recalls)
@@ -0,0 +1,94 @@
+import logging
+import os
+import sqlite3
+import threading
+from typing import Iterable
+
+logger = logging.getLogger(__name__)
+
+PARENTS_FILENAME = "parent_chunks.sqlite3"
+
+class ParentStore:
+    """
+    Parent sections of the parent/child layout (see RAGEngine parent_child):
+    the small child chunks are embedded and searched in Chroma, and each
+    carries the id of the section it was cut from. The sections themselves
+    (a legal article, or a size-bounded stretch of pages) are stored once,
+    here, and fetched by id when a child matches. They have no vectors,
+    so they live in a plain SQLite table next to the collection.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # Written by the pipeline's embed stage, read by search threads
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS parents ("
+                "id TEXT PRIMARY KEY, source TEXT NOT NULL, text TEXT NOT NULL, "
+                "page INTEGER, page_end INTEGER, char_start INTEGER, char_end INTEGER)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS parents_source ON parents (source)")
+            self._db.commit()
+
+    def put_many(self, parents: list[dict]):
+        """Store {"id", "source", "text", "page"?, "page_end"?, "char_start"?, "char_end"?} sections."""
+        if not parents:
+            return
+        rows = [
+            (p["id"], p["source"], p["text"], p.get("page"), p.get("page_end"), p.get("char_start"), p.get("char_end"))
+            for p in parents
+        ]
+        with self._lock:
+            self._db.executemany("INSERT OR REPLACE INTO parents VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            self._db.commit()
+
+    def get_many(self, ids: list[str]) -> dict[str, dict]:
+        """Sections by id; unknown ids are left out."""
+        found = {}
+        ids = list(dict.fromkeys(ids))
+        with self._lock:
+            for i in range(0, len(ids), 500):
+                chunk = ids[i : i + 500]
+                rows = self._db.execute(
+                    "SELECT id, source, text, page, page_end, char_start, char_end FROM parents "
+                    f"WHERE id IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+                for parent_id, source, text, page, page_end, char_start, char_end in rows:
+                    parent = {"id": parent_id, "source": source, "text": text}
+                    if page is not None:
+                        parent["page"], parent["page_end"] = page, page_end
+                    if char_start is not None:
+                        parent["char_start"], parent["char_end"] = char_start, char_end
+                    found[parent_id] = parent
+        return found
+
+    def ids_for(self, sources: list[str]) -> set[str]:
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT id FROM parents WHERE source IN ({','.join('?' * len(sources))})", list(sources)
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def ids(self) -> set[str]:
+        with self._lock:
+            return {row[0] for row in self._db.execute("SELECT id FROM parents")}
+
+    def remove_ids(self, ids: Iterable[str]) -> int:
+        ids = list(ids)
+        if not ids:
+            return 0
+        with self._lock:
+            self._db.executemany("DELETE FROM parents WHERE id = ?", [(parent_id,) for parent_id in ids])
+            self._db.commit()
+        return len(ids)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM parents").fetchone()[0]
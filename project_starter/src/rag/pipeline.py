@@ -0,0 +1,169 @@
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Iterable
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()  # end-of-stream marker passed down the queues
+
+@dataclass
+class StageMetrics:
+    """What one stage did during a run. Blocked times show where the bottleneck is."""
+    name: str
+    items_in: int = 0
+    items_out: int = 0
+    busy_s: float = 0.0
+    blocked_in_s: float = 0.0  # waiting on an empty input queue (upstream too slow)
+    blocked_out_s: float = 0.0  # waiting on a full output queue (downstream too slow)
+    max_queue_depth: int = 0  # of the input queue
+    queue_depth_total: int = 0
+
+    @property
+    def mean_queue_depth(self) -> float:
+        return self.queue_depth_total / self.items_in if self.items_in else 0.0
+
+    @property
+    def throughput(self) -> float:
+        """Items processed per second of busy time."""
+        return self.items_in / self.busy_s if self.busy_s else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"{self.name}: {self.items_in} in / {self.items_out} out, {self.throughput:.1f} items/s busy, "
+            f"busy {self.busy_s:.2f}s, blocked in {self.blocked_in_s:.2f}s / out {self.blocked_out_s:.2f}s, "
+            f"queue depth mean {self.mean_queue_depth:.1f} / max {self.max_queue_depth}"
+        )
+
+class Stage:
+    """
+    One pipeline stage: process(item) returns the items to pass downstream
+    (any iterable, possibly empty); close() is called once the input is
+    exhausted and may return final items.
+    """
+    def __init__(self, name: str, process: Callable[[object], Iterable], close: Callable[[], Iterable] | None = None):
+        self.name = name
+        self.process = process
+        self.close = close
+
+class Pipeline:
+    """
+    Stages run in their own threads, connected by bounded queues. A full
+    queue blocks the stage feeding it (backpressure), so memory stays bounded
+    by queue_size items per stage whatever the input size, while stages
+    that release the GIL (model inference, SQLite writes) overlap with the
+    rest.
+
+    The first stage receives the items of the input iterable. An exception
+    in any stage stops the run and is re-raised by run().
+    """
+    POLL_S = 0.1
+
+    def __init__(self, stages: list[Stage], queue_size: int = 8):
+        self.stages = stages
+        self.queue_size = queue_size
+        self.metrics = [StageMetrics(stage.name) for stage in stages]
+        self._stop = threading.Event()
+        self._error: BaseException | None = None
+
+    def _put(self, q: queue.Queue, item, metrics: StageMetrics) -> bool:
+        start = time.perf_counter()
+        try:
+            while not self._stop.is_set():
+                try:
+                    q.put(item, timeout=self.POLL_S)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        finally:
+            metrics.blocked_out_s += time.perf_counter() - start
+
+    def _get(self, q: queue.Queue, metrics: StageMetrics):
+        start = time.perf_counter()
+        try:
+            while not self._stop.is_set():
+                try:
+                    return q.get(timeout=self.POLL_S)
+                except queue.Empty:
+                    continue
+            return _DONE
+        finally:
+            metrics.blocked_in_s += time.perf_counter() - start
+
+    def _emit(self, outputs: Iterable | None, out_q: queue.Queue | None, metrics: StageMetrics) -> bool:
+        # Outputs are produced lazily: generator time counts as busy, queue waits as blocked
+        iterator = iter(outputs or ())
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                metrics.busy_s += time.perf_counter() - start
+                return True
+            metrics.busy_s += time.perf_counter() - start
+            metrics.items_out += 1
+            if out_q is not None and not self._put(out_q, item, metrics):
+                return False
+
+    def _fail(self, name: str, error: BaseException):
+        if self._error is None:
+            self._error = error
+            logger.error(f"Pipeline stage {name} failed: {error}")
+        self._stop.set()
+
+    def _run_stage(self, stage: Stage, metrics: StageMetrics, in_q: queue.Queue, out_q: queue.Queue | None):
+        try:
+            while True:
+                item = self._get(in_q, metrics)
+                if item is _DONE:
+                    break
+                metrics.items_in += 1
+                depth = in_q.qsize()
+                metrics.queue_depth_total += depth
+                metrics.max_queue_depth = max(metrics.max_queue_depth, depth)
+                start = time.perf_counter()
+                outputs = stage.process(item)
+                metrics.busy_s += time.perf_counter() - start
+                if not self._emit(outputs, out_q, metrics):
+                    return
+            if not self._stop.is_set() and stage.close is not None:
+                start = time.perf_counter()
+                outputs = stage.close()
+                metrics.busy_s += time.perf_counter() - start
+                if not self._emit(outputs, out_q, metrics):
+                    return
+        except BaseException as e:
+            self._fail(stage.name, e)
+            return
+        if out_q is not None:
+            self._put(out_q, _DONE, metrics)
+
+    def run(self, items: Iterable) -> list[StageMetrics]:
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        threads = []
+        for i, (stage, metrics) in enumerate(zip(self.stages, self.metrics)):
+            out_q = queues[i + 1] if i + 1 < len(queues) else None
+            thread = threading.Thread(
+                target=self._run_stage, args=(stage, metrics, queues[i], out_q),
+                name=f"rag-pipeline-{stage.name}", daemon=True,
+            )
+            thread.start()
+            threads.append(thread)
+
+        feed = StageMetrics("input")
+        try:
+            for item in items:
+                if not self._put(queues[0], item, feed):
+                    break
+        except BaseException as e:
+            self._fail("input", e)
+        finally:
+            self._put(queues[0], _DONE, feed)
+        for thread in threads:
+            thread.join()
+        if self._error is not None:
+            raise self._error
+        return self.metrics
@@ -0,0 +1,163 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from src.rag.embedding_cache import normalize_text
+
+logger = logging.getLogger(__name__)
+
+class QueryCache:
+    """
+    Two-level cache for RAGEngine.search.
+
+    1. Query embeddings: LRU keyed by the normalized query text.
+    2. Final top-k results: LRU + TTL keyed by (normalized query, n_results,
+       mode, filter, collection), stamped with the collection version they were computed
+       against. add_documents bumps the version, which invalidates every
+       older entry without having to enumerate them.
+
+    With disk_path set, results and the version counter are also kept in a
+    small SQLite file, so the cache survives restarts of `src.main`.
+    """
+    def __init__(
+        self,
+        max_embeddings: int = 1024,
+        max_results: int = 1024,
+        ttl_seconds: float | None = 3600.0,
+        disk_path: str | None = None,
+    ):
+        self.max_embeddings = max_embeddings
+        self.max_results = max_results
+        self.ttl_seconds = ttl_seconds
+        self._embeddings: OrderedDict[str, list[float]] = OrderedDict()
+        self._results: OrderedDict[str, tuple[int, float, list[dict]]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = 0
+        self._db: sqlite3.Connection | None = None
+        self.embedding_hits = self.embedding_misses = 0
+        self.result_hits = self.result_misses = 0
+        if disk_path:
+            self._open_disk(disk_path)
+
+    def _open_disk(self, path: str):
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, version INTEGER, created REAL, payload TEXT)"
+            )
+            if self.ttl_seconds is not None:
+                self._db.execute("DELETE FROM results WHERE created < ?", (time.time() - self.ttl_seconds,))
+            self._db.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Query cache disk tier disabled ({path}): {e}")
+            self._db = None
+
+    # ---- version ---------------------------------------------------------
+
+    @property
+    def version(self) -> int:
+        if self._db is None:
+            return self._version
+        with self._lock:
+            row = self._db.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        return int(row[0]) if row else 0
+
+    def bump_version(self):
+        """Invalidate all cached results (called when the collection changes)."""
+        with self._lock:
+            self._version += 1
+            self._results.clear()
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT INTO meta (key, value) VALUES ('version', '1') "
+                    "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1"
+                )
+                self._db.execute("DELETE FROM results")
+                self._db.commit()
+
+    # ---- level 1: query embeddings -------------------------------------------
+
+    def clear_embeddings(self):
+        """Forget cached query vectors (the embedding model or its output changed)."""
+        with self._lock:
+            self._embeddings.clear()
+
+    def get_embedding(self, text: str) -> list[float] | None:
+        key = normalize_text(text)
+        with self._lock:
+            vector = self._embeddings.get(key)
+            if vector is None:
+                self.embedding_misses += 1
+                return None
+            self._embeddings.move_to_end(key)
+            self.embedding_hits += 1
+            return vector
+
+    def put_embedding(self, text: str, vector) -> None:
+        key = normalize_text(text)
+        with self._lock:
+            self._embeddings[key] = vector
+            self._embeddings.move_to_end(key)
+            while len(self._embeddings) > self.max_embeddings:
+                self._embeddings.popitem(last=False)
+
+    # ---- level 2: final results -------------------------------------------
+
+    @staticmethod
+    def result_key(query: str, n_results: int, mode: str, where: dict | None, collection: list | None = None) -> str:
+        """collection identifies what was searched; the disk tier is shared by every collection in the directory."""
+        return json.dumps(
+            [normalize_text(query), n_results, mode, where, collection], sort_keys=True, ensure_ascii=False
+        )
+
+    def _fresh(self, version: int, created: float, current_version: int) -> bool:
+        if version != current_version:
+            return False
+        return self.ttl_seconds is None or time.time() - created <= self.ttl_seconds
+
+    def get_results(self, key: str) -> list[dict] | None:
+        current_version = self.version
+        with self._lock:
+            entry = self._results.get(key)
+            if entry is None and self._db is not None:
+                row = self._db.execute("SELECT version, created, payload FROM results WHERE key = ?", (key,)).fetchone()
+                if row:
+                    entry = (row[0], row[1], json.loads(row[2]))
+                    self._results[key] = entry
+            if entry is None or not self._fresh(entry[0], entry[1], current_version):
+                self._results.pop(key, None)
+                self.result_misses += 1
+                return None
+            self._results.move_to_end(key)
+            self.result_hits += 1
+            return [dict(r) for r in entry[2]]
+
+    def put_results(self, key: str, results: list[dict], version: int) -> None:
+        """Store results computed against `version` (read it before querying, not after)."""
+        created = time.time()
+        with self._lock:
+            self._results[key] = (version, created, [dict(r) for r in results])
+            self._results.move_to_end(key)
+            while len(self._results) > self.max_results:
+                self._results.popitem(last=False)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO results (key, version, created, payload) VALUES (?, ?, ?, ?)",
+                    (key, version, created, json.dumps(results, ensure_ascii=False)),
+                )
+                self._db.commit()
+
+    def stats(self) -> dict:
+        return {
+            "version": self.version,
+            "embedding_hits": self.embedding_hits,
+            "embedding_misses": self.embedding_misses,
+            "result_hits": self.result_hits,
+            "result_misses": self.result_misses,
+        }
@@ -0,0 +1,118 @@
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+
+from src.rag.embedding_cache import normalize_text
+
+logger = logging.getLogger(__name__)
+
+class CrossEncoderReranker:
+    """
+    Second-stage reranker: scores (query, chunk) pairs with a small CPU cross-encoder.
+
+    Scores are cached per (normalized query, chunk id) in an LRU. A latency
+    budget caps how many candidates get scored: once the per-pair cost is
+    known, only the best first-stage candidates that fit the budget are
+    scored (never fewer than top_k) and the tail is dropped.
+    """
+    DEFAULT_MODEL = "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1"  # multilingual, incl. Arabic
+
+    def __init__(
+        self,
+        model_name: str = DEFAULT_MODEL,
+        batch_size: int = 16,
+        max_length: int = 512,
+        cache_size: int = 4096,
+        latency_budget_ms: float | None = 500.0,
+    ):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.cache_size = cache_size
+        self.latency_budget_ms = latency_budget_ms
+        self._model = None
+        self._lock = threading.Lock()
+        self._cache: OrderedDict[tuple[str, str], float] = OrderedDict()
+        # rerank() runs on several search threads; the LRU reorders itself on every read
+        self._cache_lock = threading.Lock()
+        self._ms_per_pair: float | None = None
+        self._latencies_ms: deque[float] = deque(maxlen=1000)
+        self.pairs_scored = 0
+        self.cache_hits = 0
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from sentence_transformers import CrossEncoder
+
+                    self._model = CrossEncoder(self.model_name, device="cpu", max_length=self.max_length)
+        return self._model
+
+    def _predict(self, pairs: list[tuple[str, str]]) -> list[float]:
+        start = time.perf_counter()
+        scores = self.model.predict(pairs, batch_size=self.batch_size, show_progress_bar=False)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        per_pair = elapsed_ms / len(pairs)
+        # Exponential moving average of the per-pair cost, used by the budget
+        self._ms_per_pair = per_pair if self._ms_per_pair is None else 0.8 * self._ms_per_pair + 0.2 * per_pair
+        self.pairs_scored += len(pairs)
+        return [float(s) for s in scores]
+
+    def _budgeted(self, candidates: list[dict], top_k: int) -> int:
+        if not self.latency_budget_ms or not self._ms_per_pair:
+            return len(candidates)
+        return max(top_k, min(len(candidates), int(self.latency_budget_ms / self._ms_per_pair)))
+
+    def rerank(self, query: str, candidates: list[dict], top_k: int, min_score: float | None = None) -> list[dict]:
+        """
+        Return the top_k candidates by cross-encoder score (above min_score).
+        Each result gets "score" = rerank score and keeps "retrieval_score".
+        """
+        start = time.perf_counter()
+        query_key = normalize_text(query)
+        scored = candidates[:self._budgeted(candidates, top_k)]
+
+        keys = [(query_key, c.get("id") or c["text"]) for c in scored]
+        scores: list[float | None] = []
+        with self._cache_lock:
+            for key in keys:
+                score = self._cache.get(key)
+                if score is not None:
+                    self._cache.move_to_end(key)
+                    self.cache_hits += 1
+                scores.append(score)
+
+        missing = [i for i, score in enumerate(scores) if score is None]
+        if missing:
+            computed = self._predict([(query, scored[i]["text"]) for i in missing])
+            with self._cache_lock:
+                for i, score in zip(missing, computed):
+                    scores[i] = score
+                    self._cache[keys[i]] = score
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        reranked = sorted(
+            ({**c, "retrieval_score": c.get("score"), "score": round(s, 4)} for c, s in zip(scored, scores)),
+            key=lambda r: r["score"],
+            reverse=True,
+        )
+        if min_score is not None:
+            reranked = [r for r in reranked if r["score"] >= min_score]
+
+        self._latencies_ms.append((time.perf_counter() - start) * 1000)
+        return reranked[:top_k]
+
+    def stats(self) -> dict:
+        latencies = sorted(self._latencies_ms)
+        return {
+            "calls": len(latencies),
+            "pairs_scored": self.pairs_scored,
+            "cache_hits": self.cache_hits,
+            "ms_per_pair": round(self._ms_per_pair, 2) if self._ms_per_pair else None,
+            "p50_ms": round(latencies[len(latencies) // 2], 1) if latencies else None,
+            "p99_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))], 1) if latencies else None,
+        }
@@ -0,0 +1,197 @@
+"""
+Chroma storage layout for RAG chunks.
+
+Compact layout (current): the document is the raw chunk text, stored once;
+the e5 "passage: " prefix is only applied when embedding. Metadata carries
+small fields only (source, page, page_end, char_start, char_end).
+
+Legacy layout: the document was "passage: " + text and the full text was
+copied again into metadata["original_text"]. migrate_to_compact() rewrites
+such a collection in place, reusing the stored embeddings.
+
+Usage (from project_starter/):
+    python -m src.rag.storage --persist-directory ./chroma_db
+"""
+import argparse
+import logging
+import os
+import sqlite3
+import time
+from dataclasses import asdict, dataclass
+
+logger = logging.getLogger(__name__)
+
+PASSAGE_PREFIX = "passage: "
+LEGACY_TEXT_KEY = "original_text"
+
+def chunk_text(metadata: dict | None, document: str | None) -> str:
+    """Chunk text for a stored row, in either layout."""
+    metadata = metadata or {}
+    if LEGACY_TEXT_KEY in metadata:
+        return metadata[LEGACY_TEXT_KEY]
+    return document or ""
+
+def directory_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+def vacuum_sqlite(persist_directory: str) -> bool:
+    """VACUUM chroma.sqlite3 so space freed by rewrites is returned to the filesystem."""
+    path = os.path.join(persist_directory, "chroma.sqlite3")
+    if not os.path.exists(path):
+        return False
+    try:
+        db = sqlite3.connect(path, timeout=30)
+        try:
+            db.execute("VACUUM")
+        finally:
+            db.close()
+        return True
+    except sqlite3.Error as e:
+        logger.warning(f"VACUUM of {path} failed: {e}")
+        return False
+
+@dataclass
+class StorageMigrationReport:
+    scanned: int = 0
+    migrated: int = 0
+    bytes_before: int = 0
+    bytes_after: int = 0
+    elapsed_s: float = 0.0
+
+    def summary(self) -> str:
+        saved = self.bytes_before - self.bytes_after
+        return (
+            f"{self.migrated}/{self.scanned} chunks migrated, "
+            f"{self.bytes_before / 1e6:.1f}MB -> {self.bytes_after / 1e6:.1f}MB "
+            f"({saved / 1e6:.1f}MB saved) in {self.elapsed_s:.1f}s"
+        )
+
+def migrate_to_compact(collection, page_size: int = 500) -> StorageMigrationReport:
+    """
+    Rewrite legacy rows to the compact layout. Embeddings are passed back
+    unchanged, so no model is needed and ids stay the same. Safe to re-run:
+    rows already in the compact layout are skipped.
+    """
+    report = StorageMigrationReport()
+    offset = 0
+    while True:
+        page = collection.get(
+            limit=page_size, offset=offset, include=["metadatas", "documents", "embeddings"]
+        )
+        if not page["ids"]:
+            break
+        offset += len(page["ids"])
+        report.scanned += len(page["ids"])
+
+        ids, documents, metadatas, embeddings = [], [], [], []
+        for row, doc_id in enumerate(page["ids"]):
+            metadata = page["metadatas"][row] or {}
+            if LEGACY_TEXT_KEY not in metadata:
+                continue
+            ids.append(doc_id)
+            documents.append(metadata[LEGACY_TEXT_KEY])
+            # None deletes the key (Chroma merges metadata on update)
+            metadatas.append({LEGACY_TEXT_KEY: None})
+            embeddings.append(page["embeddings"][row])
+        if ids:
+            collection.update(ids=ids, documents=documents, metadatas=metadatas, embeddings=embeddings)
+            report.migrated += len(ids)
+            logger.info(f"Migrated {report.migrated} chunks to the compact layout.")
+    return report
+
+def scan_chunk_versions(collection, page_size: int = 1000) -> tuple[set[str], set[str]]:
+    """
+    (all ids, stale ids) of a collection. A chunk is stale when its source has
+    chunks from a later ingest: every ingest stamps all chunks of a source with
+    the same ingested_at, so older stamps are leftovers of a previous version.
+    Sources without any ingested_at stamps are left alone.
+    """
+    ids: set[str] = set()
+    versions: dict[str, list[tuple[str, int | None]]] = {}
+    offset = 0
+    while True:
+        page = collection.get(limit=page_size, offset=offset, include=["metadatas"])
+        if not page["ids"]:
+            break
+        offset += len(page["ids"])
+        for doc_id, metadata in zip(page["ids"], page["metadatas"]):
+            metadata = metadata or {}
+            ids.add(doc_id)
+            versions.setdefault(metadata.get("source", ""), []).append((doc_id, metadata.get("ingested_at")))
+
+    stale: set[str] = set()
+    for chunks in versions.values():
+        latest = max((stamp for _, stamp in chunks if stamp is not None), default=None)
+        if latest is not None:
+            stale.update(doc_id for doc_id, stamp in chunks if stamp is None or stamp < latest)
+    return ids, stale
+
+def scan_parent_ids(collection, page_size: int = 1000) -> set[str]:
+    """Parent sections referenced by the stored chunks (parent/child layout)."""
+    parent_ids: set[str] = set()
+    offset = 0
+    while True:
+        page = collection.get(limit=page_size, offset=offset, include=["metadatas"])
+        if not page["ids"]:
+            break
+        offset += len(page["ids"])
+        parent_ids.update((metadata or {}).get("parent_id") for metadata in page["metadatas"])
+    parent_ids.discard(None)
+    return parent_ids
+
+@dataclass
+class CompactionReport:
+    chunks_before: int = 0
+    stale_chunks: int = 0
+    orphaned_index_entries: int = 0  # lexical / near-duplicate / parent entries with no chunk behind them
+    bytes_before: int = 0
+    bytes_after: int = 0
+    elapsed_s: float = 0.0
+
+    def summary(self) -> str:
+        reclaimed = self.bytes_before - self.bytes_after
+        return (
+            f"{self.stale_chunks}/{self.chunks_before} stale chunks deleted, "
+            f"{self.orphaned_index_entries} orphaned index entries dropped, "
+            f"{self.bytes_before / 1e6:.1f}MB -> {self.bytes_after / 1e6:.1f}MB "
+            f"({reclaimed / 1e6:.1f}MB reclaimed) in {self.elapsed_s:.1f}s"
+        )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--persist-directory", default="./chroma_db")
+    parser.add_argument(
+        "--collection", default="research_papers", help="Collection alias; resolved to its live generation"
+    )
+    parser.add_argument("--page-size", type=int, default=500)
+    args = parser.parse_args()
+
+    import chromadb
+    from chromadb.config import Settings
+
+    from src.rag.generations import live_collection
+
+    start = time.perf_counter()
+    bytes_before = directory_size(args.persist_directory)
+    client = chromadb.PersistentClient(path=args.persist_directory, settings=Settings(anonymized_telemetry=False))
+    # No embedding function: stored vectors are reused, so the model is never loaded
+    # After a reindex the alias points at a new generation; the original may be gone
+    collection = client.get_collection(live_collection(args.persist_directory, args.collection), embedding_function=None)
+    report = migrate_to_compact(collection, page_size=args.page_size)
+    if report.migrated:
+        vacuum_sqlite(args.persist_directory)
+    report.bytes_before = bytes_before
+    report.bytes_after = directory_size(args.persist_directory)
+    report.elapsed_s = time.perf_counter() - start
+    print(f" Storage migration: {report.summary()}")
+    print(asdict(report))
+
+if __name__ == "__main__":
+    main()
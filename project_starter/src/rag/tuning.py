@@ -0,0 +1,311 @@
+"""
+HNSW parameter tuning for the RAG collection.
+
+Samples chunk vectors from the live collection and holds some of them out
+as queries, computes their exact top-k by brute force, then builds
+throwaway indexes over the sample for every (M, ef_construction) in the
+grid and queries each at every ef_search. Reports recall@k against p50/p99
+query latency and build time, picks the cheapest setting that reaches
+--min-recall, and writes it to the .env file read by src/config.py
+(RAG_HNSW_M / RAG_HNSW_CONSTRUCTION_EF / RAG_HNSW_SEARCH_EF).
+
+M and ef_construction apply to the next index build (a new persist
+directory or collection); ef_search is applied to the live collection the
+next time the engine loads it.
+
+Usage (from project_starter/):
+    python -m src.rag.tuning --persist-directory ./chroma_db --min-recall 0.95
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ENV_FILE = Path(__file__).resolve().parents[3] / ".env"
+ENV_KEYS = {"M": "RAG_HNSW_M", "construction_ef": "RAG_HNSW_CONSTRUCTION_EF", "search_ef": "RAG_HNSW_SEARCH_EF"}
+
+@dataclass
+class HnswParams:
+    M: int = 16
+    construction_ef: int = 200
+    search_ef: int = 100
+
+    def metadata(self) -> dict:
+        """Collection metadata for a new cosine HNSW index with these parameters."""
+        return {
+            "hnsw:space": "cosine",
+            "hnsw:construction_ef": self.construction_ef,
+            "hnsw:search_ef": self.search_ef,
+            "hnsw:M": self.M,
+        }
+
+    @classmethod
+    def of(cls, collection) -> "HnswParams":
+        """Parameters a collection was built with."""
+        hnsw = (getattr(collection, "configuration", None) or {}).get("hnsw") or {}
+        metadata = collection.metadata or {}
+        return cls(
+            M=hnsw.get("max_neighbors") or metadata.get("hnsw:M", 16),
+            construction_ef=hnsw.get("ef_construction") or metadata.get("hnsw:construction_ef", 100),
+            search_ef=hnsw.get("ef_search") or metadata.get("hnsw:search_ef", 100),
+        )
+
+def set_search_ef(collection, search_ef: int):
+    """Change ef_search of an existing index; it is a query-time setting, no rebuild needed."""
+    collection.modify(configuration={"hnsw": {"ef_search": search_ef}})
+
+@dataclass
+class TrialResult:
+    M: int
+    construction_ef: int
+    search_ef: int
+    recall: float  # recall@k against the exact top-k
+    p50_ms: float
+    p99_ms: float
+    build_s: float  # of the index with this M / ef_construction
+
+    @property
+    def params(self) -> HnswParams:
+        return HnswParams(self.M, self.construction_ef, self.search_ef)
+
+@dataclass
+class TuningReport:
+    vectors: int = 0
+    queries: int = 0
+    k: int = 10
+    min_recall: float = 0.95
+    current: HnswParams | None = None
+    chosen: TrialResult | None = None
+    trials: list[TrialResult] = field(default_factory=list)
+    elapsed_s: float = 0.0
+
+    def table(self) -> str:
+        lines = [f"{'M':>4} {'ef_constr':>9} {'ef_search':>9} {f'recall@{self.k}':>10} {'p50 ms':>8} {'p99 ms':>8} {'build s':>8}"]
+        for trial in self.trials:
+            mark = "  <- chosen" if trial is self.chosen else ""
+            lines.append(
+                f"{trial.M:>4} {trial.construction_ef:>9} {trial.search_ef:>9} {trial.recall:>10.3f} "
+                f"{trial.p50_ms:>8.2f} {trial.p99_ms:>8.2f} {trial.build_s:>8.2f}{mark}"
+            )
+        return "\n".join(lines)
+
+    def summary(self) -> str:
+        if self.chosen is None:
+            return f"no trials ({self.vectors} vectors, {self.queries} queries)"
+        chosen = self.chosen
+        return (
+            f"{len(self.trials)} settings on {self.vectors} vectors / {self.queries} held-out queries; "
+            f"chose M={chosen.M}, ef_construction={chosen.construction_ef}, ef_search={chosen.search_ef} "
+            f"(recall@{self.k} {chosen.recall:.3f}, p50 {chosen.p50_ms:.2f}ms, p99 {chosen.p99_ms:.2f}ms) "
+            f"over current {self.current} in {self.elapsed_s:.1f}s"
+        )
+
+def sample_vectors(collection, n_vectors: int, n_queries: int, seed: int = 0, page_size: int = 1000):
+    """
+    (corpus, queries): up to n_vectors + n_queries stored embeddings drawn at
+    random from the collection, split so the queries are not in the corpus.
+    """
+    ids = collection.get(include=[])["ids"]
+    rng = random.Random(seed)
+    picked = rng.sample(ids, min(len(ids), n_vectors + n_queries))
+    if len(picked) <= n_queries:
+        raise ValueError(f"Collection has {len(ids)} chunks, need more than {n_queries} to tune")
+    vectors = []
+    for i in range(0, len(picked), page_size):
+        page = collection.get(ids=picked[i:i + page_size], include=["embeddings"])
+        by_id = dict(zip(page["ids"], page["embeddings"]))
+        vectors.extend(by_id[doc_id] for doc_id in picked[i:i + page_size])
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors[n_queries:], vectors[:n_queries]
+
+def exact_top_k(corpus: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    """Row indices of the k nearest corpus vectors (cosine) for each query, by brute force."""
+    corpus = corpus / np.linalg.norm(corpus, axis=1, keepdims=True)
+    queries = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    scores = queries @ corpus.T
+    k = min(k, corpus.shape[0])
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    return np.take_along_axis(top, np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1), axis=1)
+
+def _percentile(values: list[float], q: float) -> float:
+    return float(np.percentile(values, q)) if values else 0.0
+
+def _index_trials(data_dir: str, M: int, construction_ef: int, search_ef_values, k: int) -> list[TrialResult]:
+    """
+    Build one index over the sample and query it at every ef_search. Runs in
+    its own process: Chroma keeps a loaded index (and its ef_search) cached
+    for the life of the process, so the store is reopened after each change.
+    """
+    import chromadb
+    from chromadb.config import Settings
+
+    corpus = np.load(os.path.join(data_dir, "corpus.npy"))
+    queries = np.load(os.path.join(data_dir, "queries.npy")).tolist()
+    ground_truth = [set(row) for row in np.load(os.path.join(data_dir, "ground_truth.npy")).tolist()]
+    path = os.path.join(data_dir, f"index-{M}-{construction_ef}")
+    name = f"hnsw-tune-{M}-{construction_ef}"
+
+    def open_collection():
+        client = chromadb.PersistentClient(path=path, settings=Settings(anonymized_telemetry=False))
+        return client, client.get_collection(name, embedding_function=None)
+
+    client = chromadb.PersistentClient(path=path, settings=Settings(anonymized_telemetry=False))
+    ids = [str(i) for i in range(len(corpus))]
+    batch_size = client.get_max_batch_size()
+    start = time.perf_counter()
+    collection = client.create_collection(
+        name, embedding_function=None, metadata=HnswParams(M, construction_ef, search_ef_values[0]).metadata()
+    )
+    for i in range(0, len(ids), batch_size):
+        collection.add(ids=ids[i:i + batch_size], embeddings=corpus[i:i + batch_size].tolist())
+    build_s = time.perf_counter() - start
+
+    trials = []
+    for search_ef in search_ef_values:
+        set_search_ef(collection, search_ef)
+        client.clear_system_cache()
+        client, collection = open_collection()
+        collection.query(query_embeddings=[queries[0]], n_results=k, include=[])  # load the index
+        latencies, hits = [], 0
+        for query, truth in zip(queries, ground_truth):
+            start = time.perf_counter()
+            found = collection.query(query_embeddings=[query], n_results=k, include=[])["ids"][0]
+            latencies.append((time.perf_counter() - start) * 1000)
+            hits += len(truth.intersection(int(doc_id) for doc_id in found))
+        trials.append(TrialResult(
+            M, construction_ef, search_ef,
+            recall=hits / max(1, sum(len(truth) for truth in ground_truth)),
+            p50_ms=_percentile(latencies, 50), p99_ms=_percentile(latencies, 99), build_s=build_s,
+        ))
+    client.clear_system_cache()
+    return trials
+
+def sweep(
+    corpus: np.ndarray,
+    queries: np.ndarray,
+    M_values=(8, 16, 32),
+    construction_ef_values=(100, 200, 400),
+    search_ef_values=(10, 25, 50, 100, 200),
+    k: int = 10,
+) -> list[TrialResult]:
+    """
+    Build one throwaway index per (M, ef_construction) in a temporary Chroma
+    store and query it at every ef_search. Indexes are built one at a time
+    in a worker process, so trials do not compete for CPU.
+    """
+    trials = []
+    with tempfile.TemporaryDirectory(prefix="rag-hnsw-", ignore_cleanup_errors=True) as data_dir:
+        np.save(os.path.join(data_dir, "corpus.npy"), corpus)
+        np.save(os.path.join(data_dir, "queries.npy"), queries)
+        np.save(os.path.join(data_dir, "ground_truth.npy"), exact_top_k(corpus, queries, k))
+        # spawn: the parent may hold torch / chromadb threads, which fork does not handle well
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as executor:
+            for M in M_values:
+                for construction_ef in construction_ef_values:
+                    for trial in executor.submit(
+                        _index_trials, data_dir, M, construction_ef, tuple(search_ef_values), k
+                    ).result():
+                        trials.append(trial)
+                        logger.info(
+                            f"HNSW M={M} ef_construction={construction_ef} ef_search={trial.search_ef}: "
+                            f"recall {trial.recall:.3f}, p50 {trial.p50_ms:.2f}ms, p99 {trial.p99_ms:.2f}ms"
+                        )
+    return trials
+
+def choose(trials: list[TrialResult], min_recall: float = 0.95, max_p99_ms: float | None = None) -> TrialResult | None:
+    """
+    Cheapest trial meeting the targets: lowest p99 latency, then fastest
+    build. If none reaches them, the one with the best recall.
+    """
+    if not trials:
+        return None
+    valid = [t for t in trials if t.recall >= min_recall and (max_p99_ms is None or t.p99_ms <= max_p99_ms)]
+    if valid:
+        return min(valid, key=lambda t: (t.p99_ms, t.build_s))
+    return max(trials, key=lambda t: (t.recall, -t.p99_ms))
+
+def tune_index(
+    collection,
+    n_vectors: int = 20_000,
+    n_queries: int = 200,
+    k: int = 10,
+    min_recall: float = 0.95,
+    max_p99_ms: float | None = None,
+    M_values=(8, 16, 32),
+    construction_ef_values=(100, 200, 400),
+    search_ef_values=(10, 25, 50, 100, 200),
+    seed: int = 0,
+) -> TuningReport:
+    """Sweep HNSW parameters on a sample of the collection's own vectors."""
+    start = time.perf_counter()
+    corpus, queries = sample_vectors(collection, n_vectors, n_queries, seed)
+    report = TuningReport(
+        vectors=len(corpus), queries=len(queries), k=k, min_recall=min_recall, current=HnswParams.of(collection)
+    )
+    report.trials = sweep(corpus, queries, M_values, construction_ef_values, search_ef_values, k)
+    report.chosen = choose(report.trials, min_recall, max_p99_ms)
+    report.elapsed_s = time.perf_counter() - start
+    return report
+
+def write_env(params: HnswParams, env_file: str | os.PathLike = DEFAULT_ENV_FILE):
+    """Store the parameters as RAG_HNSW_* settings in a .env file (created if missing)."""
+    from dotenv import set_key
+
+    Path(env_file).touch(exist_ok=True)
+    for name, key in ENV_KEYS.items():
+        set_key(str(env_file), key, str(getattr(params, name)), quote_mode="never")
+
+def _ints(text: str) -> tuple[int, ...]:
+    return tuple(int(value) for value in text.split(","))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--persist-directory", default="./chroma_db")
+    parser.add_argument(
+        "--collection", default="research_papers", help="Collection alias; resolved to its live generation"
+    )
+    parser.add_argument("--vectors", type=int, default=20_000, help="Corpus sample size")
+    parser.add_argument("--queries", type=int, default=200, help="Held-out query vectors")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--min-recall", type=float, default=0.95)
+    parser.add_argument("--max-p99-ms", type=float, default=None)
+    parser.add_argument("--m", type=_ints, default=(8, 16, 32), help="Comma-separated M values")
+    parser.add_argument("--ef-construction", type=_ints, default=(100, 200, 400))
+    parser.add_argument("--ef-search", type=_ints, default=(10, 25, 50, 100, 200))
+    parser.add_argument("--env-file", default=str(DEFAULT_ENV_FILE))
+    parser.add_argument("--dry-run", action="store_true", help="Report only, do not write the .env file")
+    args = parser.parse_args()
+
+    import chromadb
+    from chromadb.config import Settings
+
+    from src.rag.generations import live_collection
+
+    client = chromadb.PersistentClient(path=args.persist_directory, settings=Settings(anonymized_telemetry=False))
+    # No embedding function: stored vectors are sampled, so the model is never loaded
+    # After a reindex the alias points at a new generation; the original may be gone
+    collection = client.get_collection(live_collection(args.persist_directory, args.collection), embedding_function=None)
+    report = tune_index(
+        collection, args.vectors, args.queries, args.k, args.min_recall, args.max_p99_ms,
+        args.m, args.ef_construction, args.ef_search,
+    )
+    print(report.table())
+    print(f" HNSW tuning: {report.summary()}")
+    if report.chosen is not None and not args.dry_run:
+        write_env(report.chosen.params, args.env_file)
+        print(f" Wrote {', '.join(ENV_KEYS.values())} to {args.env_file}")
+    print(asdict(report.chosen) if report.chosen else {})
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+import numpy as np
+
+def truncate(vectors, dims: int | None) -> np.ndarray:
+    """
+    Matryoshka-style truncation: keep the first dims components and
+    re-normalize, so cosine / inner product stay meaningful.
+    """
+    matrix = np.asarray(vectors, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix[None, :]
+    if dims and dims < matrix.shape[1]:
+        matrix = matrix[:, :dims]
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.clip(norms, 1e-12, None)
+
+def cosine_scores(query, candidates) -> np.ndarray:
+    """Cosine similarity of one query vector against a matrix of candidates."""
+    query = truncate(query, None)[0]
+    return truncate(candidates, None) @ query
+
+def index_bytes(count: int, dims: int, m: int = 16, dtype_bytes: int = 4) -> int:
+    """Approximate HNSW footprint: the vectors plus ~2*M neighbor links (int32) per node."""
+    return count * (dims * dtype_bytes + 2 * m * 4)
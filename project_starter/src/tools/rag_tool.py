@@ -1,26 +1,81 @@
+import logging
+
+from src.config import Config
 from src.tools.registry import registry
-from src.rag.engine import rag_engine
+from src.rag.catalog import build_where
+from src.rag.engine import get_rag_engine
+
+logger = logging.getLogger(__name__)
 
 @registry.register(
     name="search_knowledge_base", 
-    description="Search the internal knowledge base (PDFs & Regulations). Returns relevant snippets with similarity scores.",
+    description=(
+        "Search the internal knowledge base (PDFs & Regulations). Returns relevant snippets with similarity scores. "
+        "Pass keyword expansions or rephrasings in related_queries to search them all in one call. "
+        "To restrict the search, pass source (a name from list_knowledge_sources), "
+        "source_type ('pdf' or 'web') and/or language ('ar' or 'en')."
+    ),
     category="specialized"
 )
-def search_knowledge_base(query: str) -> str:
+async def search_knowledge_base(
+    query: str,
+    related_queries: list[str] | None = None,
+    source: str | None = None,
+    source_type: str | None = None,
+    language: str | None = None,
+) -> str:
     """
     Search wrapper that formats results for the Writer Agent.
     """
-    results = rag_engine.search(query, n_results=8) # top-k
+    engine = get_rag_engine()
+    where = build_where(source=source, source_type=source_type, language=language)
+    n_results = Config.RAG_RERANK_CANDIDATES if Config.RAG_RERANK else 8 # top-k
+    if related_queries:
+        # One batched query for all variations, merged and deduplicated
+        results = (await engine.asearch_many(
+            [query, *related_queries], n_results=n_results, where=where, merge=True, mode=Config.RAG_SEARCH_MODE
+        ))[:n_results]
+    else:
+        # Concurrent agents' queries are coalesced into one embedding batch
+        results = await engine.asearch(query, n_results=n_results, mode=Config.RAG_SEARCH_MODE, where=where)
+
+    if Config.RAG_RERANK:
+        # Fewer, better chunks -> fewer prompt tokens in every later agent step
+        results = await engine.arerank(query, results, Config.RAG_RERANK_TOP_K, Config.RAG_RERANK_MIN_SCORE)
     
     if not results:
         return "No relevant information found in the knowledge base."
+
+    if Config.RAG_COMPRESSION:
+        # Only the sentences that answer the query reach the agents' prompts
+        results, report = await engine.acompress(
+            " ".join([query, *(related_queries or [])]), results, Config.RAG_COMPRESSION_TOKEN_BUDGET
+        )
+        logger.info(f"Context compression: {report.summary()}")
     
     formatted_output = "Found the following relevant excerpts:\n\n"
     for i, res in enumerate(results, 1):
         formatted_output += (
-            f"--- Result {i} (Similarity: {res['score']}) ---\n"
+            f"--- Result {i} (Score: {res['score']}) ---\n"
             f"Source: {res['source']}\n"
             f"Content: \"{res['text']}\"\n\n"
         )
     
-    return formatted_output
\ No newline at end of file
+    return formatted_output
+
+@registry.register(
+    name="list_knowledge_sources",
+    description=(
+        "List the documents in the internal knowledge base (name, type, title, language, size). "
+        "Use a name as the `source` argument of search_knowledge_base to search only that document."
+    ),
+    category="specialized"
+)
+def list_knowledge_sources(source_type: str | None = None) -> str:
+    sources = get_rag_engine().catalog.list(source_type=source_type)
+    if not sources:
+        return "The knowledge base catalog is empty."
+    lines = [f"{len(sources)} sources:"]
+    for rec in sources:
+        lines.append(f"- {rec.source} [{rec.source_type}, {rec.language}, {rec.chunks} chunks] {rec.title}")
+    return "\n".join(lines)
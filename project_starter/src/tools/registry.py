@@ -1,3 +1,4 @@
+import asyncio
 import inspect
 from typing import Any, Callable, Dict
 
@@ -50,11 +51,22 @@ class Tool:
             },
         }
 
+    @property
+    def is_async(self) -> bool:
+        return inspect.iscoroutinefunction(self.func)
+
     def execute(self, **kwargs) -> Any:
         # Validate arguments using the model
+        # (for async tools this returns a coroutine; use aexecute from async code)
         validated_args = self.model(**kwargs)
         return self.func(**validated_args.model_dump())
 
+    async def aexecute(self, **kwargs) -> Any:
+        """Run the tool without blocking the event loop: await async tools, thread-offload sync ones."""
+        if self.is_async:
+            return await self.execute(**kwargs)
+        return await asyncio.to_thread(self.execute, **kwargs)
+
 class ToolRegistry:
     """Registry for managing available tools."""
     def __init__(self):
@@ -109,5 +121,11 @@ class ToolRegistry:
             raise ValueError(f"Tool '{name}' not found in registry.")
         return tool.execute(**kwargs)
 
+    async def aexecute_tool(self, name: str, **kwargs) -> Any:
+        tool = self.get_tool(name)
+        if not tool:
+            raise ValueError(f"Tool '{name}' not found in registry.")
+        return await tool.aexecute(**kwargs)
+
 # Global registry instance
 registry = ToolRegistry()
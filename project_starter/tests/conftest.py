@@ -0,0 +1,42 @@
+import hashlib
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+def hashed_embeddings(input, dims: int = 256):
+    """
+    Bag-of-words hashing instead of the e5 model: texts sharing words get
+    close vectors, so rankings mean something and nothing is downloaded.
+    """
+    vectors = []
+    for text in input:
+        vector = np.zeros(dims, dtype=np.float32)
+        for word in text.lower().replace("query:", "").replace("passage:", "").split():
+            vector[int(hashlib.md5(word.strip(".,:;?!").encode()).hexdigest()[:8], 16) % dims] += 1.0
+        vectors.append(vector + 1e-3)
+    return vectors
+
+@pytest.fixture
+def make_engine(tmp_path):
+    """
+    Factory for RAGEngines on a real Chroma store under tmp_path (or path),
+    with hashed_embeddings (or embedding_fn) in place of the model. Other
+    keyword arguments go to RAGEngine; the embedding cache is off by default.
+    """
+    chromadb = pytest.importorskip("chromadb")
+    from src.rag.engine import RAGEngine
+
+    def make(path=None, embedding_fn=hashed_embeddings, **kwargs):
+        path = str(path or tmp_path)
+        kwargs.setdefault("use_embedding_cache", False)
+        engine = RAGEngine(persist_directory=path, **kwargs)
+        engine._embedding_fn = embedding_fn
+        engine._client = chromadb.PersistentClient(path=path)
+        return engine
+
+    return make
@@ -0,0 +1,92 @@
+import hashlib
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.rag.compression import GAP, ContextCompressor, approx_tokens, split_sentences
+
+def _words(text: str) -> list[str]:
+    return [w.strip(".,:;?!").lower() for w in text.replace("query:", "").replace("passage:", "").split()]
+
+def _embed(texts):
+    vectors = []
+    for text in texts:
+        vector = np.zeros(256, dtype=np.float32)
+        for word in _words(text):
+            vector[int(hashlib.md5(word.encode()).hexdigest()[:8], 16) % 256] += 1.0
+        vectors.append(vector)
+    return vectors
+
+def _compressor(budget: int = 30) -> ContextCompressor:
+    return ContextCompressor(lambda query: _embed([query])[0], _embed, approx_tokens, token_budget=budget)
+
+FILLER = "The committee meets every quarter to review the general budget of the ministry."
+
+RESULTS = [
+    {"id": "a", "source": "r1.pdf", "score": 0.8, "text": (
+        f"{FILLER} The employee is entitled to annual leave of thirty days with full pay. {FILLER} "
+        "Annual leave may be carried over with approval."
+    )},
+    {"id": "b", "source": "r2.pdf", "score": 0.7, "text": f"{FILLER} {FILLER}"},
+]
+
+def test_split_sentences_handles_arabic_punctuation_and_lines():
+    assert split_sentences("ما هي الإجازة؟ هي ثلاثون يوما.\n- بند أول\n\nSecond. Third") == [
+        "ما هي الإجازة؟", "هي ثلاثون يوما.", "- بند أول", "Second.", "Third",
+    ]
+
+def test_compress_keeps_relevant_sentences_with_their_citation():
+    compressor = _compressor(budget=35)
+    compressed, report = compressor.compress("annual leave days pay", RESULTS)
+
+    # The filler-only result is dropped; the other keeps its source and id
+    assert [(r["id"], r["source"]) for r in compressed] == [("a", "r1.pdf")]
+    assert compressed[0]["text"] == (
+        "The employee is entitled to annual leave of thirty days with full pay." + GAP
+        + "Annual leave may be carried over with approval."
+    )
+    assert compressed[0]["original_tokens"] > report.tokens_out
+    assert report.tokens_out <= 35 < report.tokens_in
+    assert report.ratio < 0.5
+    assert (report.sentences_in, report.sentences_kept) == (6, 2)
+    assert report.elapsed_ms > 0
+    assert compressor.stats()["calls"] == 1
+
+def test_context_within_budget_is_left_alone():
+    calls = []
+    compressor = ContextCompressor(lambda q: calls.append(q), lambda t: calls.append(t), token_budget=10_000)
+    compressed, report = compressor.compress("annual leave", RESULTS)
+    assert compressed is RESULTS
+    assert report.skipped and report.ratio == 1.0
+    assert calls == []  # nothing embedded
+
+def test_compress_text_keeps_citations_of_kept_paragraphs():
+    answer = (
+        "## Findings\n\n"
+        f"The employee is entitled to annual leave of thirty days. {FILLER}\n"
+        "Source: r1.pdf, Article 12\n\n"
+        f"{FILLER} {FILLER}\n"
+        "Source: https://www.hrsd.gov.sa/budget"
+    )
+    text, report = _compressor(budget=30).compress_text("how many annual leave days", answer)
+    # Leftover budget goes to the next best sentences (here the short heading), never to the other citation
+    assert text == (
+        "## Findings\n\nThe employee is entitled to annual leave of thirty days." + GAP + "Source: r1.pdf, Article 12"
+    )
+    assert report.tokens_out < report.tokens_in
+
+def test_engine_compresses_with_its_embedding_model(make_engine):
+    engine = make_engine(embedding_fn=_embed, use_embedding_cache=True)
+    engine.compressor.count_tokens = approx_tokens
+    compressed, report = engine.compress("annual leave days pay", RESULTS, token_budget=35)
+    assert [r["id"] for r in compressed] == ["a"]
+    assert "thirty days" in compressed[0]["text"] and FILLER not in compressed[0]["text"]
+    # The query vector is shared with search through the query cache
+    assert engine.query_cache.get_embedding("query: annual leave days pay") is not None
+    # Sentence vectors are query-time only: they stay out of the ingest embedding cache
+    assert len(engine.embedding_cache) == 0
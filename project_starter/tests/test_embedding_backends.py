@@ -0,0 +1,55 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.rag.embeddings import OnnxBackend, backend_cache_name, export_onnx, parity_check
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+pytest.importorskip("onnxruntime")
+pytest.importorskip("onnx")
+
+WORDS = ["query", "passage", ":", "retrieval", "vector", "search", "the", "model", "العمل", "نظام"]
+
+@pytest.fixture(scope="module")
+def tiny_model(tmp_path_factory):
+    """A randomly initialised 2-layer BERT, so no model download is needed."""
+    directory = tmp_path_factory.mktemp("tiny")
+    vocab = directory / "vocab.txt"
+    vocab.write_text("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + WORDS), encoding="utf-8")
+    tokenizer = transformers.BertTokenizerFast(vocab_file=str(vocab))
+    torch.manual_seed(0)
+    config = transformers.BertConfig(
+        vocab_size=len(WORDS) + 5, hidden_size=32, num_hidden_layers=2, num_attention_heads=2, intermediate_size=64
+    )
+    return transformers.BertModel(config), tokenizer
+
+def _torch_mean_pool(model, tokenizer, texts):
+    encoded = tokenizer(texts, padding=True, return_tensors="pt")
+    with torch.no_grad():
+        hidden = model(input_ids=encoded["input_ids"], attention_mask=encoded["attention_mask"])[0]
+    mask = encoded["attention_mask"][..., None].float()
+    pooled = (hidden * mask).sum(1) / mask.sum(1)
+    return list(torch.nn.functional.normalize(pooled, dim=1).numpy())
+
+@pytest.mark.parametrize("quantize, threshold", [(False, 0.999), (True, 0.9)])
+def test_onnx_backend_matches_the_torch_model(tiny_model, tmp_path, quantize, threshold):
+    model, tokenizer = tiny_model
+    export_onnx(model, tokenizer, str(tmp_path), quantize=quantize)
+    backend = OnnxBackend("tiny", str(tmp_path), quantize=quantize, batch_size=2)
+
+    texts = ["query: retrieval", "passage: the vector search model", "نظام العمل", "search"]
+    vectors = backend(texts)
+    assert len(vectors) == 4 and vectors[0].dtype == np.float32
+
+    report = parity_check(backend, lambda t: _torch_mean_pool(model, tokenizer, t), texts, threshold=threshold)
+    assert report.passed, report
+
+def test_cache_name_separates_backends():
+    assert backend_cache_name("sentence-transformers", "m") == "m"
+    assert backend_cache_name("onnx-int8", "m") == "m@onnx-int8"
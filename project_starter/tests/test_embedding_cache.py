@@ -0,0 +1,86 @@
+import os
+import sys
+import threading
+
+import numpy as np
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.rag.embedding_cache import EmbeddingCache
+
+def test_cache_round_trip_and_hit_rate(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), "intfloat/multilingual-e5-base")
+    vectors = np.random.rand(2, 8).astype(np.float32)
+
+    assert cache.get_many(["passage: a", "passage: b"]) == [None, None]
+    cache.put_many(["passage: a", "passage: b"], vectors)
+
+    reloaded = EmbeddingCache(str(tmp_path), "intfloat/multilingual-e5-base")
+    found = reloaded.get_many(["passage:  a ", "passage: c"])
+    np.testing.assert_allclose(found[0], vectors[0], atol=1e-3)
+    assert found[1] is None
+    assert reloaded.hit_rate == 0.5
+
+def test_cache_is_scoped_per_model(tmp_path):
+    EmbeddingCache(str(tmp_path), "model-a").put_many(["x"], np.ones((1, 4)))
+    assert EmbeddingCache(str(tmp_path), "model-b").get_many(["x"]) == [None]
+
+def test_appends_do_not_duplicate_rows(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), "model-a")
+    cache.put_many(["x", "x", "y"], np.arange(12, dtype=np.float32).reshape(3, 4))
+    cache.put_many(["y", "z"], np.ones((2, 4)))
+    assert len(cache) == 3
+    assert cache.stats()["bytes"] == 3 * 4 * 2
+
+def test_concurrent_writers_never_share_rows(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), "intfloat/multilingual-e5-base")
+    errors = []
+
+    def vector(text: str) -> np.ndarray:
+        return np.full(8, float(hash(text) % 1000), dtype=np.float32)
+
+    def writer(worker: int):
+        try:
+            for i in range(100):
+                texts = [f"passage: worker {worker} chunk {i} part {j}" for j in range(5)]
+                cache.put_many(texts, [vector(text) for text in texts])
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=writer, args=(worker,)) for worker in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+
+    texts = [f"passage: worker {w} chunk {i} part {j}" for w in range(8) for i in range(100) for j in range(5)]
+    reloaded = EmbeddingCache(str(tmp_path), "intfloat/multilingual-e5-base")
+    for text, found in zip(texts, reloaded.get_many(texts)):
+        assert found is not None and np.allclose(found, vector(text))
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+def test_instances_sharing_a_directory_keep_each_others_rows(tmp_path):
+    # Like reindex() next to a live engine, or two processes on one chroma_db
+    caches = [EmbeddingCache(str(tmp_path), "model-a") for _ in range(4)]
+
+    def vector(text: str) -> np.ndarray:
+        return np.full(4, float(len(text) + int(text.split()[1]) * 7), dtype=np.float32)
+
+    def writer(worker: int):
+        for i in range(50):
+            texts = [f"w{worker} {i} part {j}" for j in range(3)]
+            caches[worker].put_many(texts, [vector(text) for text in texts])
+
+    threads = [threading.Thread(target=writer, args=(worker,)) for worker in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    texts = [f"w{w} {i} part {j}" for w in range(4) for i in range(50) for j in range(3)]
+    reloaded = EmbeddingCache(str(tmp_path), "model-a")
+    assert len(reloaded) == len(texts) == reloaded.stats()["bytes"] // (4 * 2)
+    for text, found in zip(texts, reloaded.get_many(texts)):
+        assert found is not None and np.allclose(found, vector(text))
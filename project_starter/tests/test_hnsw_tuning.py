@@ -0,0 +1,82 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+chromadb = pytest.importorskip("chromadb")
+dotenv = pytest.importorskip("dotenv")
+
+import src.rag.engine as engine_module
+from src.rag.engine import RAGEngine
+from src.rag.tuning import HnswParams, TrialResult, choose, exact_top_k, sample_vectors, tune_index, write_env
+
+def _clustered(n: int, dim: int = 24, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((12, dim))
+    return (centers[rng.integers(0, 12, n)] + 0.4 * rng.standard_normal((n, dim))).astype(np.float32)
+
+@pytest.fixture
+def collection(tmp_path):
+    client = chromadb.PersistentClient(path=str(tmp_path / "db"))
+    collection = client.create_collection("research_papers", embedding_function=None, metadata=HnswParams().metadata())
+    vectors = _clustered(800)
+    collection.add(ids=[f"c{i}" for i in range(len(vectors))], embeddings=vectors.tolist())
+    return collection
+
+def test_exact_top_k_matches_sorted_cosine():
+    corpus, queries = _clustered(300, seed=1), _clustered(5, seed=2)
+    top = exact_top_k(corpus, queries, 7)
+    normed = corpus / np.linalg.norm(corpus, axis=1, keepdims=True)
+    for query, row in zip(queries, top):
+        scores = normed @ (query / np.linalg.norm(query))
+        assert list(row) == list(np.argsort(-scores)[:7])
+
+def test_sample_holds_queries_out_of_the_corpus(collection):
+    corpus, queries = sample_vectors(collection, n_vectors=500, n_queries=40)
+    assert (len(corpus), len(queries)) == (500, 40)
+    stored = {tuple(v) for v in corpus.round(5).tolist()}
+    assert not any(tuple(q) in stored for q in queries.round(5).tolist())
+
+def test_tune_index_reports_grid_and_picks_cheapest_setting_meeting_recall(collection):
+    report = tune_index(
+        collection, n_vectors=600, n_queries=30, k=5, min_recall=0.9,
+        M_values=(4, 16), construction_ef_values=(50,), search_ef_values=(5, 100),
+    )
+    assert len(report.trials) == 4
+    assert report.current == HnswParams(16, 200, 100)
+    assert all(0.0 <= t.recall <= 1.0 and t.p99_ms >= t.p50_ms > 0 for t in report.trials)
+    # A wide beam on a 600-vector graph is close to exact
+    assert max(t.recall for t in report.trials if t.search_ef == 100) >= 0.9
+    assert report.chosen.recall >= 0.9
+    assert "chosen" in report.table()
+
+def test_choose_falls_back_to_best_recall():
+    fast = TrialResult(8, 100, 10, recall=0.80, p50_ms=0.1, p99_ms=0.2, build_s=1.0)
+    accurate = TrialResult(32, 400, 200, recall=0.97, p50_ms=0.5, p99_ms=0.9, build_s=4.0)
+    balanced = TrialResult(16, 200, 50, recall=0.96, p50_ms=0.3, p99_ms=0.4, build_s=2.0)
+    assert choose([fast, accurate, balanced], min_recall=0.95) is balanced
+    assert choose([fast, accurate, balanced], min_recall=0.99) is accurate
+    assert choose([fast, accurate, balanced], min_recall=0.95, max_p99_ms=0.3) is accurate
+
+def test_chosen_params_go_to_env_and_the_next_build(tmp_path, monkeypatch):
+    env_file = tmp_path / ".env"
+    env_file.write_text("MODEL_NAME=gemini/gemini-1.5-pro\nRAG_HNSW_M=16\n")
+    write_env(HnswParams(M=24, construction_ef=300, search_ef=60), env_file)
+    values = dotenv.dotenv_values(env_file)
+    assert values["MODEL_NAME"] == "gemini/gemini-1.5-pro"
+    assert (values["RAG_HNSW_M"], values["RAG_HNSW_CONSTRUCTION_EF"], values["RAG_HNSW_SEARCH_EF"]) == ("24", "300", "60")
+
+    monkeypatch.setattr(engine_module, "create_embedding_backend", lambda *args, **kwargs: None)
+    engine = RAGEngine(
+        persist_directory=str(tmp_path / "db"), use_embedding_cache=False,
+        hnsw_m=24, hnsw_construction_ef=300, hnsw_search_ef=60,
+    )
+    assert HnswParams.of(engine.collection) == HnswParams(24, 300, 60)
+
+    # An existing index keeps its build parameters but takes the new ef_search
+    engine = RAGEngine(persist_directory=str(tmp_path / "db"), use_embedding_cache=False, hnsw_search_ef=120)
+    assert HnswParams.of(engine.collection) == HnswParams(24, 300, 120)
@@ -0,0 +1,52 @@
+import os
+import sys
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.rag.manifest import IngestionManifest
+
+SETTINGS = {"chunk_size": 1000, "chunk_overlap": 200, "embedding_model": "intfloat/multilingual-e5-base"}
+
+def _write(path, data: bytes):
+    with open(path, "wb") as f:
+        f.write(data)
+
+def test_unchanged_file_is_skipped_after_reload(tmp_path):
+    pdf = tmp_path / "r1.pdf"
+    _write(pdf, b"%PDF-1.4 original")
+    manifest_path = str(tmp_path / "db" / "manifest.json")
+
+    manifest = IngestionManifest(manifest_path)
+    assert not manifest.is_unchanged(str(pdf), SETTINGS)
+    manifest.record(str(pdf), SETTINGS, chunks=3, ingest_seconds=2.5)
+    manifest.save()
+
+    reloaded = IngestionManifest(manifest_path)
+    assert reloaded.is_unchanged(str(pdf), SETTINGS)
+    reloaded.mark_skipped(str(pdf))
+    assert reloaded.report.skipped == 1
+    assert reloaded.report.time_saved_s == 2.5
+
+def test_touch_without_content_change_is_still_unchanged(tmp_path):
+    pdf = tmp_path / "r1.pdf"
+    _write(pdf, b"%PDF-1.4 original")
+    manifest = IngestionManifest(str(tmp_path / "manifest.json"))
+    manifest.record(str(pdf), SETTINGS, chunks=1, ingest_seconds=1.0)
+
+    stat = os.stat(pdf)
+    os.utime(pdf, (stat.st_atime, stat.st_mtime + 10))
+    assert manifest.is_unchanged(str(pdf), SETTINGS)
+
+def test_content_or_settings_change_triggers_reprocessing(tmp_path):
+    pdf = tmp_path / "r1.pdf"
+    _write(pdf, b"%PDF-1.4 original")
+    manifest = IngestionManifest(str(tmp_path / "manifest.json"))
+    manifest.record(str(pdf), SETTINGS, chunks=1, ingest_seconds=1.0)
+
+    assert not manifest.is_unchanged(str(pdf), {**SETTINGS, "chunk_size": 500})
+
+    stat = os.stat(pdf)
+    _write(pdf, b"%PDF-1.4 amended!")
+    os.utime(pdf, (stat.st_atime, stat.st_mtime + 10))
+    assert not manifest.is_unchanged(str(pdf), SETTINGS)
@@ -0,0 +1,53 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.rag.pipeline import Pipeline, Stage
+
+def test_stages_keep_order_and_report_metrics():
+    pipeline = Pipeline(
+        [Stage("double", lambda x: [x, x]), Stage("square", lambda x: [x * x]), Stage("sink", lambda x: ())],
+        queue_size=2,
+    )
+    seen = []
+    pipeline.stages[2].process = lambda x: seen.append(x) or ()
+    metrics = pipeline.run(range(50))
+
+    assert seen == [x * x for x in range(50) for _ in range(2)]
+    assert [(m.name, m.items_in, m.items_out) for m in metrics] == [
+        ("double", 50, 100), ("square", 100, 100), ("sink", 100, 0)
+    ]
+    assert all(m.max_queue_depth <= 2 for m in metrics)
+
+def test_slow_consumer_applies_backpressure():
+    produced = []
+
+    def source(x):
+        produced.append(x)
+        return [x]
+
+    def slow(x):
+        time.sleep(0.01)
+        # The producer can only be ahead by what fits in the queues
+        assert len(produced) - x <= 2 * 3 + 2
+        return ()
+
+    metrics = Pipeline([Stage("fast", source), Stage("slow", slow)], queue_size=3).run(range(40))
+    assert metrics[0].blocked_out_s > metrics[1].blocked_in_s
+
+def test_stage_error_stops_the_run():
+    def boom(x):
+        if x == 5:
+            raise ValueError("bad item")
+        return [x]
+
+    threads_before = threading.active_count()
+    with pytest.raises(ValueError, match="bad item"):
+        Pipeline([Stage("boom", boom), Stage("sink", lambda x: ())], queue_size=1).run(range(1000))
+    assert threading.active_count() == threads_before
@@ -0,0 +1,15 @@
+import os
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+def test_importing_rag_tool_does_not_load_heavy_dependencies():
+    probe = (
+        "import sys\n"
+        "import src.tools.rag_tool\n"
+        "heavy = ['chromadb', 'sentence_transformers', 'pdfplumber', 'bs4']\n"
+        "print(','.join(m for m in heavy if m in sys.modules))\n"
+    )
+    out = subprocess.run([sys.executable, "-c", probe], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == ""
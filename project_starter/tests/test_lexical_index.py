@@ -0,0 +1,113 @@
+import os
+import sys
+import threading
+
+import pytest
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.rag.fusion import weighted_rrf
+from src.rag.lexical import BM25Index, tokenize
+
+def test_tokenize_normalizes_arabic_forms_and_digits():
+    assert tokenize("المادةُ ٧٧") == tokenize("ماده 77") == ["ماده", "77"]
+    assert tokenize("مكافأة نهاية الخدمة") == ["مكافاه", "نهايه", "خدمه"]
+
+def test_bm25_finds_exact_article_and_survives_reload(tmp_path):
+    path = str(tmp_path / "lexical_index.pkl")
+    index = BM25Index(path)
+    index.add("a", "المادة 77 من نظام العمل: مكافأة نهاية الخدمة")
+    index.add("b", "المادة 12 من نظام العمل: الإجازة السنوية")
+    index.add("c", "Probation period rules")
+    index.save()
+
+    reloaded = BM25Index(path)
+    assert reloaded.search("المادة ٧٧", k=2)[0][0] == "a"
+    assert reloaded.search("probation")[0][0] == "c"
+
+    reloaded.remove("a")
+    assert "a" not in reloaded
+    assert all(doc_id != "a" for doc_id, _ in reloaded.search("المادة 77"))
+
+    before = reloaded.search("probation")
+    assert reloaded.compact() == 1
+    assert reloaded.compact() == 0
+    assert reloaded.search("probation") == before
+    assert sorted(reloaded.ids()) == ["b", "c"]
+
+def test_weighted_rrf_prefers_heavier_list():
+    keyword = [("k1", 3.0), ("shared", 2.0)]
+    semantic = [("s1", 0.9), ("shared", 0.8)]
+    fused = weighted_rrf([keyword, semantic], weights=[1.0, 2.0])
+    assert fused[0][0] == "shared"
+    assert [doc_id for doc_id, _ in fused].index("s1") < [doc_id for doc_id, _ in fused].index("k1")
+
+def test_allowed_ids_prune_before_ranking():
+    index = BM25Index()
+    for i in range(10):
+        index.add(f"pdf-{i}", "الإجازة السنوية " * (i + 1))
+    index.add("web-0", "الإجازة السنوية")
+
+    assert [doc_id for doc_id, _ in index.search("الإجازة", k=3, allowed={"web-0", "missing"})] == ["web-0"]
+    assert index.search("الإجازة", k=3, allowed=set()) == []
+
+def test_where_filters_prune_inside_the_index(tmp_path):
+    path = str(tmp_path / "lexical_index.pkl")
+    index = BM25Index(path)
+    for i in range(10):
+        metadata = {"source": f"r{i}.pdf", "source_type": "pdf", "ingested_at": i}
+        index.add(f"pdf-{i}", "الإجازة السنوية " * (i + 1), metadata)
+    index.add("web-0", "الإجازة السنوية", {"source": "https://hrsd.gov.sa", "source_type": "web", "language": "ar"})
+    index.save()
+
+    reloaded = BM25Index(path)
+    assert [doc_id for doc_id, _ in reloaded.search("الإجازة", k=3, where={"source_type": "web"})] == ["web-0"]
+    recent_pdfs = {"$and": [{"source_type": "pdf"}, {"ingested_at": {"$gte": 7}}]}
+    ranged = reloaded.search("الإجازة", k=20, where=recent_pdfs)
+    assert sorted(doc_id for doc_id, _ in ranged) == ["pdf-7", "pdf-8", "pdf-9"]
+    assert len(reloaded.search("الإجازة", k=20, where={"source": {"$in": ["r1.pdf", "r2.pdf"]}})) == 2
+    reloaded.remove("web-0")
+    assert reloaded.search("الإجازة", k=3, where={"language": "ar"}) == []
+    with pytest.raises(ValueError):
+        reloaded.search("الإجازة", where={"title": "Labor Law"})
+
+def test_search_while_documents_are_added_and_removed():
+    index = BM25Index()
+    errors = []
+    done = threading.Event()
+
+    def writer():
+        for i in range(3000):
+            index.add(f"d{i}", f"annual leave days term{i % 50}")
+            if i % 3 == 0:
+                index.remove(f"d{i // 2}")
+        done.set()
+
+    def reader():
+        while not done.is_set():
+            try:
+                index.search("annual leave term7", k=5)
+            except Exception as e:  # IndexError from arrays changing under the scorer
+                errors.append(e)
+
+    threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert index.search("annual leave term7", k=1)
+
+def test_engine_filters_hybrid_search_without_listing_matching_ids(make_engine):
+    engine = make_engine()
+    engine.add_documents([
+        {"text": f"annual leave rules part {i}", "source": f"r{i}.pdf", "source_type": "pdf"} for i in range(5)
+    ] + [{"text": "annual leave on the portal", "source": "https://hrsd.gov.sa", "source_type": "web"}])
+    listed = []
+    get = engine.collection.get
+    engine._collection.get = lambda *args, **kwargs: listed.append(kwargs) or get(*args, **kwargs)
+
+    results = engine.search("annual leave", n_results=3, mode="hybrid", where={"source_type": "web"})
+    assert [r["source"] for r in results] == ["https://hrsd.gov.sa"]
+    assert not [kwargs for kwargs in listed if "where" in kwargs and "ids" not in kwargs]
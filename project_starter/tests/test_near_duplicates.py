@@ -0,0 +1,51 @@
+import os
+import random
+import sys
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.rag.dedup import MinHasher, NearDuplicateIndex, collapse_near_duplicates
+
+rng = random.Random(0)
+WORDS = [f"word{i}" for i in range(2000)]
+ARTICLE = " ".join(rng.choices(WORDS, k=150))
+AMENDED = ARTICLE.replace(ARTICLE.split()[20], "amended", 1)
+OTHER = " ".join(rng.choices(WORDS, k=150))
+
+def test_near_duplicates_are_suppressed_and_persisted(tmp_path):
+    path = str(tmp_path / "dedup_index.pkl")
+    index = NearDuplicateIndex(path, threshold=0.85)
+    assert index.check("ed1", ARTICLE) is None
+    assert index.check("ed2", AMENDED) == "ed1"
+    assert index.check("other", OTHER) is None
+    assert index.check("ed1", ARTICLE) is None  # re-ingesting a kept chunk
+    assert index.stats()["suppressed"] == 1
+    index.save()
+
+    reloaded = NearDuplicateIndex(path, threshold=0.85)
+    assert len(reloaded) == 2
+    assert reloaded.check("ed3", AMENDED) == "ed1"
+    reloaded.remove("ed1")
+    assert reloaded.check("ed3", AMENDED) is None
+
+def test_held_copies_persist_and_are_released_once(tmp_path):
+    path = str(tmp_path / "dedup_index.pkl")
+    index = NearDuplicateIndex(path, threshold=0.85)
+    index.check("ed1", ARTICLE)
+    copy = {"id": "ed2", "text": AMENDED, "metadata": {"source": "law-2024.pdf"}}
+    index.hold(index.check("ed2", AMENDED), copy)
+    index.save()
+
+    reloaded = NearDuplicateIndex(path, threshold=0.85)
+    assert reloaded.held_ids(["law-2024.pdf"]) == {"ed2"}
+    assert reloaded.release("ed1") == [copy]
+    assert reloaded.release("ed1") == [] and reloaded.copies() == []
+
+def test_collapse_keeps_the_best_ranked_hit_per_group():
+    results = [
+        {"id": "a", "text": ARTICLE, "score": 0.9},
+        {"id": "b", "text": OTHER, "score": 0.8},
+        {"id": "c", "text": AMENDED, "score": 0.7},
+    ]
+    assert [r["id"] for r in collapse_near_duplicates(results, MinHasher(), 0.85)] == ["a", "b"]
@@ -0,0 +1,96 @@
+import os
+import sys
+
+import pytest
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.rag.chunking import SectionChunker
+
+TOPICS = ("leave", "salary", "training")
+
+def _article(n: int, topic: str, edit: str = "") -> str:
+    return f"Article {n}\n" + " ".join(f"{topic}{i}" for i in range(30)) + edit
+
+def _page(articles: list[str]) -> str:
+    return "<html><head><title>Civil Service Law</title></head><body>" + "".join(
+        f"<p>{article}</p>" for article in articles
+    ) + "</body></html>"
+
+def test_section_chunker_cuts_at_article_headings():
+    text = "الفصل الأول\nالمادة الأولى\n" + "يستحق الموظف إجازة سنوية. " * 4 + "\nالمادة الثانية\n" + "x " * 40
+    sections = SectionChunker(chunk_size=300).split_spans(text)
+    # The chapter title is packed with the first article; no overlap between sections
+    assert [s[0].split("\n")[0] for s in sections] == ["الفصل الأول", "المادة الثانية"]
+    assert sections[0][0].startswith("الفصل الأول\nالمادة الأولى")
+    assert all(a[2] <= b[1] for a, b in zip(sections, sections[1:]))
+    assert all(text[start:end] == chunk for chunk, start, end, _ in sections)
+
+@pytest.fixture
+def engine(make_engine):
+    return make_engine(parent_child=True, chunk_size=80, parent_chunk_size=1000)
+
+def _sections(articles: list[str]) -> list[str]:
+    # The page title comes first in the cleaned text and is packed with the first article
+    return [f"Civil Service Law\n{articles[0]}", *articles[1:]]
+
+def _ingest(engine, articles: list[str], url: str = "https://laws.gov.sa/civil-service"):
+    from src.rag.fetching import FetchResult
+
+    run = engine._run_pipeline([FetchResult(url, status=200, html=_page(articles))])
+    assert run.sources[0].stored
+    return run
+
+def test_children_are_embedded_and_parents_stored_once(engine):
+    articles = [_article(n, topic) for n, topic in enumerate(TOPICS, 1)]
+    _ingest(engine, articles)
+
+    stored = engine.collection.get(include=["metadatas", "documents"])
+    parents = engine.parent_store.get_many([m["parent_id"] for m in stored["metadatas"]])
+    assert sorted(p["text"] for p in parents.values()) == sorted(_sections(articles))
+    assert len(engine.parent_store) == 3
+    # Small children, no overlap: per parent they add up to the article text
+    for parent_id, parent in parents.items():
+        spans = sorted(
+            (m["char_start"], m["char_end"]) for m in stored["metadatas"] if m["parent_id"] == parent_id
+        )
+        assert len(spans) > 1 and all(end <= start for (_, end), (start, _) in zip(spans, spans[1:]))
+        assert (spans[0][0], spans[-1][1]) == (parent["char_start"], parent["char_end"])
+    assert all(len(text) <= 80 for text in stored["documents"])
+
+def test_search_returns_each_parent_once(engine):
+    articles = [_article(n, topic) for n, topic in enumerate(TOPICS, 1)]
+    _ingest(engine, articles)
+
+    results = engine.search("leave2 leave12 leave25", n_results=2)
+    best = results[0]
+    assert best["text"] == _sections(articles)[0]
+    # The matching children of article 1 were merged into one hit
+    assert len(best["child_ids"]) >= 2
+    assert len({r["id"] for r in results}) == len({r["text"] for r in results}) == len(results) == 2
+
+    hybrid = engine.search("salary3 salary20", n_results=3, mode="hybrid")
+    assert hybrid[0]["text"] == articles[1] and len(hybrid) == 3
+
+    from src.rag.evaluation import GoldenQuery, relevant_chunks
+
+    chunk_ids, _ = relevant_chunks(engine.collection, [GoldenQuery("q", "leave", relevant_texts=["leave12"])])
+    assert best["id"] in chunk_ids[0]
+
+def test_reingest_remove_and_compact_drop_stale_parents(engine):
+    _ingest(engine, [_article(1, "leave"), _article(2, "salary")])
+    old = engine.parent_store.ids()
+
+    _ingest(engine, [_article(1, "leave"), _article(2, "salary", " amended")])
+    new = engine.parent_store.ids()
+    assert len(new) == 2 and len(old & new) == 1
+    texts = {p["text"] for p in engine.parent_store.get_many(list(new)).values()}
+    assert _article(2, "salary", " amended") in texts
+
+    engine.parent_store.put_many([{"id": "p-orphan", "source": "gone.pdf", "text": "no child points here"}])
+    report = engine.compact(vacuum=False)
+    assert report.orphaned_index_entries == 1 and engine.parent_store.ids() == new
+
+    engine.remove_source("https://laws.gov.sa/civil-service")
+    assert len(engine.parent_store) == 0 and engine.collection.count() == 0
@@ -0,0 +1,65 @@
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.rag.batching import QueryBatcher
+
+class SlowSearch:
+    """Blocking stand-in for RAGEngine.search_many that records its batches."""
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, queries, n_results=5, where=None, mode="dense"):
+        self.calls.append(list(queries))
+        time.sleep(0.05)
+        return [[{"text": q, "source": "s", "score": 1.0}] for q in queries]
+
+def test_concurrent_queries_are_coalesced_into_one_batch():
+    search_many = SlowSearch()
+    batcher = QueryBatcher(search_many, ThreadPoolExecutor(max_workers=2), max_wait_ms=10)
+
+    async def run():
+        return await asyncio.gather(*(batcher.search(f"q{i}") for i in range(5)))
+
+    results = asyncio.run(run())
+
+    assert [r[0]["text"] for r in results] == [f"q{i}" for i in range(5)]
+    assert search_many.calls == [[f"q{i}" for i in range(5)]]
+    assert batcher.stats()["avg_batch_size"] == 5
+
+def test_event_loop_stays_responsive_during_search():
+    batcher = QueryBatcher(SlowSearch(), ThreadPoolExecutor(max_workers=1), max_wait_ms=1)
+    ticks = []
+
+    async def ticker():
+        for _ in range(5):
+            ticks.append(time.perf_counter())
+            await asyncio.sleep(0.005)
+
+    async def run():
+        await asyncio.gather(batcher.search("annual leave"), ticker())
+
+    asyncio.run(run())
+    assert len(ticks) == 5
+    assert ticks[-1] - ticks[0] < 0.045
+
+def test_full_batch_cancels_its_wait_timer():
+    search_many = SlowSearch()
+    batcher = QueryBatcher(search_many, ThreadPoolExecutor(max_workers=2), max_batch=2, max_wait_ms=100)
+
+    async def late(query, delay):
+        await asyncio.sleep(delay)
+        return await batcher.search(query)
+
+    async def run():
+        # q0/q1 fill a batch at once; the stale 100 ms timer must not cut q2's group short
+        await asyncio.gather(batcher.search("q0"), batcher.search("q1"), late("q2", 0.04), late("q3", 0.12))
+
+    asyncio.run(run())
+    assert search_many.calls == [["q0", "q1"], ["q2", "q3"]]
+    assert batcher._timers == {} and batcher._tasks == set()
@@ -0,0 +1,71 @@
+import os
+import sys
+import time
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.rag.query_cache import QueryCache
+
+RESULTS = [{"id": "a", "text": "chunk", "source": "paper.pdf", "score": 0.9}]
+
+def test_results_are_invalidated_by_version_bump():
+    cache = QueryCache()
+    key = QueryCache.result_key("what is RAG?", 5, "hybrid", None)
+    cache.put_results(key, RESULTS, cache.version)
+
+    assert cache.get_results(QueryCache.result_key("what  is RAG?", 5, "hybrid", None)) == RESULTS
+    cache.bump_version()
+    assert cache.get_results(key) is None
+    assert cache.stats()["result_hits"] == 1
+
+def test_results_computed_before_a_bump_are_stale():
+    cache = QueryCache()
+    key = QueryCache.result_key("q", 5, "dense", None)
+    version = cache.version
+    cache.bump_version()  # collection changed while the query was running
+    cache.put_results(key, RESULTS, version)
+    assert cache.get_results(key) is None
+
+def test_ttl_and_key_parameters(monkeypatch):
+    cache = QueryCache(ttl_seconds=60)
+    key = QueryCache.result_key("q", 5, "dense", None)
+    cache.put_results(key, RESULTS, cache.version)
+    assert QueryCache.result_key("q", 5, "dense", {"source": "a.pdf"}) != key
+    assert QueryCache.result_key("q", 3, "dense", None) != key
+    assert QueryCache.result_key("q", 5, "dense", None, ["research_papers_d256"]) != key
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 61)
+    assert cache.get_results(key) is None
+
+def test_disk_tier_survives_restart(tmp_path):
+    path = str(tmp_path / "query_cache.sqlite3")
+    key = QueryCache.result_key("q", 5, "dense", None)
+    first = QueryCache(disk_path=path)
+    first.bump_version()
+    first.put_results(key, RESULTS, first.version)
+
+    second = QueryCache(disk_path=path)
+    assert second.version == 1
+    assert second.get_results(key) == RESULTS
+    second.bump_version()
+    assert QueryCache(disk_path=path).get_results(key) is None
+
+def test_embedding_lru_evicts_oldest():
+    cache = QueryCache(max_embeddings=2)
+    cache.put_embedding("query: a", [1.0])
+    cache.put_embedding("query: b", [2.0])
+    cache.get_embedding("query: a")
+    cache.put_embedding("query: c", [3.0])
+    assert cache.get_embedding("query: b") is None
+    assert cache.get_embedding("query:  a") == [1.0]
+
+def test_disk_tier_is_not_shared_across_collections(make_engine):
+    live = make_engine(query_cache_on_disk=True)
+    live.add_documents([{"text": "annual leave is thirty days", "source": "labor.pdf"}])
+    assert live.search("annual leave", n_results=1)[0]["source"] == "labor.pdf"
+
+    # Restarted against another collection in the same directory (e.g. RAG_VECTOR_DIMS changed)
+    other = make_engine(query_cache_on_disk=True, collection_name="other")
+    assert other.search("annual leave", n_results=1) == []
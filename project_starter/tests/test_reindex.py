@@ -0,0 +1,145 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+pytest.importorskip("chromadb")
+pytest.importorskip("pdfplumber")
+
+from src.rag.generations import ALIASES_FILENAME, CollectionAliases, SwapLock, live_collection
+
+def _pdf(lines: list[str]) -> bytes:
+    """Single-page PDF with one text line per entry."""
+    body = " ".join(f"({line}) Tj 0 -14 Td" for line in lines)
+    stream = f"BT /F1 10 Tf 40 760 Td {body} ET".encode()
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R /Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    out, offsets = b"%PDF-1.4\n", []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return out
+
+@pytest.fixture
+def corpus(tmp_path):
+    paths = []
+    for topic in ("labor", "tax", "health"):
+        lines = [" ".join(f"{topic}{(line + word) % 12}" for word in range(8)) + f" line{line}" for line in range(40)]
+        path = tmp_path / "docs" / f"{topic}.pdf"
+        path.parent.mkdir(exist_ok=True)
+        path.write_bytes(_pdf(lines))
+        paths.append(str(path))
+    return paths
+
+def _ingested(engine, corpus):
+    for pdf in corpus:
+        engine.ingest_pdf(pdf)
+    return engine
+
+def test_reindex_switches_generation_and_pins_its_settings(tmp_path, corpus, make_engine):
+    engine = _ingested(make_engine(tmp_path / "db", chunk_size=1000, chunk_overlap=100), corpus)
+    before = engine.collection.count()
+    assert engine.search("tax3 tax7", n_results=1)[0]["source"] == "tax.pdf"
+
+    report = engine.reindex(chunk_size=250, chunk_overlap=25, probes=20)
+
+    assert report.passed and report.switched, report.reason
+    assert (report.sources, report.missing_sources) == (3, [])
+    assert report.candidate.recall >= report.live.recall - 0.05
+    assert engine.collection_name == report.generation != "research_papers"
+    assert engine.collection.count() == report.chunks > before
+    assert engine.chunker.chunk_size == 250
+    assert engine.search("tax3 tax7", n_results=1)[0]["source"] == "tax.pdf"
+
+    # Another process resolves the alias and serves the generation with the settings it was built with
+    aliases = CollectionAliases(str(tmp_path / "db" / ALIASES_FILENAME))
+    assert aliases.live("research_papers") == report.generation
+    # ... and so do the tuning / storage CLIs
+    assert live_collection(str(tmp_path / "db"), "research_papers") == report.generation
+    assert live_collection(str(tmp_path / "other"), "research_papers") == "research_papers"
+    reopened = make_engine(tmp_path / "db", chunk_size=1000, chunk_overlap=100)
+    assert reopened.collection_name == report.generation
+    assert reopened.chunker.chunk_size == 250
+    assert len(reopened.catalog) == 3
+
+    # The retired generation is kept for the grace period, then garbage-collected
+    names = {c.name for c in engine.client.list_collections()}
+    assert "research_papers" in names
+    assert engine.collect_generations(grace_s=0) == ["research_papers"]
+    assert {c.name for c in engine.client.list_collections()} == {report.generation}
+    assert not os.path.exists(tmp_path / "db" / "lexical_index.pkl")
+    assert os.path.exists(tmp_path / "db" / "generations" / report.generation / "lexical_index.pkl")
+
+def test_failed_check_keeps_the_live_generation(tmp_path, corpus, make_engine):
+    engine = _ingested(make_engine(tmp_path / "db"), corpus)
+    # A source with no manifest entry cannot be rebuilt from disk
+    engine.add_documents([{"text": "notes on the labor law", "source": "notes.txt"}])
+    engine.catalog.record("notes.txt", "text", "Notes", "en", chunks=1)
+
+    report = engine.reindex(chunk_size=300)
+
+    assert not report.switched
+    assert report.missing_sources == ["notes.txt"]
+    assert "could not be rebuilt" in report.reason
+    assert engine.collection_name == "research_papers"
+    assert {c.name for c in engine.client.list_collections()} == {"research_papers"}
+    assert not os.listdir(tmp_path / "db" / "generations")
+    assert CollectionAliases(str(tmp_path / "db" / ALIASES_FILENAME)).generations("research_papers") == []
+
+    with engine._reindex_lock:
+        with pytest.raises(RuntimeError):
+            engine.reindex(chunk_size=300)
+    with pytest.raises(TypeError):
+        engine.reindex(collection_name="other")
+
+def test_searches_keep_answering_during_a_background_reindex(tmp_path, corpus, make_engine):
+    engine = _ingested(make_engine(tmp_path / "db", generation_grace_s=0, use_embedding_cache=True), corpus)
+    cache, cached = engine.embedding_cache, len(engine.embedding_cache)
+    future = engine.reindex(background=True, chunk_size=300, chunk_overlap=30)
+
+    answered = 0
+    while not future.done() or answered == 0:
+        # Distinct queries so every search goes to the index rather than the result cache
+        results = engine.search(f"labor{answered % 12} labor{answered // 12 % 12}", n_results=2)
+        assert results and results[0]["source"] == "labor.pdf"
+        answered += 1
+    report = future.result()
+
+    assert report.switched, report.reason
+    # A zero grace period collects the previous generation right after the switch
+    assert report.collected == ["research_papers"]
+    assert {c.name for c in engine.client.list_collections()} == {report.generation}
+    # The rebuild wrote its chunks' vectors through the live engine's cache instance
+    assert engine.embedding_cache is cache and len(cache) > cached
+
+def test_swap_lock_switch_waits_for_searches_in_flight():
+    lock, events = SwapLock(), []
+    reading = threading.Event()
+
+    def search():
+        with lock.reading():
+            reading.set()
+            time.sleep(0.1)
+            events.append("search done")
+
+    reader = threading.Thread(target=search)
+    reader.start()
+    reading.wait()
+    with lock.writing():
+        events.append("switched")
+    reader.join()
+    assert events == ["search done", "switched"]
@@ -0,0 +1,107 @@
+import os
+import sys
+import threading
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.rag.reranker import CrossEncoderReranker
+
+class KeywordModel:
+    """Stand-in cross-encoder: score = share of query words present in the passage."""
+    def __init__(self):
+        self.pairs_seen = 0
+
+    def predict(self, pairs, batch_size=16, show_progress_bar=False):
+        self.pairs_seen += len(pairs)
+        return [len(set(q.split()) & set(p.split())) / len(q.split()) for q, p in pairs]
+
+def _candidates():
+    return [
+        {"id": "1", "text": "probation period is ninety days", "source": "a.pdf", "score": 0.9},
+        {"id": "2", "text": "annual leave is twenty one days", "source": "a.pdf", "score": 0.8},
+        {"id": "3", "text": "end of service award", "source": "b.pdf", "score": 0.7},
+    ]
+
+def test_rerank_orders_by_cross_encoder_and_applies_threshold():
+    reranker = CrossEncoderReranker(latency_budget_ms=None)
+    reranker._model = KeywordModel()
+
+    results = reranker.rerank("annual leave days", _candidates(), top_k=2, min_score=0.5)
+
+    assert [r["id"] for r in results] == ["2"]
+    assert results[0]["retrieval_score"] == 0.8
+
+def test_scores_are_cached_per_query_and_chunk():
+    reranker = CrossEncoderReranker(latency_budget_ms=None)
+    reranker._model = KeywordModel()
+
+    reranker.rerank("annual leave", _candidates(), top_k=3)
+    reranker.rerank("annual  leave", _candidates(), top_k=3)
+
+    assert reranker._model.pairs_seen == 3
+    assert reranker.stats()["cache_hits"] == 3
+
+def test_latency_budget_limits_scored_candidates():
+    reranker = CrossEncoderReranker(latency_budget_ms=10.0)
+    reranker._model = KeywordModel()
+    reranker._ms_per_pair = 5.0
+
+    results = reranker.rerank("service award", _candidates(), top_k=1)
+
+    assert reranker._model.pairs_seen == 2
+    assert len(results) == 1
+
+class FlakyModel(KeywordModel):
+    """Fails its first predict() call, like a one-off timeout."""
+    def __init__(self):
+        super().__init__()
+        self.failures = 1
+
+    def predict(self, pairs, batch_size=16, show_progress_bar=False):
+        if self.failures:
+            self.failures -= 1
+            raise TimeoutError("scoring timed out")
+        return super().predict(pairs, batch_size, show_progress_bar)
+
+def test_engine_falls_back_per_query_on_scoring_errors(make_engine):
+    engine = make_engine()
+    engine._reranker = CrossEncoderReranker(latency_budget_ms=None)
+    engine._reranker._model = FlakyModel()
+
+    assert [r["id"] for r in engine.rerank("annual leave days", _candidates(), 2)] == ["1", "2"]
+    # The next query is reranked again
+    assert [r["id"] for r in engine.rerank("annual leave days", _candidates(), 2)][0] == "2"
+    assert not engine._reranker_failed
+
+def test_engine_disables_reranking_when_the_model_cannot_load(make_engine):
+    class MissingModel(CrossEncoderReranker):
+        @property
+        def model(self):
+            raise OSError("model not found")
+
+    engine = make_engine()
+    engine._reranker = MissingModel()
+
+    assert [r["id"] for r in engine.rerank("annual leave days", _candidates(), 2)] == ["1", "2"]
+    assert engine._reranker_failed
+
+def test_concurrent_reranks_share_the_score_cache():
+    reranker = CrossEncoderReranker(latency_budget_ms=None, cache_size=8)
+    reranker._model = KeywordModel()
+    errors = []
+
+    def search(worker: int):
+        try:
+            for i in range(200):
+                reranker.rerank(f"annual leave {(worker + i) % 12}", _candidates(), top_k=2)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=search, args=(worker,)) for worker in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert len(reranker._cache) <= 8
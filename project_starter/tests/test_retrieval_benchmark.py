@@ -0,0 +1,77 @@
+import json
+import os
+import sys
+
+import pytest
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+pytest.importorskip("chromadb")
+
+from src.rag.evaluation import compare_reports, load_golden_set, relevant_chunks, report_dict, run_benchmark
+
+TOPICS = {
+    "labor.pdf": ["annual leave thirty days", "working hours eight per day", "end of service award"],
+    "tax.pdf": ["value added tax fifteen percent", "zakat on commercial assets", "tax return deadline"],
+    "youth.pdf": ["youth empowerment programs", "volunteering among young people", "youth policy governance"],
+}
+
+@pytest.fixture
+def engine(tmp_path, make_engine):
+    engine = make_engine(tmp_path / "db")
+    engine.add_documents([
+        {"text": f"{passage} article {i}", "source": source}
+        for source, passages in TOPICS.items() for i, passage in enumerate(passages)
+    ])
+    return engine
+
+def _golden(tmp_path, engine) -> str:
+    vat_id = engine.collection.get(where_document={"$contains": "value added"})["ids"][0]
+    lines = [
+        {"query_id": "leave", "query": "annual leave days", "relevant_texts": ["Annual   leave"]},
+        {"query_id": "vat", "query": "value added tax", "relevant_doc_ids": [vat_id]},
+        {"query_id": "youth", "query": "youth volunteering", "relevant_sources": ["youth.pdf"]},
+        {"query_id": "missed", "query": "zakat", "relevant_texts": ["end of service"], "relevant_sources": ["labor.pdf"]},
+    ]
+    path = tmp_path / "golden.jsonl"
+    path.write_text("\n".join(json.dumps(line) for line in lines) + "\n\n")
+    return str(path)
+
+def test_golden_set_requires_relevance_labels(tmp_path):
+    path = tmp_path / "golden.jsonl"
+    path.write_text('{"query_id": "q1", "query": "leave"}\n')
+    with pytest.raises(ValueError):
+        load_golden_set(str(path))
+
+def test_relevant_chunks_survive_rechunking(tmp_path, engine):
+    golden = load_golden_set(_golden(tmp_path, engine))
+    chunk_ids, sources = relevant_chunks(engine.collection, golden)
+    assert [len(ids) for ids in chunk_ids] == [1, 1, 0, 1]
+    assert sources == [{"labor.pdf"}, {"tax.pdf"}, {"youth.pdf"}, {"labor.pdf"}]
+
+def test_run_benchmark_reports_quality_latency_and_throughput(tmp_path, engine):
+    golden_path = _golden(tmp_path, engine)
+    cache = engine.query_cache
+    run = run_benchmark(engine, load_golden_set(golden_path), k=3, clients=(1, 2), rounds=2, engine_name="fake")
+
+    assert engine.query_cache is cache and cache.stats()["result_hits"] == 0
+    assert run.chunks == 9
+    # "zakat" finds the tax chunk, not the labor one: 2 of the 3 chunk-labelled queries hit at rank 1
+    assert run.quality["chunk"]["queries"] == 3
+    assert run.quality["chunk"]["hit@3"] == pytest.approx(2 / 3, abs=1e-3)
+    assert run.quality["source"]["queries"] == 4
+    assert run.quality["source"]["mrr"] >= 0.75
+    assert [q["first_chunk_rank"] for q in run.per_query][:2] == [1, 1]
+    assert run.latency["count"] == 8
+    assert run.latency["p99_ms"] >= run.latency["p50_ms"] > 0
+    assert [level["clients"] for level in run.throughput] == [1, 2]
+    assert all(level["qps"] > 0 and level["count"] == 8 for level in run.throughput)
+    assert run.memory["peak_rss_mb"] > 0
+
+    report = json.loads(json.dumps(report_dict([run], golden_path, k=3)))
+    faster = json.loads(json.dumps(report))
+    faster["runs"][0]["latency"]["p95_ms"] = report["runs"][0]["latency"]["p95_ms"] / 2
+    rows = {row["metric"]: row for row in compare_reports(report, faster)}
+    assert rows["latency.p95_ms"]["delta"] < 0
+    assert rows["chunk.hit@3"]["delta"] == 0
@@ -0,0 +1,143 @@
+import functools
+import os
+import sys
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+pytest.importorskip("chromadb")
+pytest.importorskip("bs4")
+pytest.importorskip("requests")
+pytest.importorskip("pdfplumber")
+
+from src.rag.crawler import CRAWL_FRONTIER_FILENAME, normalize_url
+
+def _pdf(text: str) -> bytes:
+    """Smallest single-page PDF with one line of text."""
+    stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode()
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R /Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    out, offsets = b"%PDF-1.4\n", []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return out
+
+def _html(title: str, links: list[str], words: str) -> str:
+    anchors = "".join(f'<a href="{link}">{link}</a> ' for link in links)
+    text = " ".join(f"{words}{i}" for i in range(60))
+    return f"<html><head><title>{title}</title></head><body><p>{text}</p>{anchors}</body></html>"
+
+PAGES = {
+    "index.html": _html("Portal", [
+        "laws/labor.html", "laws/labor.html#article-5", "/laws/labor.html?utm_source=nav",
+        "docs/guide.pdf", "https://example.com/elsewhere", "private/draft.html", "style.css",
+        "mailto:info@example.com",
+    ], "portal"),
+    "laws/labor.html": _html("Labor law", ["../index.html", "deep/annex.html"], "labor"),
+    "laws/deep/annex.html": _html("Annex", ["too-deep.html"], "annex"),
+    "laws/deep/too-deep.html": _html("Too deep", [], "deep"),
+    "private/draft.html": _html("Draft", [], "draft"),
+}
+
+class _StaticSite:
+    """A directory of static files served over HTTP, with Last-Modified / If-Modified-Since support."""
+    def __init__(self, root):
+        for path, html in PAGES.items():
+            os.makedirs(os.path.join(root, os.path.dirname(path)), exist_ok=True)
+            with open(os.path.join(root, path), "w", encoding="utf-8") as f:
+                f.write(html)
+        os.makedirs(os.path.join(root, "docs"))
+        with open(os.path.join(root, "docs", "guide.pdf"), "wb") as f:
+            f.write(_pdf("Guide to end of service benefits"))
+        with open(os.path.join(root, "robots.txt"), "w") as f:
+            f.write("User-agent: *\nDisallow: /private/\n")
+        self.requests: list[tuple[str, int]] = []
+        site = self
+
+        class Handler(SimpleHTTPRequestHandler):
+            def log_request(self, code="-", size="-"):
+                site.requests.append((self.path, int(getattr(code, "value", code))))
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(Handler, directory=str(root)))
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def fetched(self) -> list[str]:
+        return sorted(path for path, status in self.requests if path != "/robots.txt")
+
+@pytest.fixture
+def site(tmp_path):
+    site = _StaticSite(tmp_path / "site")
+    yield site
+    site.server.shutdown()
+
+def test_normalize_url():
+    assert normalize_url("HTTPS://Example.COM:443/a?b=2&utm_source=x&a=1#frag") == "https://example.com/a?a=1&b=2"
+    assert normalize_url("../x.html#top", "http://example.com:8080/laws/y.html") == "http://example.com:8080/x.html"
+    assert normalize_url("http://example.com") == "http://example.com/"
+    assert normalize_url("mailto:someone@example.com") is None
+    assert normalize_url("javascript:void(0)") is None
+
+def test_crawl_site_end_to_end(site, tmp_path, make_engine):
+    engine = make_engine(tmp_path / "db")
+    report = engine.crawl_site(site.base + "/index.html", max_depth=2, per_host_concurrency=2)
+
+    # Fragment and tracking duplicates fetched once; robots.txt, depth and domain respected
+    assert site.fetched() == ["/docs/guide.pdf", "/index.html", "/laws/deep/annex.html", "/laws/labor.html"]
+    assert (report.fetched, report.pdfs, report.failed) == (4, 1, 0)
+    assert (report.offsite_links, report.disallowed) == (1, 1)
+    assert report.frontier_left == 0
+    assert not os.path.exists(tmp_path / "db" / CRAWL_FRONTIER_FILENAME)
+
+    pdf_url = site.base + "/docs/guide.pdf"
+    record = engine.catalog.get(pdf_url)
+    assert record.source_type == "pdf"
+    stored = engine.collection.get(where={"source": pdf_url}, include=["documents"])
+    assert any("end of service" in text for text in stored["documents"])
+    assert engine.catalog.get(site.base + "/laws/labor.html").title == "Labor law"
+
+    # A second crawl revalidates every page with If-Modified-Since and ingests nothing
+    engine = make_engine(tmp_path / "db")
+    site.requests.clear()
+    chunks = engine.collection.count()
+    again = engine.crawl_site(site.base + "/index.html", max_depth=2)
+    html_statuses = [status for path, status in site.requests if path.endswith(".html")]
+    assert html_statuses == [304, 304, 304]
+    assert again.not_modified + again.unchanged == 4
+    assert again.fetched == 0
+    assert engine.collection.count() == chunks
+
+def test_crawl_resumes_from_saved_frontier(site, tmp_path, make_engine):
+    engine = make_engine(tmp_path / "db")
+    first = engine.crawl_site(site.base + "/index.html", max_depth=2, max_pages=2, per_host_concurrency=1)
+
+    assert first.fetched == 2
+    assert first.frontier_left > 0
+    assert os.path.exists(tmp_path / "db" / CRAWL_FRONTIER_FILENAME)
+
+    # Restarted process: the crawl picks up the saved frontier instead of starting over
+    engine = make_engine(tmp_path / "db")
+    site.requests.clear()
+    second = engine.crawl_site(site.base + "/index.html", max_depth=2, max_pages=10)
+
+    assert "/index.html" not in site.fetched()
+    assert first.fetched + second.fetched == 4
+    assert second.frontier_left == 0
+    assert not os.path.exists(tmp_path / "db" / CRAWL_FRONTIER_FILENAME)
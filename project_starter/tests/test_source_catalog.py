@@ -0,0 +1,31 @@
+import os
+import sys
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.rag.catalog import SourceCatalog, build_where, detect_language
+
+def test_build_where():
+    assert build_where() is None
+    assert build_where(source_type="pdf") == {"source_type": "pdf"}
+    assert build_where(source=["a.pdf", "b.pdf"], language="ar") == {
+        "$and": [{"source": {"$in": ["a.pdf", "b.pdf"]}}, {"language": "ar"}]
+    }
+
+def test_detect_language():
+    assert detect_language("يستحق العامل إجازة سنوية") == "ar"
+    assert detect_language("Annual leave entitlement") == "en"
+    assert detect_language("") == "unknown"
+
+def test_catalog_round_trip_and_filters(tmp_path):
+    path = str(tmp_path / "source_catalog.json")
+    catalog = SourceCatalog(path)
+    catalog.record("r1.pdf", "pdf", "نظام العمل", "ar", chunks=120, pages=40)
+    catalog.record("https://hrsd.gov.sa", "web", "HRSD", "ar", chunks=8)
+    catalog.save()
+
+    reloaded = SourceCatalog(path)
+    assert len(reloaded) == 2 and "r1.pdf" in reloaded
+    assert reloaded.get("r1.pdf").title == "نظام العمل"
+    assert [r.source for r in reloaded.list(source_type="web")] == ["https://hrsd.gov.sa"]
@@ -0,0 +1,105 @@
+import os
+import sys
+
+import pytest
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.rag.storage import scan_chunk_versions
+
+@pytest.fixture
+def engine(make_engine):
+    return make_engine()
+
+def _article(n: int, edit: str = "") -> str:
+    return f"Article {n}. " + " ".join(f"term{n}_{i}" for i in range(60)) + edit
+
+def _ingest(engine, source: str, texts: list[str], ingested_at: int = 1):
+    swap = engine._begin_swap([source])
+    engine.add_documents([{"text": t, "source": source, "ingested_at": ingested_at} for t in texts], swap=swap)
+    return swap, engine._finish_swap(swap)
+
+def _stored(engine, source: str) -> set[str]:
+    return set(engine.collection.get(where={"source": source}, include=["documents"])["documents"])
+
+def test_reingest_swaps_the_chunk_set(engine):
+    _ingest(engine, "law.pdf", [_article(1), _article(2), _article(3)])
+    _ingest(engine, "other.pdf", [_article(9)])
+
+    # Article 2 amended (a near-duplicate of the old one), article 3 repealed
+    new_version = [_article(1), _article(2, " amended"), _article(4)]
+    swap, removed = _ingest(engine, "law.pdf", new_version)
+
+    assert removed == 2
+    assert _stored(engine, "law.pdf") == set(new_version)
+    assert _stored(engine, "other.pdf") == {_article(9)}
+    assert len(engine.lexical_index) == engine.collection.count() == 4
+    assert all(doc_id not in engine.dedup_index for doc_id in swap.stale_ids)
+
+def test_failed_reingest_rolls_back_to_the_previous_version(engine):
+    _ingest(engine, "law.pdf", [_article(1), _article(2)])
+
+    swap = engine._begin_swap(["law.pdf"])
+    engine.add_documents([{"text": _article(5), "source": "law.pdf"}], swap=swap)
+    swap.failed = True
+    engine._finish_swap(swap)
+
+    assert _stored(engine, "law.pdf") == {_article(1), _article(2)}
+
+def test_compact_deletes_older_versions_and_orphaned_entries(engine):
+    _ingest(engine, "law.pdf", [_article(1), _article(2)], ingested_at=1)
+    # Upserted without replace semantics: the old article 2 stays behind
+    engine.add_documents([{"text": t, "source": "law.pdf", "ingested_at": 2} for t in (_article(1), _article(3))])
+    engine.lexical_index.add("ghost", "no chunk behind this entry")
+
+    ids, stale = scan_chunk_versions(engine.collection, page_size=1)
+    assert len(ids) == 3 and len(stale) == 1
+
+    report = engine.compact()
+    assert (report.chunks_before, report.stale_chunks, report.orphaned_index_entries) == (3, 1, 1)
+    assert _stored(engine, "law.pdf") == {_article(1), _article(3)}
+    assert sorted(engine.lexical_index.ids()) == sorted(engine.collection.get(include=[])["ids"])
+    assert engine.compact().stale_chunks == 0
+
+def test_held_back_copies_are_promoted_when_the_original_goes(engine):
+    _ingest(engine, "law-2023.pdf", [_article(1), _article(2), _article(3)])
+    # A new edition repeating the 2023 articles: suppressed at ingest, but held back
+    edition = [_article(1, " amended"), _article(2), _article(3)]
+    swap, _ = _ingest(engine, "law-2024.pdf", edition)
+    assert _stored(engine, "law-2024.pdf") == set() and len(swap.held_ids) == 3
+    assert engine.collection.count() == 3
+
+    # Re-ingesting the edition without article 3 forgets that copy
+    repealed = engine._generate_id(_article(3), "law-2024.pdf")
+    _ingest(engine, "law-2024.pdf", edition[:2])
+    assert engine.dedup_index.held_ids(["law-2024.pdf"]) == swap.held_ids - {repealed}
+
+    engine.remove_source("law-2023.pdf")
+    assert _stored(engine, "law-2024.pdf") == set(edition[:2])
+    assert len(engine.lexical_index) == engine.collection.count() == 2
+    hits = engine.search(_article(1), n_results=2, where={"source": "law-2024.pdf"})
+    assert {hit["text"] for hit in hits} == set(edition[:2])
+
+    # A copy whose own source is removed first never comes back
+    _ingest(engine, "copy.pdf", [_article(2)])
+    engine.remove_source("copy.pdf")
+    engine.remove_source("law-2024.pdf")
+    assert engine.collection.count() == 0 and engine.dedup_index.copies() == []
+
+def test_rolled_back_reingest_survives_compact(engine):
+    _ingest(engine, "law.pdf", [_article(1), _article(2), _article(3)], ingested_at=1)
+
+    # Article 1 is rewritten in place with a newer stamp before the ingest fails
+    swap = engine._begin_swap(["law.pdf"])
+    engine.add_documents(
+        [{"text": t, "source": "law.pdf", "ingested_at": 2, "page": 7} for t in (_article(1), _article(5))], swap=swap
+    )
+    swap.failed = True
+    engine._finish_swap(swap)
+    assert engine.collection.count() == 3
+
+    assert engine.compact(vacuum=False).stale_chunks == 0
+    assert _stored(engine, "law.pdf") == {_article(1), _article(2), _article(3)}
+    metadatas = engine.collection.get(where={"source": "law.pdf"}, include=["metadatas"])["metadatas"]
+    assert {m["ingested_at"] for m in metadatas} == {1} and all("page" not in m for m in metadatas)
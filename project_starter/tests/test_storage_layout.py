@@ -0,0 +1,35 @@
+import os
+import sys
+
+import pytest
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.rag.storage import chunk_text, migrate_to_compact
+
+chromadb = pytest.importorskip("chromadb")
+
+def test_chunk_text_reads_both_layouts():
+    assert chunk_text({"original_text": "raw"}, "passage: raw") == "raw"
+    assert chunk_text({"source": "a.pdf"}, "raw") == "raw"
+    assert chunk_text(None, None) == ""
+
+def test_migration_drops_the_duplicate_text_and_keeps_vectors(tmp_path):
+    client = chromadb.PersistentClient(path=str(tmp_path))
+    collection = client.create_collection("research_papers", embedding_function=None)
+    collection.add(
+        ids=["a", "b"],
+        documents=["passage: first chunk", "second chunk"],
+        metadatas=[{"source": "a.pdf", "original_text": "first chunk", "page": 1}, {"source": "b.pdf"}],
+        embeddings=[[1.0, 0.0], [0.0, 1.0]],
+    )
+
+    report = migrate_to_compact(collection, page_size=1)
+    assert (report.scanned, report.migrated) == (2, 1)
+
+    row = collection.get(ids=["a"], include=["metadatas", "documents", "embeddings"])
+    assert row["documents"] == ["first chunk"]
+    assert row["metadatas"] == [{"source": "a.pdf", "page": 1}]
+    assert list(row["embeddings"][0]) == [1.0, 0.0]
+    assert migrate_to_compact(collection).migrated == 0
@@ -0,0 +1,39 @@
+import os
+import sys
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.rag.chunking import RecursiveChunker
+from src.rag.extraction import iter_page_chunks
+
+def _pages():
+    return [
+        (1, "Article 1. " + "first page words " * 30),
+        (2, "Article 2. " + "second page words " * 30),
+        (4, "Article 3. short last page"),
+    ]
+
+def test_chunks_are_tagged_with_pages():
+    chunks = list(iter_page_chunks(iter(_pages()), RecursiveChunker(chunk_size=200, chunk_overlap=40)))
+
+    assert chunks[0]["page"] == 1
+    assert chunks[-1]["page_end"] == 4
+    assert all(c["page"] <= c["page_end"] for c in chunks)
+    assert all(len(c["text"]) <= 200 for c in chunks)
+    assert [c["page"] for c in chunks] == sorted(c["page"] for c in chunks)
+
+def test_no_text_is_lost_across_page_boundaries():
+    chunker = RecursiveChunker(chunk_size=200, chunk_overlap=40)
+    streamed = " ".join(c["text"] for c in iter_page_chunks(iter(_pages()), chunker))
+
+    for marker in ("Article 1", "Article 2", "Article 3. short last page"):
+        assert marker in streamed
+    assert streamed.count("second page words") >= 30
+
+def test_char_offsets_point_into_the_document():
+    document = "".join(text + "\n" for _, text in _pages())
+    chunks = list(iter_page_chunks(iter(_pages()), RecursiveChunker(chunk_size=200, chunk_overlap=40)))
+
+    for chunk in chunks:
+        assert document[chunk["char_start"]:chunk["char_end"]] == chunk["text"]
@@ -0,0 +1,62 @@
+import os
+import sys
+
+import pytest
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.rag.chunking import RecursiveChunker
+from src.rag.extraction import iter_page_chunks
+
+def _tokenizer():
+    tokenizers = pytest.importorskip("tokenizers")
+    from tokenizers.models import WordLevel
+    from tokenizers.pre_tokenizers import Whitespace
+
+    words = "article first second page words short last نظام العمل المادة . :".split()
+    tokenizer = tokenizers.Tokenizer(WordLevel({w: i for i, w in enumerate(["[UNK]"] + words)}, unk_token="[UNK]"))
+    tokenizer.pre_tokenizer = Whitespace()
+    return tokenizer
+
+def _token_count(tokenizer, text: str) -> int:
+    return len(tokenizer.encode(text, add_special_tokens=False).ids)
+
+def _pages():
+    return [
+        (1, "Article 1. " + "first page words " * 30),
+        (2, "Article 2. " + "المادة نظام العمل " * 30),
+        (3, "Article 3. short last page"),
+    ]
+
+def test_token_chunks_fit_the_budget_and_map_back():
+    tokenizer = _tokenizer()
+    chunker = RecursiveChunker(chunk_size=24, chunk_overlap=6, unit="tokens", tokenizer=tokenizer, token_limit=30)
+    document = "".join(text + "\n" for _, text in _pages())
+    chunks = list(iter_page_chunks(iter(_pages()), chunker))
+
+    assert len(chunks) > 3
+    for chunk in chunks:
+        assert _token_count(tokenizer, chunk["text"]) <= 24
+        assert document[chunk["char_start"]:chunk["char_end"]] == chunk["text"]
+    assert chunker.stats.lengths == [_token_count(tokenizer, c["text"]) for c in chunks]
+    assert chunker.stats.over_limit == 0
+    assert "over the 30-token window" in chunker.stats.summary()
+
+def test_long_unbroken_text_is_hard_split_with_overlap():
+    tokenizer = _tokenizer()
+    chunker = RecursiveChunker(chunk_size=10, chunk_overlap=3, unit="tokens", tokenizer=tokenizer)
+    text = "words." * 40  # no whitespace: only the "" separator applies
+    spans = chunker.split_spans(text)
+
+    assert all(length <= 10 for _, _, _, length in spans)
+    assert spans[0][1] == 0 and spans[-1][2] == len(text)
+    assert all(b[1] < a[2] for a, b in zip(spans, spans[1:]))  # consecutive chunks overlap
+
+def test_char_mode_records_stats():
+    chunker = RecursiveChunker(chunk_size=200, chunk_overlap=40)
+    chunks = chunker.split_text("words " * 200)
+
+    assert chunker.stats.lengths == [len(c) for c in chunks]
+    chunker.reset_stats()
+    assert chunker.stats.summary() == "no chunks"
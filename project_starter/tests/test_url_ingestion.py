@@ -0,0 +1,162 @@
+import hashlib
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+pytest.importorskip("chromadb")
+pytest.importorskip("bs4")
+pytest.importorskip("requests")
+
+def _page(title: str, articles: range, amended: str = "") -> bytes:
+    body = "".join(
+        f"<p>Article {i}. " + " ".join(f"term{i}_{j}" for j in range(40)) + (amended if i == articles[0] else "") + "</p>"
+        for i in articles
+    )
+    return f"<html><head><title>{title}</title><script>var x = 1;</script></head><body>{body}</body></html>".encode()
+
+class _Site:
+    """Local HTTP stub: pages with ETags (/etag/*), Last-Modified (/dated/*) or neither (/plain/*)."""
+    def __init__(self):
+        self.pages = {
+            "/etag/law": _page("Labor law", range(0, 20)),
+            "/dated/rules": _page("Rules", range(20, 35)),
+            "/plain/faq": _page("FAQ", range(35, 45)),
+        }
+        self.requests: list[tuple[str, int]] = []
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = site.pages.get(self.path)
+                if body is None:
+                    return self._send(404, b"missing")
+                etag = f'"{hashlib.md5(body).hexdigest()}"'
+                last_modified = f"Mon, 0{len(body) % 9 + 1} Jan 2024 00:00:00 GMT"
+                if self.path.startswith("/etag/") and self.headers.get("If-None-Match") == etag:
+                    return self._send(304)
+                if self.path.startswith("/dated/") and self.headers.get("If-Modified-Since") == last_modified:
+                    return self._send(304)
+                headers = {"ETag": etag} if self.path.startswith("/etag/") else {}
+                if self.path.startswith("/dated/"):
+                    headers["Last-Modified"] = last_modified
+                self._send(200, body, headers)
+
+            def _send(self, status, body=b"", headers=None):
+                site.requests.append((self.path, status))
+                self.send_response(status)
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                if status != 304:
+                    self.send_header("Content-Type", "text/html; charset=utf-8")
+                    self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if status != 304:
+                    self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def urls(self):
+        return [self.base + path for path in self.pages] + [self.base + "/missing"]
+
+@pytest.fixture
+def site():
+    site = _Site()
+    yield site
+    site.server.shutdown()
+
+def test_conditional_gets_skip_unchanged_pages(site, make_engine):
+    engine = make_engine()
+    first = engine.ingest_urls(site.urls(), concurrency=4)
+
+    assert (first.fetched, first.failed) == (3, 1)
+    assert first.bytes_fetched == sum(len(body) for body in site.pages.values())
+    assert engine.catalog.get(site.base + "/etag/law").title == "Labor law"
+    stored = engine.collection.get(include=["documents", "metadatas"])
+    assert all("var x" not in text for text in stored["documents"])
+    chunks = engine.collection.count()
+
+    # New process: validators come from the URL manifest
+    engine = make_engine()
+    site.requests.clear()
+    second = engine.ingest_urls(site.urls(), concurrency=4)
+
+    assert (second.not_modified, second.unchanged, second.fetched) == (2, 1, 0)
+    assert second.bytes_revalidated == len(site.pages["/etag/law"]) + len(site.pages["/dated/rules"])
+    assert second.bytes_fetched == len(site.pages["/plain/faq"])
+    assert sorted(status for _, status in site.requests) == [200, 304, 304, 404]
+    assert engine.collection.count() == chunks
+    assert engine.last_ingestion_run.stages[0].items_in == 0  # nothing was parsed or embedded
+
+def test_changed_page_replaces_its_chunks(site, make_engine):
+    engine = make_engine()
+    law = site.base + "/etag/law"
+    engine.ingest_urls([law])
+    before = set(engine.collection.get(where={"source": law}, include=[])["ids"])
+
+    site.pages["/etag/law"] = _page("Labor law", range(0, 18), amended=" amended")
+    report = engine.ingest_urls([law])
+
+    after = set(engine.collection.get(where={"source": law}, include=[])["ids"])
+    assert report.fetched == 1 and report.stale_chunks == len(before - after) > 0
+    assert len(after) == engine.url_manifest.get(law).chunks
+
+def test_ingest_url_runs_through_the_pipeline(site, make_engine):
+    engine = make_engine()
+    url = site.base + "/etag/law"
+    engine.ingest_url(url)
+    run = engine.last_ingestion_run
+    state = run.sources[0]
+
+    assert state.stored and state.title == "Labor law"
+    assert engine.collection.count() == state.chunks > 1
+    assert engine.catalog.get(url).title == "Labor law"
+    stored = engine.collection.get(include=["documents", "metadatas"])
+    assert all("var x" not in text for text in stored["documents"])
+    assert all(m["source_type"] == "web" and "char_start" in m for m in stored["metadatas"])
+    assert [m.name for m in run.stages] == ["extract", "clean", "chunk", "embed", "upsert"]
+    assert run.chunk_stats.lengths and len(run.chunk_stats.lengths) == state.chunks
+
+    # The startup URL is revalidated, not re-embedded
+    site.requests.clear()
+    report = engine.ingest_url(url)
+    assert report.not_modified == 1 and site.requests == [("/etag/law", 304)]
+    assert engine.last_ingestion_run.stages[0].items_in == 0
+
+class _StreamedResponse:
+    def __init__(self, status_code: int):
+        self.status_code = status_code
+        self.headers = {"Content-Type": "application/pdf"}
+        self.closed = False
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+    def close(self):
+        self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def test_fetch_closes_streamed_responses_on_every_path(tmp_path):
+    from src.rag.fetching import UrlRecord, fetch
+
+    for status, record in ((304, UrlRecord(url="u", content_hash="h", size=1, settings={}, etag="e")), (500, None)):
+        response = _StreamedResponse(status)
+        session = type("Session", (), {"get": lambda self, *args, **kwargs: response})()
+        result = fetch(session, "https://laws.gov.sa/law.pdf", record, download_dir=str(tmp_path))
+        assert result.status == status and response.closed
@@ -0,0 +1,48 @@
+import os
+import sys
+
+import numpy as np
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.rag.engine import RAGEngine
+from src.rag.metrics import hit_rate_at_k, mean_reciprocal_rank
+from src.rag.vectors import truncate
+
+def test_truncate_keeps_leading_dims_and_normalizes():
+    vectors = truncate([[3.0, 4.0, 12.0], [1.0, 0.0, 0.0]], 2)
+    assert vectors.shape == (2, 2)
+    np.testing.assert_allclose(vectors[0], [0.6, 0.8])
+    np.testing.assert_allclose(np.linalg.norm(vectors, axis=1), 1.0)
+
+def test_rescore_uses_full_vectors_from_the_embedding_cache(tmp_path):
+    engine = RAGEngine(persist_directory=str(tmp_path), vector_dims=1)
+    assert engine.collection_name == "research_papers_d1"
+    engine.embedding_cache.put_many(["passage: near", "passage: far"], np.array([[1.0, 0.9], [1.0, -0.9]]))
+
+    # Equal first-stage scores (the first dim ties); the full vectors break the tie
+    candidates = [
+        {"id": "far", "text": "far", "source": "a", "score": 1.0},
+        {"id": "near", "text": "near", "source": "a", "score": 1.0},
+        {"id": "uncached", "text": "uncached", "source": "a", "score": 0.5},
+    ]
+    ranked = engine._rescore(np.array([1.0, 1.0]), candidates)
+    assert [r["id"] for r in ranked] == ["near", "uncached", "far"]
+
+def test_truncated_collection_keeps_its_own_side_indexes(tmp_path):
+    full = RAGEngine(persist_directory=str(tmp_path))
+    truncated = RAGEngine(persist_directory=str(tmp_path), vector_dims=64)
+    assert full.index_directory == str(tmp_path)
+    assert truncated.index_directory == os.path.join(str(tmp_path), "generations", "research_papers_d64")
+
+    truncated.catalog.record("r1.pdf", "pdf", "R1", "en", chunks=3)
+    truncated.catalog.save()
+    assert len(RAGEngine(persist_directory=str(tmp_path)).catalog) == 0
+    assert len(RAGEngine(persist_directory=str(tmp_path), vector_dims=64).catalog) == 1
+
+def test_lab_05_metrics():
+    retrieved = [["a", "b"], ["c", "d"]]
+    relevant = [{"b"}, {"x"}]
+    assert hit_rate_at_k(retrieved, relevant, 2) == 0.5
+    assert mean_reciprocal_rank(retrieved, relevant) == 0.25